@@ -0,0 +1,115 @@
+import json
+import pymysql
+
+from balu_common import cancellations, db
+
+MAX_SALE_IDS = 100
+
+def lambda_handler(event, __):
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "PATCH, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+    }
+    try:
+        claims = event['requestContext']['authorizer']['claims']
+        role = claims['cognito:groups']
+
+        if 'admin' not in role:
+            return {
+                "statusCode": 403,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "FORBIDDEN"
+                }),
+            }
+
+        body = json.loads(event['body'])
+        ids = body.get('ids')
+        if not ids or not isinstance(ids, list):
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "MISSING_FIELDS"
+                }),
+            }
+
+        # bool también es int en Python
+        if any(not isinstance(id, int) or isinstance(id, bool) or id <= 0 for id in ids):
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_ID"
+                }),
+            }
+
+        if len(ids) > MAX_SALE_IDS:
+            return {
+                "statusCode": 413,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "TOO_MANY_IDS",
+                    "max_ids": MAX_SALE_IDS
+                }),
+            }
+
+        outcomes = cancel_sales(ids)
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "SALES_CANCELLED",
+                "cancelled": sum(outcome == cancellations.CANCELLED for outcome in outcomes.values()),
+                "results": [{"id": id, "message": outcomes[id]} for id in ids]
+            }),
+        }
+    except pymysql.MySQLError as e:
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "DATABASE_ERROR",
+                "error": str(e)
+            }),
+        }
+    except KeyError as e:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "MISSING_FIELDS",
+                "error": str(e)
+            }),
+        }
+    except json.JSONDecodeError:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "INVALID_JSON_FORMAT"
+            }),
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "INTERNAL_SERVER_ERROR",
+                "error": str(e)
+            }),
+        }
+
+
+def cancel_sales(ids):
+    # Todas las ventas se cancelan en una transacción: cinco sentencias sin importar cuántas sean
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        connection.begin()
+        outcomes = cancellations.cancel(cursor, ids)
+        connection.commit()
+        return outcomes
+    finally:
+        db.release_connection(connection)
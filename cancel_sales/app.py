@@ -1,38 +1,8 @@
 import json
 import pymysql
 import re
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import cancellations, db
 
 
 def lambda_handler(event, __):
@@ -98,8 +68,8 @@ def lambda_handler(event, __):
                 }),
             }
 
-        # Verificar que el ID existe en la base de datos
-        if not id_exists_in_db(id):
+        # La existencia de la venta se revisa en la misma transacción que la cancela
+        if cancel_sale(id) == cancellations.NOT_FOUND:
             return {
                 "statusCode": 404,
                 "headers": headers,
@@ -108,7 +78,6 @@ def lambda_handler(event, __):
                 }),
             }
 
-        cancel_sale(id)
         return {
             "statusCode": 200,
             "headers": headers,
@@ -153,36 +122,14 @@ def lambda_handler(event, __):
         }
 
 
-def id_exists_in_db(id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
-    try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM sales WHERE id = %s", (id,))
-        result = cursor.fetchone()
-        return result[0] > 0
-    except Exception as e:
-        return False
-    finally:
-        connection.close()
-
-
 def cancel_sale(id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
-        cursor.execute("UPDATE sales SET status = 0 WHERE id=%s", (id,))
+        connection.begin()
+        # Solo una venta activa se cancela, devuelve su stock y se resta del resumen; cancelar dos veces no hace nada
+        outcome = cancellations.cancel(cursor, [id])[id]
         connection.commit()
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
-            },
-            "body": json.dumps({
-                "message": "DATABASE_ERROR"
-            }),
-        }
+        return outcome
     finally:
-        connection.close()
+        db.release_connection(connection)
@@ -1,38 +1,8 @@
 import json
 import pymysql
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import catalog_cache, db
 
 def decimal_to_float(obj):
     if isinstance(obj, Decimal):
@@ -104,6 +74,7 @@ def lambda_handler(event, __):
             }
 
         change_status(id, type, status)
+        catalog_cache.invalidate()
 
         return {
             "statusCode": 200,
@@ -120,7 +91,7 @@ def lambda_handler(event, __):
         }
 
 def change_status(id, type, status):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
         query = ""
@@ -136,9 +107,9 @@ def change_status(id, type, status):
     except Exception as e:
         raise e
     finally:
-        connection.close()
+        db.release_connection(connection)
 def type_exists(type, id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
         query = ""
@@ -156,4 +127,4 @@ def type_exists(type, id):
     except Exception as e:
         return False
     finally:
-        connection.close()
\ No newline at end of file
+        db.release_connection(connection)
\ No newline at end of file
@@ -0,0 +1,15 @@
+# boto3 tarda cientos de milisegundos en importarse con 128 MB, así que se carga
+# en el primer uso y cada cliente se conserva para las invocaciones en caliente
+_clients = {}
+
+
+def get_client(service_name, region_name=None):
+    key = (service_name, region_name)
+    if key not in _clients:
+        import boto3
+        _clients[key] = boto3.client(service_name, region_name=region_name)
+    return _clients[key]
+
+
+def reset_clients():
+    _clients.clear()
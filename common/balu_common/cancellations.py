@@ -0,0 +1,47 @@
+from balu_common import inventory, sales_summary
+
+CANCELLED = "CANCELLED"
+ALREADY_CANCELLED = "ALREADY_CANCELLED"
+NOT_FOUND = "ID_NOT_FOUND"
+
+# Devuelve al stock lo vendido en un grupo de ventas con un solo UPDATE
+RESTORE_STOCK = """
+    UPDATE products p
+    JOIN (
+        SELECT product_id, SUM(quantity) AS quantity
+        FROM sales_products
+        WHERE sale_id IN ({ids})
+        GROUP BY product_id
+    ) sold ON sold.product_id = p.id
+    SET p.stock = p.stock + sold.quantity
+"""
+
+
+def cancel(cursor, sale_ids):
+    """Cancela las ventas activas de sale_ids dentro de la transacción en curso.
+
+    Devuelve el resultado de cada id: CANCELLED, ALREADY_CANCELLED o ID_NOT_FOUND.
+    """
+    sale_ids = sorted(set(sale_ids))
+    placeholders = ", ".join(["%s"] * len(sale_ids))
+    # El bloqueo evita que otra cancelación simultánea devuelva el mismo stock dos veces
+    cursor.execute(f"SELECT id, status FROM sales WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE", sale_ids)
+    statuses = {row[0]: row[1] for row in cursor.fetchall()}
+
+    active = [sale_id for sale_id in sale_ids if statuses.get(sale_id) == 1]
+    if active:
+        ids = ", ".join(["%s"] * len(active))
+        cursor.execute(f"UPDATE sales SET status = 0 WHERE id IN ({ids}) AND status = 1", active)
+        cursor.execute(RESTORE_STOCK.format(ids=ids), active)
+        inventory.record_cancellations(cursor, active)
+        sales_summary.record_cancellations(cursor, active)
+
+    outcomes = {}
+    for sale_id in sale_ids:
+        if sale_id not in statuses:
+            outcomes[sale_id] = NOT_FOUND
+        elif sale_id in active:
+            outcomes[sale_id] = CANCELLED
+        else:
+            outcomes[sale_id] = ALREADY_CANCELLED
+    return outcomes
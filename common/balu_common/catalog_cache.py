@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import logging
+from decimal import Decimal
+
+from balu_common import aws
+
+logger = logging.getLogger()
+
+# Segundos que cada contenedor reutiliza su copia sin consultar el almacén compartido
+LOCAL_TTL = int(os.environ.get("CATALOG_CACHE_LOCAL_TTL", "10"))
+# Segundos que una entrada vive en el almacén compartido
+SHARED_TTL = int(os.environ.get("CATALOG_CACHE_TTL", "300"))
+# Tabla DynamoDB del almacén compartido; sin ella se usa LocalBackend
+TABLE_NAME = os.environ.get("CATALOG_CACHE_TABLE", "")
+
+VERSION_KEY = "catalog_version"
+
+
+class LocalBackend:
+    # Sustituto en memoria del almacén compartido para pruebas y ejecución local
+
+    def __init__(self):
+        self._items = {}
+        self._version = 0
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None or item[1] < time.time():
+            return None
+        return item[0]
+
+    def set(self, key, value, ttl):
+        self._items[key] = (value, time.time() + ttl)
+
+    def get_version(self):
+        return self._version
+
+    def bump_version(self):
+        self._version += 1
+        return self._version
+
+
+class DynamoDBBackend:
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def get(self, key):
+        response = aws.get_client('dynamodb').get_item(
+            TableName=self.table_name,
+            Key={"cache_key": {"S": key}}
+        )
+        item = response.get("Item")
+        # El TTL de DynamoDB no borra al instante, así que se revisa la expiración al leer
+        if item is None or int(item["expires_at"]["N"]) < time.time():
+            return None
+        return item["value"]["S"]
+
+    def set(self, key, value, ttl):
+        aws.get_client('dynamodb').put_item(
+            TableName=self.table_name,
+            Item={
+                "cache_key": {"S": key},
+                "value": {"S": value},
+                "expires_at": {"N": str(int(time.time() + ttl))}
+            }
+        )
+
+    def get_version(self):
+        response = aws.get_client('dynamodb').get_item(
+            TableName=self.table_name,
+            Key={"cache_key": {"S": VERSION_KEY}},
+            ConsistentRead=True
+        )
+        item = response.get("Item")
+        if item is None:
+            return 0
+        return int(item["version"]["N"])
+
+    def bump_version(self):
+        response = aws.get_client('dynamodb').update_item(
+            TableName=self.table_name,
+            Key={"cache_key": {"S": VERSION_KEY}},
+            UpdateExpression="ADD version :one",
+            ExpressionAttributeValues={":one": {"N": "1"}},
+            ReturnValues="UPDATED_NEW"
+        )
+        return int(response["Attributes"]["version"]["N"])
+
+
+_backend = None
+_local = {}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = DynamoDBBackend(TABLE_NAME) if TABLE_NAME else LocalBackend()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+    _local.clear()
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return str(obj)
+
+
+def get_or_load(key, loader):
+    now = time.monotonic()
+    entry = _local.get(key)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    backend = get_backend()
+    shared_key = None
+    cached = None
+    try:
+        # La versión forma parte de la llave: al subirla, las entradas anteriores dejan de leerse
+        shared_key = f"catalog:{backend.get_version()}:{key}"
+        cached = backend.get(shared_key)
+    except Exception as e:
+        # Un fallo de la caché no debe tumbar la lectura del catálogo
+        logger.warning("Catalog cache unavailable: %s", str(e))
+
+    if cached is not None:
+        value = json.loads(cached)
+    else:
+        value = loader()
+        if shared_key is not None:
+            try:
+                backend.set(shared_key, json.dumps(value, default=_json_default), SHARED_TTL)
+            except Exception as e:
+                logger.warning("Could not store catalog cache entry: %s", str(e))
+
+    _local[key] = (value, now + LOCAL_TTL)
+    return value
+
+
+def invalidate():
+    _local.clear()
+    try:
+        get_backend().bump_version()
+    except Exception as e:
+        logger.error("Could not invalidate catalog cache: %s", str(e))
+
+
+def reset():
+    global _backend
+    _backend = None
+    _local.clear()
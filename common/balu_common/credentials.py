@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import logging
+
+from balu_common import aws
+
+logger = logging.getLogger()
+
+SECRET_NAME = os.environ.get("DB_SECRET_NAME", "prod/Balu/RDS")
+REGION_NAME = os.environ.get("DB_SECRET_REGION", "us-east-2")
+# Segundos que el secreto se reutiliza antes de volver a pedirlo a Secrets Manager
+CACHE_TTL = int(os.environ.get("DB_SECRET_TTL", "300"))
+# Archivo opcional (p. ej. /tmp/balu_rds_secret.json) para reutilizar el secreto si el runtime se reinicia en el mismo sandbox
+CACHE_FILE = os.environ.get("DB_SECRET_CACHE_FILE", "")
+
+_cached_secret = None
+_cached_at = 0.0
+
+
+def _fetch_secret():
+    # Para obtener una lista de excepciones lanzadas, vea
+    # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
+    client = aws.get_client('secretsmanager', REGION_NAME)
+    get_secret_value_response = client.get_secret_value(
+        SecretId=SECRET_NAME
+    )
+
+    secret = get_secret_value_response['SecretString']
+    return json.loads(secret)
+
+
+def _read_cache_file():
+    if not CACHE_FILE:
+        return None
+    try:
+        with open(CACHE_FILE) as cache_file:
+            cached = json.load(cache_file)
+        return cached["secret"], cached["fetched_at"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache_file(secret, fetched_at):
+    if not CACHE_FILE:
+        return
+    try:
+        # Solo el usuario del runtime puede leer el archivo
+        fd = os.open(CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump({"secret": secret, "fetched_at": fetched_at}, cache_file)
+    except OSError as e:
+        logger.warning("Could not write secret cache file: %s", str(e))
+
+
+def get_secret(force_refresh=False):
+    global _cached_secret, _cached_at
+
+    now = time.time()
+    if not force_refresh:
+        if _cached_secret is not None and now - _cached_at < CACHE_TTL:
+            return _cached_secret
+
+        cached = _read_cache_file()
+        if cached is not None and now - cached[1] < CACHE_TTL:
+            _cached_secret, _cached_at = cached
+            return _cached_secret
+
+    _cached_secret = _fetch_secret()
+    _cached_at = now
+    _write_cache_file(_cached_secret, _cached_at)
+    return _cached_secret
+
+
+def invalidate():
+    global _cached_secret, _cached_at
+
+    _cached_secret = None
+    _cached_at = 0.0
+    if CACHE_FILE:
+        try:
+            os.remove(CACHE_FILE)
+        except OSError:
+            pass
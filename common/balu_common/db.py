@@ -0,0 +1,92 @@
+import os
+import time
+import logging
+import pymysql
+from pymysql.constants import ER, SERVER_STATUS
+
+from balu_common.credentials import get_secret
+
+logger = logging.getLogger()
+
+# Segundos de inactividad tras los cuales la conexión se valida con un ping antes de reutilizarla
+PING_INTERVAL = int(os.environ.get("DB_PING_INTERVAL", "30"))
+CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "5"))
+
+# Una sola conexión por contenedor: Lambda atiende una invocación a la vez,
+# así que se conserva entre invocaciones en caliente en lugar de abrir una por consulta
+_connection = None
+_last_used = 0.0
+
+
+def _open(secrets):
+    logger.info("Opening new database connection")
+    return pymysql.connect(
+        host=secrets["host"],
+        user=secrets["username"],
+        password=secrets["password"],
+        db=secrets["dbname"],
+        connect_timeout=CONNECT_TIMEOUT,
+        autocommit=True
+    )
+
+
+def _connect():
+    try:
+        return _open(get_secret())
+    except pymysql.err.OperationalError as e:
+        if e.args[0] != ER.ACCESS_DENIED_ERROR:
+            raise
+        # La contraseña pudo rotar: refrescar el secreto en caché y reintentar una sola vez
+        logger.warning("Database rejected cached credentials, refreshing secret")
+        return _open(get_secret(force_refresh=True))
+
+
+def get_connection():
+    global _connection, _last_used
+
+    if _connection is not None and time.monotonic() - _last_used > PING_INTERVAL:
+        try:
+            _connection.ping(reconnect=True)
+        except pymysql.MySQLError as e:
+            logger.warning("Discarding stale database connection: %s", str(e))
+            close_connection()
+
+    if _connection is None or not _connection.open:
+        _connection = _connect()
+
+    _last_used = time.monotonic()
+    return _connection
+
+
+def release_connection(connection):
+    global _last_used
+
+    if connection is not _connection:
+        connection.close()
+        return
+
+    if not connection.open:
+        close_connection()
+        return
+
+    # No dejar transacciones abiertas para la siguiente invocación
+    if connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+        try:
+            connection.rollback()
+        except pymysql.MySQLError as e:
+            logger.warning("Discarding database connection after failed rollback: %s", str(e))
+            close_connection()
+            return
+
+    _last_used = time.monotonic()
+
+
+def close_connection():
+    global _connection
+
+    if _connection is not None:
+        try:
+            _connection.close()
+        except pymysql.MySQLError:
+            pass
+    _connection = None
@@ -0,0 +1,35 @@
+import hashlib
+
+
+def etag_for(body):
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+def get_header(event, name):
+    # API Gateway no normaliza mayúsculas en los encabezados
+    headers = event.get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def matches_if_none_match(event, etag):
+    header = get_header(event, 'If-None-Match')
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def not_modified(headers, etag):
+    return {
+        "statusCode": 304,
+        "headers": dict(headers, ETag=etag),
+        "body": ""
+    }
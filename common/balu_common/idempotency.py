@@ -0,0 +1,94 @@
+import os
+import json
+import hashlib
+import logging
+import pymysql
+from pymysql.constants import ER
+
+from balu_common import db
+
+logger = logging.getLogger()
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+# Horas que se guarda la respuesta de una petición para devolverla en los reintentos
+TTL_HOURS = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+PURGE_BATCH_SIZE = 1000
+
+
+class KeyReusedError(Exception):
+    # La misma llave llegó con otro cuerpo: es un error del cliente, no un reintento
+    pass
+
+
+def get_key(event):
+    # API Gateway conserva las mayúsculas que envía el cliente en los nombres de encabezado
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == HEADER and value:
+            if len(value) > MAX_KEY_LENGTH:
+                raise ValueError("INVALID_IDEMPOTENCY_KEY")
+            return value
+    return None
+
+
+def request_hash(body):
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def claim(cursor, key, fingerprint):
+    """Reserva la llave dentro de la transacción en curso.
+
+    Devuelve None si la petición es nueva o la respuesta guardada si es un reintento. Mientras la
+    primera petición no confirme, el INSERT de un reintento simultáneo espera el bloqueo de la fila.
+    """
+    try:
+        cursor.execute(
+            "INSERT INTO idempotency_keys (idempotency_key, request_hash, expires_at) "
+            "VALUES (%s, %s, NOW() + INTERVAL %s HOUR)",
+            (key, fingerprint, TTL_HOURS)
+        )
+        return None
+    except pymysql.err.IntegrityError as e:
+        if e.args[0] != ER.DUP_ENTRY:
+            raise
+
+    cursor.execute(
+        "SELECT request_hash, status_code, response_body, expires_at < NOW() FROM idempotency_keys "
+        "WHERE idempotency_key = %s FOR UPDATE",
+        (key,)
+    )
+    stored_hash, status_code, response_body, expired = cursor.fetchone()
+    if expired:
+        # La purga aún no la borra; se reutiliza como si fuera nueva
+        cursor.execute(
+            "UPDATE idempotency_keys SET request_hash = %s, status_code = NULL, response_body = NULL, "
+            "expires_at = NOW() + INTERVAL %s HOUR WHERE idempotency_key = %s",
+            (fingerprint, TTL_HOURS, key)
+        )
+        return None
+    if stored_hash != fingerprint:
+        raise KeyReusedError(key)
+    return {"statusCode": status_code, "body": response_body}
+
+
+def store(cursor, key, status_code, body):
+    # Se guarda antes del commit para que la respuesta y la escritura queden juntas o no queden
+    cursor.execute("UPDATE idempotency_keys SET status_code = %s, response_body = %s WHERE idempotency_key = %s",
+                   (status_code, body, key))
+
+
+def purge():
+    # Borra por lotes para no bloquear la tabla mientras save_sale reserva llaves
+    connection = db.get_connection()
+    deleted = 0
+    try:
+        cursor = connection.cursor()
+        while True:
+            cursor.execute("DELETE FROM idempotency_keys WHERE expires_at < NOW() LIMIT %s", (PURGE_BATCH_SIZE,))
+            deleted += cursor.rowcount
+            if cursor.rowcount < PURGE_BATCH_SIZE:
+                break
+    finally:
+        db.release_connection(connection)
+    logger.info("Purged %s expired idempotency keys", deleted)
+    return deleted
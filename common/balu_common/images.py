@@ -0,0 +1,272 @@
+import io
+import os
+import re
+import json
+import uuid
+import base64
+import hashlib
+import logging
+import pymysql
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from balu_common import aws, catalog_cache, db
+from balu_common.queues import LocalQueue, SQSQueue
+
+logger = logging.getLogger()
+
+BUCKET_NAME = os.environ.get("IMAGE_BUCKET", "cafe-balu-images")
+# Cola SQS que alimenta a image_worker; sin ella los trabajos quedan en LocalQueue
+QUEUE_URL = os.environ.get("IMAGE_QUEUE_URL", "")
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg"
+}
+# Lado mayor en píxeles de cada variante WebP
+VARIANTS = {
+    "thumb": 200,
+    "medium": 800
+}
+WEBP_QUALITY = 80
+# Límite de tamaño que S3 hace cumplir en las subidas directas con URL prefirmada
+MAX_UPLOAD_BYTES = int(os.environ.get("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_URL_TTL = int(os.environ.get("IMAGE_UPLOAD_URL_TTL", "300"))
+# Días que un objeto sin referencias se conserva antes de que sweep lo borre, para no tocar subidas en curso
+SWEEP_GRACE_DAYS = int(os.environ.get("IMAGE_SWEEP_GRACE_DAYS", "2"))
+# HEAD simultáneos al validar varias llaves a la vez (import_products)
+UPLOAD_CHECK_WORKERS = 16
+UPLOAD_KEY_PATTERN = re.compile(r"^images/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.(png|jpg)$")
+
+
+def public_url(key):
+    return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
+
+
+def key_for(url):
+    # None para URLs que no son de este bucket (p. ej. imágenes externas de productos antiguos)
+    prefix = public_url("")
+    if not isinstance(url, str) or not url.startswith(prefix):
+        return None
+    return url[len(prefix):]
+
+
+def parse_data_url(data_url):
+    # data:image/png;base64,<datos> -> ("png", bytes)
+    header, data = data_url.split(",", 1)
+    image_format = header.split("/")[1].split(";")[0]
+    return image_format, base64.b64decode(data)
+
+
+def _extension(image_format):
+    return "jpg" if image_format == "jpeg" else image_format
+
+
+def new_key(image_format):
+    return f"images/{uuid.uuid4()}.{_extension(image_format)}"
+
+
+def content_key(binary_data, image_format):
+    # La misma imagen siempre produce la misma llave, así que volver a enviarla no duplica objetos
+    return f"images/{hashlib.sha256(binary_data).hexdigest()}.{_extension(image_format)}"
+
+
+def object_exists(key):
+    from botocore.exceptions import ClientError
+
+    try:
+        return aws.get_client('s3').head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        # Solo un 404 significa que falta; un 403 por permisos no debe rechazar imágenes que sí existen
+        if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+            raise
+        return None
+
+
+def store_original(data_url):
+    image_format, binary_data = parse_data_url(data_url)
+    key = content_key(binary_data, image_format)
+    s3 = aws.get_client('s3')
+    if object_exists(key) is None:
+        s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=binary_data, ContentType=CONTENT_TYPES[image_format])
+    else:
+        # Copiar el objeto sobre sí mismo renueva LastModified, así sweep vuelve a darle el periodo de gracia
+        # aunque fuera un huérfano viejo; S3 solo acepta la copia si se reemplazan los metadatos
+        s3.copy_object(Bucket=BUCKET_NAME, Key=key, CopySource={"Bucket": BUCKET_NAME, "Key": key},
+                       MetadataDirective="REPLACE", ContentType=CONTENT_TYPES[image_format])
+    return key
+
+
+def presigned_upload(image_format):
+    # POST y no PUT: solo la política de un POST prefirmado permite a S3 rechazar archivos demasiado grandes
+    key = new_key(image_format)
+    content_type = CONTENT_TYPES[image_format]
+    upload = aws.get_client('s3').generate_presigned_post(
+        Bucket=BUCKET_NAME,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, MAX_UPLOAD_BYTES]
+        ],
+        ExpiresIn=UPLOAD_URL_TTL
+    )
+    return {"key": key, "url": upload["url"], "fields": upload["fields"]}
+
+
+def is_uploaded_image(key):
+    # Solo se aceptan llaves emitidas por presigned_upload cuyo objeto ya está en S3
+    if not isinstance(key, str) or not UPLOAD_KEY_PATTERN.match(key):
+        return False
+    head = object_exists(key)
+    if head is None:
+        return False
+    return head["ContentType"] in CONTENT_TYPES.values() and head["ContentLength"] <= MAX_UPLOAD_BYTES
+
+
+def uploaded_images(keys):
+    """Devuelve las llaves de keys que pasan is_uploaded_image, revisando las distintas en paralelo."""
+    keys = sorted({key for key in keys if isinstance(key, str) and UPLOAD_KEY_PATTERN.match(key)})
+    if not keys:
+        return set()
+    # El cliente se crea antes de repartir el trabajo: boto3 no crea clientes de forma segura entre hilos,
+    # pero un mismo cliente sí se puede compartir
+    aws.get_client('s3')
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_CHECK_WORKERS, len(keys))) as pool:
+        return {key for key, uploaded in zip(keys, pool.map(is_uploaded_image, keys)) if uploaded}
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = SQSQueue(QUEUE_URL) if QUEUE_URL else LocalQueue(process)
+    return _queue
+
+
+def set_queue(queue):
+    global _queue
+    _queue = queue
+
+
+def reset():
+    global _queue
+    _queue = None
+
+
+def enqueue_variants(product_id, image_url):
+    # Las variantes se generan fuera de la petición; el producto queda con la imagen original mientras tanto
+    get_queue().send({"product_id": product_id, "image": image_url})
+
+
+def render_variants(original):
+    # Pillow solo viaja con image_worker, así que se importa al procesar y no al cargar el módulo
+    from PIL import Image, ImageOps
+
+    rendered = {}
+    with Image.open(io.BytesIO(original)) as image:
+        # Las fotos de teléfono guardan la rotación en EXIF
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for name, size in VARIANTS.items():
+            variant = image.copy()
+            variant.thumbnail((size, size))
+            output = io.BytesIO()
+            variant.save(output, "WEBP", quality=WEBP_QUALITY)
+            rendered[name] = output.getvalue()
+    return rendered
+
+
+def variant_keys(original_key):
+    stem = os.path.splitext(os.path.basename(original_key))[0]
+    return {name: f"images/{name}/{stem}.webp" for name in VARIANTS}
+
+
+def process(job):
+    s3 = aws.get_client('s3')
+    original_key = key_for(job["image"])
+
+    keys = variant_keys(original_key)
+    # Con llaves por contenido, si otra carga ya generó las variantes de esta imagen basta con enlazarlas
+    if not all(object_exists(key) for key in keys.values()):
+        original = s3.get_object(Bucket=BUCKET_NAME, Key=original_key)["Body"].read()
+        for name, data in render_variants(original).items():
+            s3.put_object(Bucket=BUCKET_NAME, Key=keys[name], Body=data, ContentType="image/webp",
+                          CacheControl="public, max-age=31536000, immutable")
+
+    variants = {name: public_url(key) for name, key in keys.items()}
+    return record_variants(job["product_id"], job["image"], variants)
+
+
+def record_variants(product_id, image_url, variants):
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        # Si el producto cambió de imagen mientras se procesaba, estas variantes ya no le corresponden
+        cursor.execute("UPDATE products SET image_variants = %s WHERE id = %s AND image = %s",
+                       (json.dumps(variants), product_id, image_url))
+        updated = cursor.rowcount == 1
+    finally:
+        db.release_connection(connection)
+
+    if updated:
+        catalog_cache.invalidate()
+    else:
+        logger.info("Product %s no longer uses %s, discarding variants", product_id, image_url)
+    return updated
+
+
+def referenced_keys():
+    keys = set()
+    connection = db.get_connection()
+    try:
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute("SELECT image, image_variants FROM products")
+            for image, image_variants in cursor:
+                original_key = key_for(image)
+                if original_key is not None:
+                    keys.add(original_key)
+                    # Las variantes de una imagen en uso se conservan aunque el trabajador aún no las registre
+                    keys.update(variant_keys(original_key).values())
+                for url in json.loads(image_variants or "{}").values():
+                    if key_for(url) is not None:
+                        keys.add(key_for(url))
+    finally:
+        db.release_connection(connection)
+    return keys
+
+
+def _delete(s3, objects):
+    if objects:
+        # Un producto pudo empezar a usar una de estas llaves mientras se listaba el bucket
+        referenced = referenced_keys()
+        objects = [item for item in objects if item["Key"] not in referenced]
+    if objects:
+        s3.delete_objects(Bucket=BUCKET_NAME, Delete={"Objects": objects, "Quiet": True})
+    return len(objects)
+
+
+def sweep(grace_days=None):
+    # Borra originales y variantes que ningún producto usa, más viejos que el periodo de gracia
+    grace_days = SWEEP_GRACE_DAYS if grace_days is None else grace_days
+    cutoff = datetime.now(timezone.utc) - timedelta(days=grace_days)
+    referenced = referenced_keys()
+
+    s3 = aws.get_client('s3')
+    orphans = []
+    deleted = 0
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=BUCKET_NAME, Prefix="images/"):
+        for item in page.get("Contents", []):
+            if item["Key"] not in referenced and item["LastModified"] < cutoff:
+                orphans.append({"Key": item["Key"]})
+                # delete_objects acepta hasta 1000 llaves por llamada
+                if len(orphans) == 1000:
+                    deleted += _delete(s3, orphans)
+                    orphans = []
+    deleted += _delete(s3, orphans)
+    logger.info("Image sweep deleted %s orphaned objects", deleted)
+    return deleted
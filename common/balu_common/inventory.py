@@ -0,0 +1,108 @@
+import logging
+
+logger = logging.getLogger()
+
+# Motivos de cada movimiento del libro de inventario
+SALE = "sale"
+CANCELLATION = "cancellation"
+ADJUSTMENT = "adjustment"
+
+# Minutos que deben pasar antes de compactar un movimiento: más que el tiempo máximo de una Lambda,
+# así ninguna transacción que todavía pueda confirmarse tiene un id por debajo del corte
+COMPACTION_LAG_MINUTES = 15
+
+# Una fila por venta y producto, en negativo, para un rango de ids consecutivos
+SALE_MOVEMENTS = """
+    INSERT INTO inventory_movements (product_id, quantity, reason, sale_id)
+    SELECT product_id, -SUM(quantity), 'sale', sale_id
+    FROM sales_products
+    WHERE sale_id BETWEEN %s AND %s
+    GROUP BY sale_id, product_id
+"""
+
+CANCELLATION_MOVEMENTS = """
+    INSERT INTO inventory_movements (product_id, quantity, reason, sale_id)
+    SELECT product_id, SUM(quantity), 'cancellation', sale_id
+    FROM sales_products
+    WHERE sale_id IN ({ids})
+    GROUP BY sale_id, product_id
+"""
+
+ADJUSTMENT_MOVEMENT = "INSERT INTO inventory_movements (product_id, quantity, reason) VALUES (%s, %s, 'adjustment')"
+
+# Suma los movimientos entre dos cortes al snapshot de cada producto
+SNAPSHOT_UPSERT = """
+    INSERT INTO inventory_snapshots (product_id, stock, movement_id)
+    SELECT product_id, SUM(quantity), %s
+    FROM inventory_movements
+    WHERE id > %s AND id <= %s
+    GROUP BY product_id
+    ON DUPLICATE KEY UPDATE stock = stock + VALUES(stock), movement_id = VALUES(movement_id)
+"""
+
+# Stock según el libro: snapshot más los movimientos posteriores, leídos desde idx_inventory_movements_product
+LEDGER_STOCK = """
+    SELECT p.id, p.stock, COALESCE(s.stock, 0) + COALESCE(SUM(m.quantity), 0) AS ledger_stock
+    FROM products p
+    LEFT JOIN inventory_snapshots s ON s.product_id = p.id
+    LEFT JOIN inventory_movements m ON m.product_id = p.id AND m.id > COALESCE(s.movement_id, 0)
+    {where}
+    GROUP BY p.id, p.stock, s.stock
+"""
+
+
+def record_sales(cursor, first_id, last_id):
+    # Una sola sentencia para una venta (first_id == last_id) o para un lote de sale_worker
+    cursor.execute(SALE_MOVEMENTS, (first_id, last_id))
+
+
+def record_cancellations(cursor, sale_ids):
+    ids = ", ".join(["%s"] * len(sale_ids))
+    cursor.execute(CANCELLATION_MOVEMENTS.format(ids=ids), list(sale_ids))
+
+
+def record_adjustments(cursor, deltas):
+    # deltas: {product_id: stock nuevo - stock anterior}; los productos sin cambio no dejan movimiento
+    rows = [(product_id, delta) for product_id, delta in sorted(deltas.items()) if delta]
+    if rows:
+        cursor.executemany(ADJUSTMENT_MOVEMENT, rows)
+
+
+def compact(connection, lag_minutes=COMPACTION_LAG_MINUTES):
+    """Suma a inventory_snapshots los movimientos que ya no pueden cambiar.
+
+    Devuelve el id del último movimiento compactado. Los movimientos no se borran: son el historial
+    de auditoría, y el snapshot solo acota cuántos hay que sumar para conocer el stock.
+    """
+    cursor = connection.cursor()
+    connection.begin()
+    try:
+        # El bloqueo sobre los snapshots evita que dos compactaciones sumen el mismo rango
+        cursor.execute("SELECT COALESCE(MAX(movement_id), 0) FROM inventory_snapshots FOR UPDATE")
+        start = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), %s) FROM inventory_movements "
+                       "WHERE id > %s AND created_at < NOW() - INTERVAL %s MINUTE", (start, start, lag_minutes))
+        upto = cursor.fetchone()[0]
+        if upto > start:
+            cursor.execute(SNAPSHOT_UPSERT, (upto, start, upto))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    logger.info("Compacted inventory movements %s to %s", start + 1, upto)
+    return upto
+
+
+def reconcile(cursor, product_ids=None):
+    """Compara products.stock con el stock que resulta del libro de movimientos.
+
+    Devuelve los productos que no coinciden. Una sola lectura consistente ve las dos cosas en el
+    mismo punto, así que una venta en curso no aparece como diferencia.
+    """
+    where, params = "", []
+    if product_ids:
+        where = "WHERE p.id IN ({})".format(", ".join(["%s"] * len(product_ids)))
+        params = list(product_ids)
+    cursor.execute(LEDGER_STOCK.format(where=where), params)
+    return [{"product_id": product_id, "stock": stock, "ledger_stock": int(ledger_stock)}
+            for product_id, stock, ledger_stock in cursor.fetchall() if stock != ledger_stock]
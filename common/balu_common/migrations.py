@@ -0,0 +1,280 @@
+import sys
+import logging
+import argparse
+import pymysql
+from pymysql.constants import ER
+
+from balu_common import db
+
+logger = logging.getLogger()
+
+# Cada migración se aplica una sola vez y en orden; nunca se edita una ya publicada, se agrega una nueva
+MIGRATIONS = [
+    (1, "base schema", [
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            status TINYINT(1) NOT NULL DEFAULT 1
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            stock INT NOT NULL DEFAULT 0,
+            price DECIMAL(10, 2) NOT NULL,
+            category_id INT NOT NULL,
+            status TINYINT(1) NOT NULL DEFAULT 1,
+            image TEXT,
+            description TEXT,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            total DECIMAL(12, 2) NOT NULL,
+            status TINYINT(1) NOT NULL DEFAULT 1,
+            createdAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_products (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            sale_id INT NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL,
+            FOREIGN KEY (sale_id) REFERENCES sales (id),
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+        """,
+    ]),
+    (2, "covering indexes for sales reports", [
+        # Rangos de fechas (historial, reconstrucción del resumen) sin leer la fila completa
+        "ALTER TABLE sales ADD INDEX idx_sales_created_status (createdAt, status, total)",
+        # Une ventas con sus líneas y suma cantidades solo desde el índice
+        "ALTER TABLE sales_products ADD INDEX idx_sales_products_sale (sale_id, product_id, quantity)",
+        # Filtros por categoría y validación de nombres duplicados
+        "ALTER TABLE products ADD INDEX idx_products_category_name (category_id, name)",
+    ]),
+    (3, "daily sales summary", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales_summary (
+            sale_date DATE NOT NULL PRIMARY KEY,
+            total_sales DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            total_transactions INT NOT NULL DEFAULT 0,
+            cancelled_transactions INT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales_product_summary (
+            sale_date DATE NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            transactions INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, product_id)
+        )
+        """,
+        # Carga inicial desde el historial, con las mismas sumas que sales_summary.rebuild; a partir de
+        # aquí save_sale, sale_worker y las cancelaciones lo mantienen
+        """
+        INSERT INTO daily_sales_summary (sale_date, total_sales, total_transactions, cancelled_transactions)
+        SELECT DATE(s.createdAt), COALESCE(SUM(CASE WHEN s.status = 1 THEN s.total END), 0),
+               SUM(s.status = 1), SUM(s.status = 0)
+        FROM sales s
+        GROUP BY DATE(s.createdAt)
+        ON DUPLICATE KEY UPDATE
+            total_sales = VALUES(total_sales),
+            total_transactions = VALUES(total_transactions),
+            cancelled_transactions = VALUES(cancelled_transactions)
+        """,
+        """
+        INSERT INTO daily_sales_product_summary (sale_date, product_id, quantity, transactions)
+        SELECT DATE(s.createdAt), sp.product_id, SUM(sp.quantity), COUNT(DISTINCT s.id)
+        FROM sales s
+        JOIN sales_products sp ON sp.sale_id = s.id
+        WHERE s.status = 1
+        GROUP BY DATE(s.createdAt), sp.product_id
+        ON DUPLICATE KEY UPDATE quantity = VALUES(quantity), transactions = VALUES(transactions)
+        """,
+    ]),
+    (4, "top sellers leaderboard", [
+        """
+        CREATE TABLE IF NOT EXISTS product_sales_totals (
+            product_id INT NOT NULL PRIMARY KEY,
+            quantity INT NOT NULL DEFAULT 0,
+            INDEX idx_product_sales_totals_quantity (quantity)
+        )
+        """,
+        # Carga inicial desde el historial; a partir de aquí save_sale y cancel_sales lo mantienen
+        """
+        INSERT INTO product_sales_totals (product_id, quantity)
+        SELECT sp.product_id, SUM(sp.quantity)
+        FROM sales s
+        JOIN sales_products sp ON sp.sale_id = s.id
+        WHERE s.status = 1
+        GROUP BY sp.product_id
+        ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)
+        """,
+    ]),
+    (5, "product image variants", [
+        # URLs de las variantes WebP que escribe image_worker; NULL mientras se generan
+        "ALTER TABLE products ADD COLUMN image_variants JSON NULL",
+    ]),
+    (6, "unique product names per category", [
+        # La collation por defecto no distingue mayúsculas, igual que la validación con lower(name).
+        # Falla con DUP_ENTRY si ya hay duplicados: se corrigen a mano y se vuelve a ejecutar
+        "ALTER TABLE products ADD UNIQUE INDEX uq_products_category_name (category_id, name)",
+        # El índice único cubre las mismas búsquedas, incluida la llave foránea de category_id
+        "ALTER TABLE products DROP INDEX idx_products_category_name",
+    ]),
+    (7, "idempotency keys", [
+        # Respuestas guardadas de save_sale por Idempotency-Key; la purga programada borra las vencidas
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            idempotency_key VARCHAR(255) NOT NULL PRIMARY KEY,
+            request_hash CHAR(64) NOT NULL,
+            status_code SMALLINT NULL,
+            response_body TEXT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME NOT NULL,
+            INDEX idx_idempotency_keys_expires (expires_at)
+        )
+        """,
+    ]),
+    (8, "inventory ledger", [
+        # Libro de movimientos de stock, solo se agregan filas. Sin llave foránea a products para que el
+        # INSERT no tome un bloqueo compartido sobre la fila del producto
+        """
+        CREATE TABLE IF NOT EXISTS inventory_movements (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL,
+            reason VARCHAR(20) NOT NULL,
+            sale_id INT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_inventory_movements_product (product_id, id, quantity),
+            INDEX idx_inventory_movements_sale (sale_id)
+        )
+        """,
+        # Stock de cada producto hasta el movimiento movement_id; lo mantiene la compactación
+        """
+        CREATE TABLE IF NOT EXISTS inventory_snapshots (
+            product_id INT NOT NULL PRIMARY KEY,
+            stock INT NOT NULL,
+            movement_id BIGINT NOT NULL,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+        # El stock actual es el punto de partida del libro; se aplica con las ventas detenidas
+        """
+        INSERT INTO inventory_snapshots (product_id, stock, movement_id)
+        SELECT id, stock, 0 FROM products
+        ON DUPLICATE KEY UPDATE stock = VALUES(stock)
+        """,
+    ]),
+    (9, "client ids of synced sales", [
+        # El client_id de sync_sales no vence como la llave de idempotencia; NULL en las demás ventas
+        "ALTER TABLE sales ADD COLUMN client_id VARCHAR(200) NULL",
+        "ALTER TABLE sales ADD UNIQUE INDEX uq_sales_client_id (client_id)",
+        # Recupera el client_id de las ventas sincronizadas cuya llave todavía no se purgó
+        """
+        UPDATE sales s
+        JOIN idempotency_keys k ON k.idempotency_key LIKE 'sync:%' AND k.status_code = 200
+            AND s.id = CAST(JSON_UNQUOTE(JSON_EXTRACT(k.response_body, '$.sale_id')) AS UNSIGNED)
+        SET s.client_id = SUBSTRING(k.idempotency_key, 6)
+        WHERE s.client_id IS NULL
+        """,
+    ]),
+    (10, "sales history keyset index", [
+        # Páginas del historial ordenadas por (createdAt, id); status y total cubren la consulta sin leer la fila
+        "ALTER TABLE sales ADD INDEX idx_sales_created_id (createdAt, id, status, total)",
+    ]),
+    (11, "sharded daily sales summary", [
+        # Varias filas por día (ver sales_summary.DAY_SLOTS); las filas existentes quedan en el slot 0
+        """
+        ALTER TABLE daily_sales_summary
+            ADD COLUMN slot TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER sale_date,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (sale_date, slot)
+        """,
+    ]),
+    (12, "category leaderboard index", [
+        # El ranking por categoría lee los 10 primeros de la categoría desde el índice, sin ordenar el join
+        """
+        ALTER TABLE product_sales_totals
+            ADD COLUMN category_id INT NULL,
+            ADD INDEX idx_product_sales_totals_category (category_id, quantity)
+        """,
+        """
+        UPDATE product_sales_totals t
+        JOIN products p ON p.id = t.product_id
+        SET t.category_id = p.category_id
+        """,
+    ]),
+]
+
+# Errores que significan que el objeto ya existe (o ya se quitó) en una base creada antes de tener migraciones
+ALREADY_APPLIED_ERRORS = (ER.DUP_KEYNAME, ER.DUP_FIELDNAME, ER.TABLE_EXISTS_ERROR, ER.CANT_DROP_FIELD_OR_KEY)
+
+
+def _ensure_version_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def current_version(connection):
+    cursor = connection.cursor()
+    _ensure_version_table(cursor)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def _execute(cursor, statement):
+    try:
+        cursor.execute(statement)
+    except pymysql.err.OperationalError as e:
+        if e.args[0] not in ALREADY_APPLIED_ERRORS:
+            raise
+        logger.info("Skipping statement already applied: %s", str(e))
+
+
+def migrate(connection, target=None):
+    # MySQL confirma cada DDL por su cuenta, así que la versión se registra tras cada migración completa
+    version = current_version(connection)
+    cursor = connection.cursor()
+    applied = []
+    for number, description, statements in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        logger.info("Applying migration %s: %s", number, description)
+        for statement in statements:
+            _execute(cursor, statement)
+        cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                       (number, description))
+        connection.commit()
+        applied.append(number)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to the Balu database")
+    parser.add_argument("--target", type=int, help="stop after this migration version")
+    args = parser.parse_args(argv)
+
+    connection = db.get_connection()
+    try:
+        applied = migrate(connection, args.target)
+    finally:
+        db.release_connection(connection)
+    print(f"Applied migrations: {applied or 'none'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
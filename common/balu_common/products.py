@@ -0,0 +1,40 @@
+import pymysql
+from pymysql.constants import ER
+
+from balu_common import db
+
+# Existencia de la categoría y nombre duplicado en una sola ida a la base
+VALIDATION_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM categories WHERE id = %s),
+        (SELECT COUNT(*) FROM products WHERE category_id = %s AND lower(name) = %s AND id != %s)
+"""
+
+
+def validate_write(category_id, name, product_id=None):
+    # Devuelve el mensaje de error para el cliente o None si se puede escribir
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(VALIDATION_QUERY, (category_id, category_id, name.lower(), product_id or 0))
+        categories, duplicates = cursor.fetchone()
+    finally:
+        db.release_connection(connection)
+
+    # save_product permite omitir la categoría
+    if category_id is not None and not categories:
+        return "CATEGORY_NOT_FOUND"
+    if duplicates:
+        return "PRODUCT_EXISTS"
+    return None
+
+
+def integrity_error_message(error):
+    # Dos altas simultáneas pueden pasar validate_write; el índice único y la llave foránea deciden
+    if not isinstance(error, pymysql.err.IntegrityError):
+        return None
+    if error.args[0] == ER.DUP_ENTRY:
+        return "PRODUCT_EXISTS"
+    if error.args[0] in (ER.NO_REFERENCED_ROW, ER.NO_REFERENCED_ROW_2):
+        return "CATEGORY_NOT_FOUND"
+    return None
@@ -0,0 +1,34 @@
+import json
+
+from balu_common import aws
+
+
+class LocalQueue:
+    # Sustituto en memoria de una cola SQS para pruebas y ejecución local
+
+    def __init__(self, handler=None):
+        self.jobs = []
+        self.handler = handler
+
+    def send(self, job):
+        self.jobs.append(job)
+
+    def drain(self, handler=None):
+        handler = handler or self.handler
+        while self.jobs:
+            handler(self.jobs.pop(0))
+
+    def drain_batches(self, handler, size):
+        # Igual que un evento SQS con BatchSize: el manejador recibe una lista de trabajos
+        while self.jobs:
+            batch, self.jobs = self.jobs[:size], self.jobs[size:]
+            handler(batch)
+
+
+class SQSQueue:
+
+    def __init__(self, queue_url):
+        self.queue_url = queue_url
+
+    def send(self, job):
+        aws.get_client('sqs').send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(job))
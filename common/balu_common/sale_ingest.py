@@ -0,0 +1,221 @@
+import os
+import json
+import uuid
+import logging
+from datetime import datetime, timezone
+
+from balu_common import db, idempotency, inventory, sales_summary
+from balu_common.queues import LocalQueue, SQSQueue
+
+logger = logging.getLogger()
+
+# "queue": save_sale solo valida y encola; sale_worker escribe las ventas por lotes. "sync": escritura directa
+MODE = os.environ.get("SALE_INGEST_MODE", "sync")
+QUEUE_URL = os.environ.get("SALE_QUEUE_URL", "")
+# Igual al BatchSize de SaleWorkerFunction; lo usa la cola local al drenar
+BATCH_SIZE = int(os.environ.get("SALE_BATCH_SIZE", "100"))
+
+
+def is_enabled():
+    return MODE == "queue"
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = SQSQueue(QUEUE_URL) if QUEUE_URL else LocalQueue()
+    return _queue
+
+
+def set_queue(queue):
+    global _queue
+    _queue = queue
+
+
+def reset():
+    global _queue
+    _queue = None
+
+
+def validate(products, total):
+    # Lo que se puede revisar sin la base; existencia y stock los revisa el consumidor
+    if not isinstance(total, (int, float)) or total < 0:
+        raise ValueError("INVALID_TOTAL")
+    for product in products:
+        if not isinstance(product, dict):
+            raise ValueError("INVALID_PRODUCT")
+        if not isinstance(product.get('id'), int) or not isinstance(product.get('quantity'), int):
+            raise ValueError("INVALID_PRODUCT")
+        if product['quantity'] <= 0:
+            raise ValueError(f"Product with id {product['id']} has invalid quantity")
+
+
+def enqueue(body, idempotency_key=None):
+    # Sin llave del cliente se usa una propia para que una entrega repetida de SQS no duplique la venta
+    ingest_id = str(uuid.uuid4())
+    get_queue().send({
+        "ingest_id": ingest_id,
+        "idempotency_key": idempotency_key or f"ingest:{ingest_id}",
+        "client_id": None,
+        "request_hash": idempotency.request_hash(body),
+        "products": body['products'],
+        "total": body['total'],
+        # RDS y Lambda trabajan en UTC; la venta cuenta en el día en que se aceptó, no en el que se escribió
+        "created_at": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    })
+    return ingest_id
+
+
+def _lock_stock(cursor, jobs):
+    product_ids = sorted({product['id'] for job in jobs for product in job['products']})
+    if not product_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"SELECT id, stock FROM products WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE", product_ids)
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def synced_sales(cursor, client_ids):
+    # Las ventas de sync_sales guardan su client_id en sales para siempre; la llave de idempotencia vence
+    client_ids = sorted(set(client_ids))
+    if not client_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(client_ids))
+    cursor.execute(f"SELECT client_id, id FROM sales WHERE client_id IN ({placeholders})", client_ids)
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def requested_quantities(products):
+    # Cantidad total por producto, por si se repite en el carrito
+    requested = {}
+    for product in products:
+        requested[product['id']] = requested.get(product['id'], 0) + product['quantity']
+    return requested
+
+
+def reserve(products, stock):
+    """Descuenta el carrito del stock en memoria si alcanza para todas sus líneas.
+
+    Devuelve las cantidades reservadas o el motivo del rechazo.
+    """
+    requested = requested_quantities(products)
+    for product_id, quantity in requested.items():
+        if product_id not in stock:
+            return None, "PRODUCT_NOT_FOUND"
+        if stock[product_id] < quantity:
+            return None, "INSUFFICIENT_STOCK"
+    for product_id, quantity in requested.items():
+        stock[product_id] -= quantity
+    return requested, None
+
+
+def write_batch(jobs):
+    """Escribe un lote de ventas en una sola transacción.
+
+    Devuelve, en el orden de jobs, un resultado por venta: SALE_SAVED con su sale_id, DUPLICATE si su llave de
+    idempotencia ya estaba escrita, o el motivo del rechazo (PRODUCT_NOT_FOUND, INSUFFICIENT_STOCK,
+    IDEMPOTENCY_KEY_REUSED). Las ventas rechazadas no dejan su llave reservada.
+    """
+    results = [None] * len(jobs)
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        connection.begin()
+
+        fresh = []
+        for index, job in enumerate(jobs):
+            try:
+                stored = idempotency.claim(cursor, job['idempotency_key'], job['request_hash'])
+            except idempotency.KeyReusedError:
+                results[index] = {"message": "IDEMPOTENCY_KEY_REUSED"}
+                continue
+            if stored is None:
+                fresh.append(index)
+            else:
+                # Un repetido dentro del mismo lote todavía no tiene respuesta guardada
+                stored_body = json.loads(stored["body"]) if stored["body"] else {}
+                results[index] = {"message": "DUPLICATE", "sale_id": stored_body.get("sale_id")}
+
+        # Una venta sincronizada hace tiempo ya no tiene llave, pero su client_id sigue en sales
+        synced = synced_sales(cursor, [jobs[index]['client_id'] for index in fresh if jobs[index].get('client_id')])
+        for index in [index for index in fresh if jobs[index].get('client_id') in synced]:
+            sale_id = synced[jobs[index]['client_id']]
+            idempotency.store(cursor, jobs[index]['idempotency_key'], 200, json.dumps({
+                "message": "SALE_SAVED",
+                "sale_id": sale_id
+            }))
+            results[index] = {"message": "DUPLICATE", "sale_id": sale_id}
+            fresh.remove(index)
+
+        stock = _lock_stock(cursor, [jobs[index] for index in fresh])
+        accepted, quantities, rejected = [], {}, []
+        for index in fresh:
+            requested, reason = reserve(jobs[index]['products'], stock)
+            if requested is None:
+                results[index] = {"message": reason}
+                rejected.append(jobs[index])
+                continue
+            accepted.append(index)
+            for product_id, quantity in requested.items():
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        if rejected:
+            # Sin la reserva de la llave, un reintento vuelve a intentar escribir la venta
+            placeholders = ", ".join(["%s"] * len(rejected))
+            cursor.execute(f"DELETE FROM idempotency_keys WHERE idempotency_key IN ({placeholders})",
+                           [job['idempotency_key'] for job in rejected])
+
+        if accepted:
+            sale_ids = write_sales(cursor, [jobs[index] for index in accepted], quantities)
+            for index, sale_id in zip(accepted, sale_ids):
+                results[index] = {"message": "SALE_SAVED", "sale_id": sale_id}
+
+        connection.commit()
+    finally:
+        db.release_connection(connection)
+
+    logger.info("Sale batch: %s written, %s rejected, %s duplicates", len(accepted), len(rejected),
+                len(jobs) - len(fresh))
+    return results
+
+
+def process_batch(jobs):
+    # Para sale_worker: los ingest_id que SQS debe reintentar; una llave reutilizada con otro cuerpo no se reintenta
+    results = write_batch(jobs)
+    return [job['ingest_id'] for job, result in zip(jobs, results)
+            if result["message"] in ("PRODUCT_NOT_FOUND", "INSUFFICIENT_STOCK")]
+
+
+def write_sales(cursor, jobs, quantities):
+    # Un INSERT de varias filas asigna ids consecutivos, así que el id de cada venta sale de lastrowid
+    rows = ", ".join(["(%s, 1, %s, %s)"] * len(jobs))
+    cursor.execute(f"INSERT INTO sales (total, status, createdAt, client_id) VALUES {rows}",
+                   [value for job in jobs for value in (job['total'], job['created_at'], job.get('client_id'))])
+    first_id = cursor.lastrowid
+    sale_ids = list(range(first_id, first_id + len(jobs)))
+
+    cursor.executemany("INSERT INTO sales_products (sale_id, product_id, quantity) VALUES (%s, %s, %s)",
+                       [(sale_id, product['id'], product['quantity'])
+                        for sale_id, job in zip(sale_ids, jobs) for product in job['products']])
+
+    # Un solo UPDATE con el descuento acumulado de todo el lote
+    product_ids = sorted(quantities)
+    cases = " ".join(["WHEN %s THEN %s"] * len(product_ids))
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    params = [value for product_id in product_ids for value in (product_id, quantities[product_id])]
+    cursor.execute(f"UPDATE products SET stock = stock - CASE id {cases} END WHERE id IN ({placeholders})",
+                   params + product_ids)
+
+    inventory.record_sales(cursor, sale_ids[0], sale_ids[-1])
+    sales_summary.record_sales(cursor, sale_ids[0], sale_ids[-1])
+
+    # La respuesta que save_sale habría devuelto, para un reintento que llegue ya en modo síncrono
+    for sale_id, job in zip(sale_ids, jobs):
+        idempotency.store(cursor, job['idempotency_key'], 200, json.dumps({
+            "message": "SALE_SAVED",
+            "sale_id": sale_id
+        }))
+    return sale_ids
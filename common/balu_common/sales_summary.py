@@ -0,0 +1,227 @@
+import sys
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from balu_common import db
+
+logger = logging.getLogger()
+
+# Filas por día en daily_sales_summary. Cada escritura suma en una al azar y las lecturas suman todas, así
+# dos ventas simultáneas casi nunca esperan el bloqueo de la misma fila. Las filas por producto no se
+# reparten: la venta ya bloquea la fila del producto al descontar el stock
+DAY_SLOTS = 16
+
+# Suma (signo 1) o resta (signo -1) una venta en el resumen del día en que se creó
+DAY_UPSERT = """
+    INSERT INTO daily_sales_summary (sale_date, slot, total_sales, total_transactions, cancelled_transactions)
+    SELECT DATE(createdAt), %s, total * %s, %s, %s FROM sales WHERE id = %s
+    ON DUPLICATE KEY UPDATE
+        total_sales = total_sales + VALUES(total_sales),
+        total_transactions = total_transactions + VALUES(total_transactions),
+        cancelled_transactions = cancelled_transactions + VALUES(cancelled_transactions)
+"""
+
+PRODUCT_UPSERT = """
+    INSERT INTO daily_sales_product_summary (sale_date, product_id, quantity, transactions)
+    SELECT DATE(s.createdAt), sp.product_id, SUM(sp.quantity) * %s, %s
+    FROM sales s
+    JOIN sales_products sp ON sp.sale_id = s.id
+    WHERE s.id = %s
+    GROUP BY DATE(s.createdAt), sp.product_id
+    ON DUPLICATE KEY UPDATE
+        quantity = quantity + VALUES(quantity),
+        transactions = transactions + VALUES(transactions)
+"""
+
+# Acumulado histórico por producto que ordena el ranking de top_sold_products. Lleva la categoría del
+# producto para que el ranking por categoría lea idx_product_sales_totals_category; la fila del producto ya
+# está bloqueada por el cambio de stock, y sync_categories la corrige cuando el producto cambia de categoría
+TOTALS_UPSERT = """
+    INSERT INTO product_sales_totals (product_id, category_id, quantity)
+    SELECT sp.product_id, p.category_id, SUM(sp.quantity) * %s
+    FROM sales_products sp
+    JOIN products p ON p.id = sp.product_id
+    WHERE sp.sale_id = %s
+    GROUP BY sp.product_id, p.category_id
+    ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+"""
+
+# Variantes por rango de ids para los lotes de sale_worker: ids consecutivos de un solo INSERT de varias filas
+DAY_RANGE_UPSERT = """
+    INSERT INTO daily_sales_summary (sale_date, slot, total_sales, total_transactions, cancelled_transactions)
+    SELECT DATE(createdAt), %s, SUM(total), COUNT(*), 0 FROM sales WHERE id BETWEEN %s AND %s
+    GROUP BY DATE(createdAt)
+    ON DUPLICATE KEY UPDATE
+        total_sales = total_sales + VALUES(total_sales),
+        total_transactions = total_transactions + VALUES(total_transactions)
+"""
+
+PRODUCT_RANGE_UPSERT = """
+    INSERT INTO daily_sales_product_summary (sale_date, product_id, quantity, transactions)
+    SELECT DATE(s.createdAt), sp.product_id, SUM(sp.quantity), COUNT(DISTINCT s.id)
+    FROM sales s
+    JOIN sales_products sp ON sp.sale_id = s.id
+    WHERE s.id BETWEEN %s AND %s
+    GROUP BY DATE(s.createdAt), sp.product_id
+    ON DUPLICATE KEY UPDATE
+        quantity = quantity + VALUES(quantity),
+        transactions = transactions + VALUES(transactions)
+"""
+
+TOTALS_RANGE_UPSERT = """
+    INSERT INTO product_sales_totals (product_id, category_id, quantity)
+    SELECT sp.product_id, p.category_id, SUM(sp.quantity)
+    FROM sales_products sp
+    JOIN products p ON p.id = sp.product_id
+    WHERE sp.sale_id BETWEEN %s AND %s
+    GROUP BY sp.product_id, p.category_id
+    ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+"""
+
+# Resta de un grupo de ventas canceladas, agrupada por día y producto
+DAY_CANCEL_UPSERT = """
+    INSERT INTO daily_sales_summary (sale_date, slot, total_sales, total_transactions, cancelled_transactions)
+    SELECT DATE(createdAt), %s, -SUM(total), -COUNT(*), COUNT(*) FROM sales WHERE id IN ({ids})
+    GROUP BY DATE(createdAt)
+    ON DUPLICATE KEY UPDATE
+        total_sales = total_sales + VALUES(total_sales),
+        total_transactions = total_transactions + VALUES(total_transactions),
+        cancelled_transactions = cancelled_transactions + VALUES(cancelled_transactions)
+"""
+
+PRODUCT_CANCEL_UPSERT = """
+    INSERT INTO daily_sales_product_summary (sale_date, product_id, quantity, transactions)
+    SELECT DATE(s.createdAt), sp.product_id, -SUM(sp.quantity), -COUNT(DISTINCT s.id)
+    FROM sales s
+    JOIN sales_products sp ON sp.sale_id = s.id
+    WHERE s.id IN ({ids})
+    GROUP BY DATE(s.createdAt), sp.product_id
+    ON DUPLICATE KEY UPDATE
+        quantity = quantity + VALUES(quantity),
+        transactions = transactions + VALUES(transactions)
+"""
+
+TOTALS_CANCEL_UPSERT = """
+    INSERT INTO product_sales_totals (product_id, category_id, quantity)
+    SELECT sp.product_id, p.category_id, -SUM(sp.quantity)
+    FROM sales_products sp
+    JOIN products p ON p.id = sp.product_id
+    WHERE sp.sale_id IN ({ids})
+    GROUP BY sp.product_id, p.category_id
+    ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+"""
+
+# Copia la categoría actual de los productos a su acumulado
+CATEGORY_SYNC = """
+    UPDATE product_sales_totals t
+    JOIN products p ON p.id = t.product_id
+    SET t.category_id = p.category_id
+    WHERE t.product_id IN ({ids})
+"""
+
+
+def _slot():
+    return random.randrange(DAY_SLOTS)
+
+
+def record_sale(cursor, sale_id):
+    cursor.execute(DAY_UPSERT, (_slot(), 1, 1, 0, sale_id))
+    cursor.execute(PRODUCT_UPSERT, (1, 1, sale_id))
+    cursor.execute(TOTALS_UPSERT, (1, sale_id))
+
+
+def record_sales(cursor, first_id, last_id):
+    # Tres sentencias para todo el lote en lugar de tres por venta
+    cursor.execute(DAY_RANGE_UPSERT, (_slot(), first_id, last_id))
+    cursor.execute(PRODUCT_RANGE_UPSERT, (first_id, last_id))
+    cursor.execute(TOTALS_RANGE_UPSERT, (first_id, last_id))
+
+
+def record_cancellations(cursor, sale_ids):
+    # Tres sentencias para cualquier número de ventas canceladas
+    ids = ", ".join(["%s"] * len(sale_ids))
+    cursor.execute(DAY_CANCEL_UPSERT.format(ids=ids), [_slot()] + list(sale_ids))
+    cursor.execute(PRODUCT_CANCEL_UPSERT.format(ids=ids), list(sale_ids))
+    cursor.execute(TOTALS_CANCEL_UPSERT.format(ids=ids), list(sale_ids))
+
+
+def sync_categories(cursor, product_ids):
+    # Lo llaman update_product e import_products en la misma transacción que cambia la categoría
+    if product_ids:
+        ids = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(CATEGORY_SYNC.format(ids=ids), list(product_ids))
+
+
+def rebuild(connection, start_date=None, end_date=None):
+    # Recalcula el resumen desde sales/sales_products; sin fechas recorre todo el historial.
+    # Las tablas las crea la migración 3 de balu_common.migrations; cada día queda en el slot 0
+    if start_date is not None:
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date or start_date, '%Y-%m-%d') + timedelta(days=1)
+        day_filter = "sale_date >= %s AND sale_date < %s"
+        sale_filter = "AND s.createdAt >= %s AND s.createdAt < %s"
+        params = (start.date(), end.date())
+    else:
+        day_filter = "1 = 1"
+        sale_filter = ""
+        params = ()
+
+    cursor = connection.cursor()
+    connection.begin()
+    try:
+        cursor.execute(f"DELETE FROM daily_sales_summary WHERE {day_filter}", params)
+        cursor.execute(f"DELETE FROM daily_sales_product_summary WHERE {day_filter}", params)
+        cursor.execute(f"""
+            INSERT INTO daily_sales_summary (sale_date, total_sales, total_transactions, cancelled_transactions)
+            SELECT DATE(s.createdAt), COALESCE(SUM(CASE WHEN s.status = 1 THEN s.total END), 0),
+                   SUM(s.status = 1), SUM(s.status = 0)
+            FROM sales s
+            WHERE 1 = 1 {sale_filter}
+            GROUP BY DATE(s.createdAt)
+        """, params)
+        days = cursor.rowcount
+        cursor.execute(f"""
+            INSERT INTO daily_sales_product_summary (sale_date, product_id, quantity, transactions)
+            SELECT DATE(s.createdAt), sp.product_id, SUM(sp.quantity), COUNT(DISTINCT s.id)
+            FROM sales s
+            JOIN sales_products sp ON sp.sale_id = s.id
+            WHERE s.status = 1 {sale_filter}
+            GROUP BY DATE(s.createdAt), sp.product_id
+        """, params)
+        if start_date is None:
+            # El acumulado histórico solo se puede recalcular sobre todo el historial
+            cursor.execute("DELETE FROM product_sales_totals")
+            cursor.execute("""
+                INSERT INTO product_sales_totals (product_id, category_id, quantity)
+                SELECT sp.product_id, p.category_id, SUM(sp.quantity)
+                FROM sales s
+                JOIN sales_products sp ON sp.sale_id = s.id
+                JOIN products p ON p.id = sp.product_id
+                WHERE s.status = 1
+                GROUP BY sp.product_id, p.category_id
+            """)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return days
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales summary tables from sales history")
+    parser.add_argument("--start", help="first day to rebuild (YYYY-MM-DD); omit to rebuild all history")
+    parser.add_argument("--end", help="last day to rebuild (YYYY-MM-DD); defaults to --start")
+    args = parser.parse_args(argv)
+
+    connection = db.get_connection()
+    try:
+        days = rebuild(connection, args.start, args.end)
+    finally:
+        db.release_connection(connection)
+    print(f"Rebuilt daily sales summary for {days} day(s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
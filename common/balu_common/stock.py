@@ -0,0 +1,28 @@
+import logging
+
+logger = logging.getLogger()
+
+DECREMENT = "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s"
+
+
+class InsufficientStockError(ValueError):
+    # Es un ValueError para que los handlers respondan 400 con el mismo mensaje que la validación previa
+    def __init__(self, product_id):
+        super().__init__(f"Product with id {product_id} does not have enough stock")
+        self.product_id = product_id
+
+
+def decrement(cursor, quantities):
+    """Descuenta el stock de cada producto solo si alcanza, sin leerlo ni bloquearlo antes.
+
+    La condición va en el WHERE, así que el bloqueo de la fila dura desde el UPDATE hasta el commit y no
+    desde la lectura. Los productos se recorren por id para que dos carritos con los mismos productos
+    tomen los bloqueos en el mismo orden. Si una fila no cambia, lanza InsufficientStockError y la
+    transacción debe deshacerse.
+    """
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        cursor.execute(DECREMENT, (quantity, product_id, quantity))
+        if cursor.rowcount == 0:
+            logger.info("Stock of product %s is below %s", product_id, quantity)
+            raise InsufficientStockError(product_id)
@@ -0,0 +1,35 @@
+import os
+import time
+import random
+import logging
+import pymysql
+from pymysql.constants import ER
+
+logger = logging.getLogger()
+
+# Deadlock o espera de bloqueo agotada: InnoDB abortó la transacción (o la sentencia) y se puede repetir completa
+RETRYABLE_ERRORS = (ER.LOCK_DEADLOCK, ER.LOCK_WAIT_TIMEOUT)
+MAX_ATTEMPTS = int(os.environ.get("DB_MAX_ATTEMPTS", "3"))
+# Segundos; el tope se duplica en cada intento y la espera se elige al azar por debajo de él
+RETRY_BASE_DELAY = 0.05
+
+
+def is_retryable(error):
+    return isinstance(error, pymysql.err.OperationalError) and error.args[0] in RETRYABLE_ERRORS
+
+
+def run_with_retry(connection, transaction, attempts=MAX_ATTEMPTS):
+    """Ejecuta transaction() y la repite si InnoDB la aborta por un deadlock o una espera agotada.
+
+    La espera aleatoria evita que los compradores del mismo producto vuelvan a chocar al mismo tiempo.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return transaction()
+        except pymysql.err.OperationalError as e:
+            if not is_retryable(e) or attempt == attempts:
+                raise
+            # Una espera agotada solo deshace la sentencia; se deshace todo antes de volver a empezar
+            connection.rollback()
+            logger.warning("Retrying transaction after lock error (attempt %s): %s", attempt, str(e))
+            time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
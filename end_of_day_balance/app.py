@@ -2,38 +2,8 @@ import json
 import pymysql
 from datetime import datetime
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import db
 
 def lambda_handler(event, __):
     headers = {
@@ -95,7 +65,7 @@ def validate_date(date_string):
 
 def connect_to_database():
     try:
-        connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+        connection = db.get_connection()
         return connection
     except pymysql.MySQLError as e:
         raise Exception("ERROR CONNECTING TO DATABASE: " + str(e))
@@ -103,53 +73,25 @@ def connect_to_database():
 def get_end_of_day_balance(date):
     connection = connect_to_database()
     cursor = connection.cursor()
+    # Lee los totales ya acumulados por save_sale y cancel_sales en lugar de recorrer las ventas del día;
+    # el resumen del día está repartido en varias filas, por eso se suman
     cursor.execute("""
-        WITH daily_sales AS (
-            SELECT
-                sp.product_id,
-                p.name AS product_name,
-                SUM(sp.quantity) AS total_quantity,
-                COUNT(DISTINCT s.id) AS transaction_count
-            FROM
-                sales_products sp
-            JOIN
-                products p ON sp.product_id = p.id
-            JOIN
-                sales s ON sp.sale_id = s.id
-            WHERE
-                DATE(s.createdAt) = %s
-                AND s.status = 1
-            GROUP BY
-                sp.product_id, p.name
-        ),
-        total_transactions AS (
-            SELECT
-                COUNT(DISTINCT s.id) AS total_transactions,
-                SUM(s.total) AS total_sales
-            FROM
-                sales s
-            WHERE
-                DATE(s.createdAt) = %s
-                AND s.status = 1
-        ),
-        cancelled_transactions AS (
-            SELECT
-                COUNT(DISTINCT s.id) AS cancelled_transactions
-            FROM
-                sales s
-            WHERE
-                DATE(s.createdAt) = %s
-                AND s.status = 0
-        )
         SELECT
-            COALESCE((SELECT product_name FROM daily_sales ORDER BY total_quantity DESC LIMIT 1), 'No data') AS most_sold_product,
-            COALESCE((SELECT AVG(total_sales / total_transactions) FROM total_transactions), 0) AS average_sale,
-            COALESCE((SELECT total_sales FROM total_transactions), 0) AS total_sales_today,
-            COALESCE((SELECT total_transactions FROM total_transactions), 0) AS total_transactions_today,
-            COALESCE((SELECT cancelled_transactions FROM cancelled_transactions), 0) AS total_cancelled_transactions;
-    """, (date, date, date))
+            COALESCE((
+                SELECT p.name
+                FROM daily_sales_product_summary dps
+                JOIN products p ON dps.product_id = p.id
+                WHERE dps.sale_date = %s AND dps.quantity > 0
+                ORDER BY dps.quantity DESC
+                LIMIT 1
+            ), 'No data') AS most_sold_product,
+            COALESCE((SELECT SUM(total_sales) / NULLIF(SUM(total_transactions), 0) FROM daily_sales_summary WHERE sale_date = %s), 0) AS average_sale,
+            COALESCE((SELECT SUM(total_sales) FROM daily_sales_summary WHERE sale_date = %s), 0) AS total_sales_today,
+            COALESCE((SELECT SUM(total_transactions) FROM daily_sales_summary WHERE sale_date = %s), 0) AS total_transactions_today,
+            COALESCE((SELECT SUM(cancelled_transactions) FROM daily_sales_summary WHERE sale_date = %s), 0) AS total_cancelled_transactions;
+    """, (date, date, date, date, date))
     result = cursor.fetchone()
-    connection.close()
+    db.release_connection(connection)
     balance = {
         "most_sold_product": result[0],
         "average_sale": result[1],
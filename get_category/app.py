@@ -1,38 +1,8 @@
 import json
 import pymysql
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import catalog_cache, db, http_cache
 
 
 def decimal_to_float(obj):
@@ -44,7 +14,8 @@ def lambda_handler(event, __):
     headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token, If-None-Match",
+        "Access-Control-Expose-Headers": "ETag"
     }
 
     try:
@@ -68,17 +39,16 @@ def lambda_handler(event, __):
                     }),
                 }
 
-        result = get_all_categories(status)
+        # Se guarda la respuesta ya serializada con su ETag, así un 304 no consulta ni serializa nada
+        listing = catalog_cache.get_or_load(f"categories:{status}", lambda: render_categories(status))
 
-        body = {
-            "message": "CATEGORIES_FETCHED",
-            "categories": result
-        }
+        if http_cache.matches_if_none_match(event, listing["etag"]):
+            return http_cache.not_modified(headers, listing["etag"])
 
         return {
             "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps(body, default=decimal_to_float)
+            "headers": dict(headers, ETag=listing["etag"]),
+            "body": listing["body"]
         }
     except Exception as e:
         return {
@@ -90,8 +60,15 @@ def lambda_handler(event, __):
             }),
         }
 
+def render_categories(status):
+    body = json.dumps({
+        "message": "CATEGORIES_FETCHED",
+        "categories": get_all_categories(status)
+    }, default=decimal_to_float)
+    return {"body": body, "etag": http_cache.etag_for(body)}
+
 def get_all_categories(status):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
 
@@ -108,4 +85,4 @@ def get_all_categories(status):
     except Exception as e:
         raise
     finally:
-        connection.close()
+        db.release_connection(connection)
@@ -1,38 +1,8 @@
 import json
 import pymysql
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import db
 
 def lambda_handler(event, __):
     headers = {
@@ -66,11 +36,12 @@ def get_low_stock_products():
     cursor.execute("select * from products where stock <= 5 and status = 1;", ())
     result = cursor.fetchall()
     result = [dict(zip([column[0] for column in cursor.description], row)) for row in result]
+    db.release_connection(connection)
     return result
 
 def connect_to_database():
     try:
-        connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+        connection = db.get_connection()
         return connection
     except pymysql.MySQLError as e:
         raise Exception("ERROR CONNECTING TO DATABASE: " + str(e))
@@ -1,38 +1,8 @@
 import json
 import pymysql
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import catalog_cache, db
 
 def lambda_handler(event, __):
     headers = {
@@ -73,7 +43,7 @@ def lambda_handler(event, __):
             }
 
         try:
-            product = get_product(product_id)
+            product = catalog_cache.get_or_load(f"product:{product_id}", lambda: get_product(product_id))
         except Exception as e:
             return {
                 "statusCode": 404,
@@ -105,7 +75,7 @@ def lambda_handler(event, __):
 
 def connect_to_database():
     try:
-        connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+        connection = db.get_connection()
         return connection
     except pymysql.MySQLError as e:
         raise Exception("ERROR CONNECTING TO DATABASE: " + str(e))
@@ -116,13 +86,16 @@ def get_product(product_id):
     cursor.execute("SELECT p.*, c.name as category_name FROM products p INNER JOIN categories c ON p.category_id = c.id WHERE p.id = %s", (product_id,))
     result = cursor.fetchone()
 
-    connection.close()
+    db.release_connection(connection)
 
     if result is None:
         raise Exception("PRODUCT_NOT_FOUND")
     else:
         columns = [column[0] for column in cursor.description]
         product = dict(zip(columns, result))
+        # pymysql entrega las columnas JSON como texto
+        if isinstance(product.get("image_variants"), str):
+            product["image_variants"] = json.loads(product["image_variants"])
         return product
 
 def decimal_to_float(obj):
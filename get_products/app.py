@@ -1,81 +1,36 @@
 import json
 import pymysql
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
-import boto3
-from botocore.exceptions import ClientError
-
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
 
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import catalog_cache, db, http_cache
+
+# Columnas que se pueden pedir con ?fields=
+PRODUCT_FIELDS = {
+    "id": "p.id",
+    "name": "p.name",
+    "stock": "p.stock",
+    "price": "p.price",
+    "category_id": "p.category_id",
+    "status": "p.status",
+    "image": "p.image",
+    "image_variants": "p.image_variants",
+    "description": "p.description",
+    "category_name": "c.name AS category_name"
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
 def decimal_to_float(obj):
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
-
 def lambda_handler(event, __):
     headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token, If-None-Match",
+        "Access-Control-Expose-Headers": "ETag"
     }
     try:
         status = None
@@ -92,17 +47,39 @@ def lambda_handler(event, __):
                 }),
             }
 
-        result = get_all_products(status)
+        query = event.get('queryStringParameters') or {}
+        try:
+            after, limit = parse_page(query)
+        except ValueError:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_PAGINATION"
+                }),
+            }
+
+        fields = parse_fields(query)
+        if fields is not None and not set(fields) <= set(PRODUCT_FIELDS):
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_FIELDS"
+                }),
+            }
 
-        body = {
-            "message": "PRODUCTS_FETCHED",
-            "products": result
-        }
+        # Se guarda la respuesta ya serializada con su ETag, así un 304 no consulta ni serializa nada
+        cache_key = f"products:{status}:{after}:{limit}:{','.join(fields or [])}"
+        listing = catalog_cache.get_or_load(cache_key, lambda: render_products(status, after, limit, fields))
+
+        if http_cache.matches_if_none_match(event, listing["etag"]):
+            return http_cache.not_modified(headers, listing["etag"])
 
         return {
             "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps(body, default=decimal_to_float)
+            "headers": dict(headers, ETag=listing["etag"]),
+            "body": listing["body"]
         }
     except Exception as e:
         return {
@@ -114,22 +91,80 @@ def lambda_handler(event, __):
             }),
         }
 
-def get_all_products(status):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+def parse_page(query):
+    after = query.get('after')
+    limit = query.get('limit')
+
+    # Sin parámetros se conserva la lista completa para los clientes existentes; esa respuesta crece con el
+    # catálogo y no tiene límite de memoria, solo after/limit la acotan
+    if after is None and limit is None:
+        return None, None
+
+    after = int(after) if after is not None else 0
+    limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    if after < 0 or limit <= 0 or limit > MAX_PAGE_SIZE:
+        raise ValueError("INVALID_PAGINATION")
+    return after, limit
+
+def parse_fields(query):
+    fields = query.get('fields')
+    if not fields:
+        return None
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    # El id siempre se incluye porque es el cursor de la siguiente página
+    if "id" not in fields:
+        fields.insert(0, "id")
+    return fields
+
+def render_products(status, after=None, limit=None, fields=None):
+    products = get_all_products(status, after, limit, fields)
+    body = {
+        "message": "PRODUCTS_FETCHED",
+        "products": products
+    }
+    if limit is not None:
+        body["next_after"] = products[-1]["id"] if len(products) == limit else None
+    body = json.dumps(body, default=decimal_to_float)
+    return {"body": body, "etag": http_cache.etag_for(body)}
+
+def get_all_products(status, after=None, limit=None, fields=None):
+    if fields is None:
+        columns = "p.*, c.name as category_name"
+    else:
+        columns = ", ".join(PRODUCT_FIELDS[field] for field in fields)
+
+    conditions = []
+    params = []
+    if status != 0:
+        conditions.append("c.status = %s")
+        params.append(status)
+    if after is not None:
+        conditions.append("p.id > %s")
+        params.append(after)
+
+    query = f"select {columns} from products p inner join categories c on p.category_id = c.id"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if limit is not None:
+        query += " ORDER BY p.id LIMIT %s"
+        params.append(limit)
+
+    connection = db.get_connection()
     try:
-        cursor = connection.cursor()
-        if status == 0:
-            cursor.execute("select p.*, c.name as category_name from products p inner join categories c on p.category_id = c.id;")
-        else:
-            cursor.execute("select p.*, c.name as category_name from products p inner join categories c on p.category_id = c.id WHERE c.status = %s", (status,))
-
-        connection.commit()
-
-        result = cursor.fetchall()
-        result = [dict(zip([column[0] for column in cursor.description], row)) for row in result]
+        # SSCursor evita que pymysql guarde su propia copia de las filas además de esta lista; la lista
+        # sigue teniendo todas las filas pedidas, así que sin limit ocupa tanto como el catálogo
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(query, params)
+            names = [column[0] for column in cursor.description]
+            result = [dict(zip(names, row)) for row in cursor]
+
+        # pymysql entrega las columnas JSON como texto
+        for product in result:
+            if isinstance(product.get("image_variants"), str):
+                product["image_variants"] = json.loads(product["image_variants"])
 
         return result
     except Exception as e:
         raise e
     finally:
-        connection.close()
+        db.release_connection(connection)
@@ -0,0 +1,91 @@
+import json
+
+from balu_common import images
+
+# Tipo MIME que envía el cliente -> formato que entiende balu_common.images
+IMAGE_FORMATS = {
+    "image/png": "png",
+    "image/jpeg": "jpeg",
+    "image/jpg": "jpeg"
+}
+
+def lambda_handler(event, __):
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+    }
+    try:
+        claims = event['requestContext']['authorizer']['claims']
+        role = claims['cognito:groups']
+
+        if 'admin' not in role:
+            return {
+                "statusCode": 403,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "FORBIDDEN"
+                }),
+            }
+
+        try:
+            body = json.loads(event['body'])
+        except json.JSONDecodeError:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_JSON_FORMAT"
+                }),
+            }
+
+        content_type = body.get('content_type')
+        if content_type is None:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "MISSING_FIELDS"
+                }),
+            }
+
+        if content_type not in IMAGE_FORMATS:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_CONTENT_TYPE"
+                }),
+            }
+
+        # El cliente sube el archivo directo a S3 y después envía "key" como image_key a /add_product o /update_product
+        upload = images.presigned_upload(IMAGE_FORMATS[content_type])
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "UPLOAD_URL_CREATED",
+                "key": upload["key"],
+                "url": upload["url"],
+                "fields": upload["fields"],
+                "max_bytes": images.MAX_UPLOAD_BYTES
+            }),
+        }
+    except KeyError as e:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "MISSING_KEY",
+                "error": str(e)
+            }),
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "INTERNAL_SERVER_ERROR",
+                "error": str(e)
+            }),
+        }
@@ -0,0 +1,22 @@
+import json
+import logging
+
+from balu_common import images
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, __):
+    # Mensajes de ImageQueue; solo se reintentan los que fallaron, no el lote completo
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            images.process(json.loads(record['body']))
+        except Exception as e:
+            logger.error("Image job %s failed: %s", record.get('messageId'), str(e), exc_info=True)
+            failures.append({"itemIdentifier": record['messageId']})
+    return {"batchItemFailures": failures}
+
+def sweep_handler(event, __):
+    # Ejecución programada (ImageSweepFunction): borra del bucket las imágenes que ningún producto usa
+    return {"deleted": images.sweep()}
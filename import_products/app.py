@@ -0,0 +1,342 @@
+import io
+import re
+import csv
+import json
+import base64
+import pymysql
+
+from balu_common import catalog_cache, db, images, inventory, products, sales_summary
+
+MAX_IMPORT_ROWS = 1000
+# Filas por sentencia para no acercarse a max_allowed_packet
+WRITE_CHUNK_SIZE = 200
+CSV_COLUMNS = ["id", "name", "stock", "price", "category_id", "status", "description", "image_key"]
+INTEGER_FIELDS = {"id": "INVALID_ID", "stock": "INVALID_STOCK", "category_id": "INVALID_CATEGORY_ID", "status": "INVALID_STATUS"}
+
+def lambda_handler(event, __):
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+    }
+    try:
+        claims = event['requestContext']['authorizer']['claims']
+        role = claims['cognito:groups']
+
+        if 'admin' not in role:
+            return {
+                "statusCode": 403,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "FORBIDDEN"
+                }),
+            }
+
+        if 'body' not in event:
+            raise KeyError('body')
+
+        try:
+            rows = parse_rows(event)
+        except (json.JSONDecodeError, csv.Error, UnicodeDecodeError, ValueError):
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_IMPORT_FORMAT"
+                }),
+            }
+
+        if not rows:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "EMPTY_IMPORT"
+                }),
+            }
+
+        if len(rows) > MAX_IMPORT_ROWS:
+            return {
+                "statusCode": 413,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "TOO_MANY_ROWS",
+                    "max_rows": MAX_IMPORT_ROWS
+                }),
+            }
+
+        # Todas las filas se validan contra una sola lectura de categorías y productos y una revisión en S3
+        # de las imágenes distintas
+        category_ids, existing = prefetch()
+        uploaded = images.uploaded_images(row.get('image_key') for row in rows)
+        inserts, updates, errors = validate_rows(rows, category_ids, existing, uploaded)
+        if errors:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_ROWS",
+                    "errors": errors
+                }),
+            }
+
+        new_images = write_rows(inserts, updates)
+        catalog_cache.invalidate()
+        for product_id, image_url in new_images:
+            images.enqueue_variants(product_id, image_url)
+
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "PRODUCTS_IMPORTED",
+                "created": len(inserts),
+                "updated": len(updates)
+            }),
+        }
+    except KeyError as e:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "MISSING_KEY",
+                "error": str(e)
+            }),
+        }
+    except pymysql.err.IntegrityError as e:
+        # Otra petición escribió el mismo nombre o borró la categoría después de la validación; no se guardó nada
+        message = products.integrity_error_message(e)
+        if message:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": message
+                }),
+            }
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "DATABASE_ERROR",
+                "error": str(e)
+            }),
+        }
+    except pymysql.MySQLError as e:
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "DATABASE_ERROR",
+                "error": str(e)
+            }),
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "INTERNAL_SERVER_ERROR",
+                "error": str(e)
+            }),
+        }
+
+def parse_rows(event):
+    body = event['body'] or ""
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode("utf-8")
+
+    request_headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    if request_headers.get('content-type', "").startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(body))
+        unknown = set(reader.fieldnames or []) - set(CSV_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        # Las celdas vacías cuentan como campos ausentes
+        return [{key: value for key, value in row.items() if value not in ("", None)} for row in reader]
+
+    rows = json.loads(body).get('products')
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("'products' must be a list of objects")
+    return rows
+
+def coerce(row):
+    # CSV entrega texto; JSON ya trae números
+    row = dict(row)
+    for field, message in INTEGER_FIELDS.items():
+        if isinstance(row.get(field), str):
+            try:
+                row[field] = int(row[field])
+            except ValueError:
+                return None, message
+    if isinstance(row.get('price'), str):
+        try:
+            row['price'] = float(row['price'])
+        except ValueError:
+            return None, "INVALID_PRICE"
+    return row, None
+
+def validate_row(row):
+    required = ['name', 'stock', 'price', 'category_id'] if row.get('id') is None else ['name', 'stock', 'price', 'category_id', 'status']
+    missing_fields = [field for field in required if row.get(field) is None]
+    if row.get('id') is None and row.get('image_key') is None:
+        missing_fields.append('image_key')
+    if missing_fields:
+        return "MISSING_FIELDS"
+
+    name = row['name']
+    if not isinstance(name, str) or not name.strip() or not re.match(r'^[\w\s.-]+$', name):
+        return "INVALID_NAME"
+    if row.get('id') is not None and (not isinstance(row['id'], int) or row['id'] <= 0):
+        return "INVALID_ID"
+    if not isinstance(row['stock'], int) or row['stock'] < 0:
+        return "INVALID_STOCK"
+    if not isinstance(row['price'], (int, float)) or row['price'] <= 0:
+        return "INVALID_PRICE"
+    if not isinstance(row['category_id'], int) or row['category_id'] <= 0:
+        return "INVALID_CATEGORY_ID"
+    if row.get('status') is not None and row['status'] not in (0, 1):
+        return "INVALID_STATUS"
+    description = row.get('description')
+    if description is not None and (not isinstance(description, str) or len(description) > 255):
+        return "DESCRIPTION_TOO_LONG"
+    return None
+
+def prefetch():
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM categories")
+        category_ids = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT id, category_id, name, image FROM products")
+        existing = {row[0]: {"category_id": row[1], "name": row[2], "image": row[3]} for row in cursor.fetchall()}
+        return category_ids, existing
+    finally:
+        db.release_connection(connection)
+
+def validate_rows(rows, category_ids, existing, uploaded):
+    # Mismas reglas que save_product y update_product, sin consultas por fila
+    names = {(product["category_id"], product["name"].lower()): product_id for product_id, product in existing.items()}
+    seen = set()
+    updated_ids = set()
+    inserts, updates, errors = [], [], []
+
+    for number, raw in enumerate(rows, start=1):
+        row, message = coerce(raw)
+        message = message or validate_row(row)
+        if message is None and row['category_id'] not in category_ids:
+            message = "CATEGORY_NOT_FOUND"
+        if message is None and row.get('id') is not None and row['id'] not in existing:
+            message = "PRODUCT_NOT_FOUND"
+        if message is None and row.get('id') in updated_ids:
+            message = "DUPLICATE_ROW"
+        if message is None:
+            name_key = (row['category_id'], row['name'].lower())
+            owner = names.get(name_key)
+            if name_key in seen or (owner is not None and owner != row.get('id')):
+                message = "PRODUCT_EXISTS"
+            seen.add(name_key)
+            if row.get('id') is not None:
+                updated_ids.add(row['id'])
+        if message is None and row.get('image_key') is not None and row['image_key'] not in uploaded:
+            message = "INVALID_IMAGE"
+
+        if message is not None:
+            errors.append({"row": number, "message": message})
+            continue
+
+        product = {
+            "id": row.get('id'),
+            "name": row['name'],
+            "stock": row['stock'],
+            "price": row['price'],
+            "category_id": row['category_id'],
+            "status": 1 if row.get('status') is None else row['status'],
+            "description": row.get('description') or "Sin descripción",
+            "image": images.public_url(row['image_key']) if row.get('image_key') is not None else None
+        }
+        if product["id"] is None:
+            inserts.append(product)
+        else:
+            # Una imagen igual a la actual conserva sus variantes
+            if product["image"] == existing[product["id"]]["image"]:
+                product["image"] = None
+            updates.append(product)
+
+    return inserts, updates, errors
+
+def chunks(items, size=WRITE_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def insert_products(cursor, inserts):
+    # executemany de pymysql agrupa un INSERT ... VALUES en sentencias de varias filas
+    for chunk in chunks(inserts):
+        cursor.executemany(
+            "INSERT INTO products (name, stock, price, category_id, status, image, description) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [(p["name"], p["stock"], p["price"], p["category_id"], p["status"], p["image"], p["description"]) for p in chunk]
+        )
+
+def inserted_ids(cursor, inserts):
+    # Los ids se buscan por (category_id, name), que es único, sin suponer que AUTO_INCREMENT los dio seguidos
+    ids = {}
+    for chunk in chunks(inserts):
+        placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+        cursor.execute(f"SELECT id, category_id, name FROM products WHERE (category_id, name) IN ({placeholders})",
+                       [value for p in chunk for value in (p["category_id"], p["name"])])
+        for product_id, category_id, name in cursor.fetchall():
+            ids[(category_id, name.lower())] = product_id
+    return [(ids[(p["category_id"], p["name"].lower())], p["image"]) for p in inserts]
+
+def current_stock(cursor, updates):
+    # Bloqueado hasta el commit: una venta simultánea no puede cambiarlo entre esta lectura y el UPDATE
+    stock = {}
+    for chunk in chunks(updates):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"SELECT id, stock FROM products WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE",
+                       sorted(p["id"] for p in chunk))
+        stock.update(cursor.fetchall())
+    return stock
+
+def update_products(cursor, updates):
+    # Un UPDATE con JOIN sobre las filas nuevas actualiza todo el bloque en una sentencia
+    row = "SELECT %s AS id, %s AS name, %s AS stock, %s AS price, %s AS category_id, %s AS status, %s AS description, %s AS image"
+    for chunk in chunks(updates):
+        values = " UNION ALL ".join([row] * len(chunk))
+        cursor.execute(
+            f"""
+            UPDATE products p
+            JOIN ({values}) v ON p.id = v.id
+            SET p.name = v.name, p.stock = v.stock, p.price = v.price, p.category_id = v.category_id,
+                p.status = v.status, p.description = v.description,
+                p.image_variants = IF(v.image IS NULL, p.image_variants, NULL),
+                p.image = COALESCE(v.image, p.image)
+            """,
+            [value for p in chunk for value in (p["id"], p["name"], p["stock"], p["price"], p["category_id"],
+                                                p["status"], p["description"], p["image"])]
+        )
+
+def write_rows(inserts, updates):
+    # Todo o nada: si una fila falla en la base no queda una carga a medias
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        connection.begin()
+        stock = current_stock(cursor, updates)
+        update_products(cursor, updates)
+        for chunk in chunks(updates):
+            sales_summary.sync_categories(cursor, [p["id"] for p in chunk])
+        insert_products(cursor, inserts)
+        new_images = inserted_ids(cursor, inserts) if inserts else []
+        # Cada cambio de stock queda en el libro de inventario como ajuste; los productos nuevos parten de cero
+        deltas = {p["id"]: p["stock"] - stock[p["id"]] for p in updates}
+        deltas.update({product_id: p["stock"] for (product_id, _), p in zip(new_images, inserts)})
+        inventory.record_adjustments(cursor, deltas)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        db.release_connection(connection)
+
+    return new_images + [(p["id"], p["image"]) for p in updates if p["image"] is not None]
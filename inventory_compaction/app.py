@@ -0,0 +1,20 @@
+import logging
+
+from balu_common import db, inventory
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, __):
+    # Ejecución programada: suma los movimientos de inventario al snapshot y revisa que products.stock coincida
+    connection = db.get_connection()
+    try:
+        movement_id = inventory.compact(connection)
+        drift = inventory.reconcile(connection.cursor())
+    finally:
+        db.release_connection(connection)
+
+    for product in drift:
+        logger.warning("Stock of product %s is %s but the inventory ledger says %s",
+                       product["product_id"], product["stock"], product["ledger_stock"])
+    return {"movement_id": movement_id, "drift": drift}
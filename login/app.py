@@ -1,6 +1,6 @@
 import json
-import boto3
-from botocore.exceptions import ClientError
+
+from balu_common import aws
 
 
 def lambda_handler(event, __):
@@ -10,7 +10,7 @@ def lambda_handler(event, __):
         "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
     }
 
-    client = boto3.client('cognito-idp', region_name='us-east-2')
+    client = aws.get_client('cognito-idp', 'us-east-2')
     client_id = "13a00gp0ti81p4m6prtdl34jpm"
     try:
         body_parameters = json.loads(event["body"])
@@ -54,13 +54,15 @@ def lambda_handler(event, __):
             })
         }
 
-    except ClientError as e:
-        return {
-            'statusCode': 400,
-            "headers": headers,
-            'body': json.dumps({"error_message": e.response['Error']['Message']})
-        }
     except Exception as e:
+        # botocore se importa solo si hubo un error, igual que boto3 en aws.get_client
+        from botocore.exceptions import ClientError
+        if isinstance(e, ClientError):
+            return {
+                'statusCode': 400,
+                "headers": headers,
+                'body': json.dumps({"error_message": e.response['Error']['Message']})
+            }
         return {
             'statusCode': 500,
             "headers": headers,
@@ -0,0 +1,61 @@
+import json
+import logging
+import importlib
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Ruta y método de API Gateway -> paquete de la función que la atiende
+ROUTES = {
+    ("/update_category", "PUT"): "update_category",
+    ("/get_products/{status}", "GET"): "get_products",
+    ("/change_status_category_or_product", "PATCH"): "change_status_category_or_product",
+    ("/save_category", "POST"): "save_category",
+    ("/cancel_sale/{id}", "PATCH"): "cancel_sales",
+    ("/add_product", "POST"): "save_product",
+    ("/get_categories/{status}", "GET"): "get_category",
+    ("/save_sale", "POST"): "save_sale",
+    ("/update_product", "PUT"): "update_product",
+    ("/history_per_day", "POST"): "view_sales_history_per_day",
+    ("/login", "POST"): "login",
+    ("/new-password", "PATCH"): "newPassword",
+    ("/get_product/{id}", "GET"): "get_one_product",
+    ("/get_top_sold_products", "POST"): "top_sold_products",
+    ("/get_end_of_day_balance", "POST"): "end_of_day_balance",
+    ("/get_low_stock_products", "GET"): "get_low_stock_products",
+    ("/image_upload_url", "POST"): "image_upload_url",
+    ("/import_products", "POST"): "import_products",
+    ("/sync_sales", "POST"): "sync_sales",
+    ("/cancel_sales", "PATCH"): "bulk_cancel_sales",
+}
+
+# Los módulos se importan en la primera petición de cada ruta y se conservan en caliente;
+# todos comparten la conexión y el secreto en caché de balu_common
+_handlers = {}
+
+
+def get_handler(package):
+    if package not in _handlers:
+        _handlers[package] = importlib.import_module(f"{package}.app").lambda_handler
+    return _handlers[package]
+
+
+def lambda_handler(event, context):
+    resource = event.get('resource')
+    method = (event.get('httpMethod') or "").upper()
+
+    package = ROUTES.get((resource, method))
+    if package is None:
+        logger.warning("No route for %s %s", method, resource)
+        return {
+            "statusCode": 404,
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+            },
+            "body": json.dumps({
+                "message": "ROUTE_NOT_FOUND"
+            }),
+        }
+
+    return get_handler(package)(event, context)
@@ -0,0 +1,25 @@
+import json
+import logging
+
+from balu_common import sale_ingest
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, __):
+    # Lote de SaleQueue: todas las ventas se escriben en una transacción y solo se reintentan las rechazadas
+    records = event.get('Records', [])
+    message_ids = {}
+    jobs = []
+    for record in records:
+        job = json.loads(record['body'])
+        message_ids[job['ingest_id']] = record['messageId']
+        jobs.append(job)
+
+    try:
+        rejected = sale_ingest.process_batch(jobs)
+    except Exception as e:
+        logger.error("Sale batch of %s failed: %s", len(jobs), str(e), exc_info=True)
+        return {"batchItemFailures": [{"itemIdentifier": record['messageId']} for record in records]}
+
+    return {"batchItemFailures": [{"itemIdentifier": message_ids[ingest_id]} for ingest_id in rejected]}
@@ -2,38 +2,8 @@ import json
 import pymysql
 import logging
 import re
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import catalog_cache, db
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -93,6 +63,7 @@ def lambda_handler(event, __):
             }
 
         save_category(name, headers)
+        catalog_cache.invalidate()
         return {
             "statusCode": 200,
             "headers": headers,
@@ -129,7 +100,7 @@ def lambda_handler(event, __):
         }
 
 def is_name_duplicate(name):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
         cursor.execute("SELECT COUNT(*) FROM categories WHERE name = %s", (name,))
@@ -139,10 +110,10 @@ def is_name_duplicate(name):
         logger.error("Database query error: %s", str(e))
         return False
     finally:
-        connection.close()
+        db.release_connection(connection)
 
 def save_category(name, headers):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
         cursor.execute("INSERT INTO categories (name, status) VALUES (%s, true)", (name,))
@@ -158,4 +129,4 @@ def save_category(name, headers):
             }),
         }
     finally:
-        connection.close()
+        db.release_connection(connection)
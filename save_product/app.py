@@ -1,53 +1,12 @@
 import json
 import pymysql
 import re
-import boto3
-import uuid
-import base64
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
+from balu_common import catalog_cache, db, images, inventory, products
 
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
-
-bucket_name = "cafe-balu-images"
-s3 = boto3.client('s3')
-
-def upload_image_to_s3(base64_data):
-    # Remover el prefijo de la cadena base64
-    base64_data = base64_data.split(",")[1]
-    binary_data = base64.b64decode(base64_data)
-    file_name = f"images/{uuid.uuid4()}.jpg"
-    s3.put_object(Bucket=bucket_name, Key=file_name, Body=binary_data, ContentType='image/jpeg')
-    s3_url = f"https://{bucket_name}.s3.amazonaws.com/{file_name}"
-    return s3_url
+def upload_image_to_s3(data_url):
+    # Se guarda el original con su tipo real; las miniaturas WebP las genera image_worker
+    return images.public_url(images.store_original(data_url))
 
 def lambda_handler(event, __):
     headers = {
@@ -88,6 +47,8 @@ def lambda_handler(event, __):
         price = body.get('price')
         category_id = body.get('category_id')
         image = body.get('image')
+        # Llave de una imagen ya subida con /image_upload_url; sustituye al base64 en 'image'
+        image_key = body.get('image_key')
         description = "Sin descripción"
 
         if 'description' in body:
@@ -106,7 +67,9 @@ def lambda_handler(event, __):
             description = "Sin descripción"
 
         # Validar campos faltantes: 'name', 'stock', 'price'
-        missing_fields = [field for field in ['name', 'stock', 'price', 'image'] if body.get(field) is None]
+        missing_fields = [field for field in ['name', 'stock', 'price'] if body.get(field) is None]
+        if image is None and image_key is None:
+            missing_fields.append('image')
 
         if missing_fields:
             return {
@@ -158,37 +121,44 @@ def lambda_handler(event, __):
                         "message": "INVALID_CATEGORY_ID"
                     }),
                 }
-            if not category_exists(category_id):
-                return {
-                    "statusCode": 400,
-                    "headers": headers,
-                    "body": json.dumps({
-                        "message": "CATEGORY_NOT_FOUND"
-                    }),
-                }
 
-        if product_exists_in_category(category_id, name):
+        # Categoría y nombre duplicado se validan en una sola consulta
+        validation_error = products.validate_write(category_id, name)
+        if validation_error:
             return {
                 "statusCode": 400,
                 "headers": headers,
                 "body": json.dumps({
-                    "message": "PRODUCT_EXISTS"
+                    "message": validation_error
                 }),
             }
 
-        if is_invalid_image(image):
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({
-                    "message": "INVALID_IMAGE"
-                }),
-            }
+        if image_key is not None:
+            if not images.is_uploaded_image(image_key):
+                return {
+                    "statusCode": 400,
+                    "headers": headers,
+                    "body": json.dumps({
+                        "message": "INVALID_IMAGE"
+                    }),
+                }
+            image_url = images.public_url(image_key)
+        else:
+            if is_invalid_image(image):
+                return {
+                    "statusCode": 400,
+                    "headers": headers,
+                    "body": json.dumps({
+                        "message": "INVALID_IMAGE"
+                    }),
+                }
 
-        # Subir imagen a S3 y obtener la URL
-        image_url = upload_image_to_s3(image)
+            # Subir imagen a S3 y obtener la URL
+            image_url = upload_image_to_s3(image)
 
-        add_product(name, stock, price, category_id, image_url, description)
+        product_id = add_product(name, stock, price, category_id, image_url, description)
+        catalog_cache.invalidate()
+        images.enqueue_variants(product_id, image_url)
         return {
             "statusCode": 200,
             "headers": headers,
@@ -205,6 +175,25 @@ def lambda_handler(event, __):
                 "error": str(e)
             }),
         }
+    except pymysql.err.IntegrityError as e:
+        # Otra petición escribió el mismo nombre o borró la categoría después de validar
+        message = products.integrity_error_message(e)
+        if message:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": message
+                }),
+            }
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "DATABASE_ERROR",
+                "error": str(e)
+            }),
+        }
     except pymysql.MySQLError as e:
         return {
             "statusCode": 500,
@@ -225,49 +214,24 @@ def lambda_handler(event, __):
         }
 
 def add_product(name, stock, price, category_id, image_url, description):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
+        connection.begin()
         cursor.execute("INSERT INTO products (name, stock, price, category_id, status, image, description) VALUES (%s, %s, %s, %s, true, %s, %s)",
                        (name, stock, price, category_id, image_url, description))
+        product_id = cursor.lastrowid
+        # El stock inicial entra al libro como un ajuste desde cero
+        inventory.record_adjustments(cursor, {product_id: stock})
         connection.commit()
+        return product_id
     except Exception as e:
         raise e
     finally:
-        connection.close()
-
-def category_exists(category_id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
-    try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM categories WHERE id = %s", (category_id,))
-        connection.commit()
-        result = cursor.fetchone()
-        if result is None:
-            return False
-        return result[0] > 0
-    except Exception as e:
-        raise e
-    finally:
-        connection.close()
-
-def product_exists_in_category(category_id, name):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
-    try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM products WHERE category_id = %s AND lower(name) = %s", (category_id, name.lower()))
-        connection.commit()
-        result = cursor.fetchone()
-        if result is None:
-            return False
-        return result[0] > 0
-    except Exception as e:
-        raise e
-    finally:
-        connection.close()
+        db.release_connection(connection)
 
 def is_name_duplicate(name):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
         cursor.execute("SELECT COUNT(*) FROM products WHERE lower(name) = %s", (name.lower(),))
@@ -279,7 +243,7 @@ def is_name_duplicate(name):
     except Exception as e:
         raise e
     finally:
-        connection.close()
+        db.release_connection(connection)
 
 def is_invalid_image(image):
     pattern = r"^data:image/(png|jpg|jpeg);base64,([a-zA-Z0-9+/=]+)$"
@@ -1,38 +1,8 @@
 import json
 import pymysql
 import logging
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import db, idempotency, inventory, sale_ingest, sales_summary, stock, transactions
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -41,7 +11,7 @@ def lambda_handler(event, __):
     headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token, Idempotency-Key"
     }
     try:
         claims = event['requestContext']['authorizer']['claims']
@@ -68,9 +38,29 @@ def lambda_handler(event, __):
             logger.error("Products or total not found in the body")
             raise KeyError('products or total')
 
-        products_info = get_products_info(products)
+        # Las terminales reenvían la venta con la misma llave cuando no reciben respuesta
+        idempotency_key = idempotency.get_key(event)
+
+        if sale_ingest.is_enabled():
+            # La venta se escribe después en sale_worker junto con otras; aquí no se abre conexión a RDS
+            sale_ingest.validate(products, total)
+            ingest_id = sale_ingest.enqueue(body, idempotency_key)
+            return {
+                "statusCode": 202,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "SALE_QUEUED",
+                    "ingest_id": ingest_id
+                })
+            }
 
-        response = save_sale(products_info, total, headers)
+        connection = db.get_connection()
+        try:
+            # Un deadlock o una espera agotada en un producto muy vendido repite la venta completa
+            response = transactions.run_with_retry(
+                connection, lambda: checkout(connection, body, products, total, headers, idempotency_key))
+        finally:
+            db.release_connection(connection)
 
         return response
 
@@ -91,6 +81,14 @@ def lambda_handler(event, __):
                 "message": str(e)
             })
         }
+    except idempotency.KeyReusedError:
+        return {
+            "statusCode": 422,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "IDEMPOTENCY_KEY_REUSED"
+            })
+        }
     except Exception as e:
         logger.error("Unexpected error: %s", str(e), exc_info=True)
         return {
@@ -102,62 +100,98 @@ def lambda_handler(event, __):
             })
         }
 
-def get_products_info(products):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
-    try:
-        cursor = connection.cursor()
-        products_info = []
-
-        for product in products:
-            if product['quantity'] <= 0:
-                raise ValueError(f"Product with id {product['id']} has invalid quantity")
+def checkout(connection, body, products, total, headers, idempotency_key):
+    # Validar el stock y registrar la venta en la misma transacción
+    connection.begin()
+    if idempotency_key is not None:
+        stored = idempotency.claim(connection.cursor(), idempotency_key, idempotency.request_hash(body))
+        if stored is not None:
+            logger.info("Replaying stored response for idempotency key %s", idempotency_key)
+            return {
+                "statusCode": stored["statusCode"],
+                "headers": dict(headers, **{"Idempotent-Replayed": "true",
+                                            "Access-Control-Expose-Headers": "Idempotent-Replayed"}),
+                "body": stored["body"]
+            }
 
-            cursor.execute("SELECT id, price, stock FROM products WHERE id = %s", (product['id'],))
-            product_info = cursor.fetchone()
+    products_info = get_products_info(connection, products)
 
-            if product_info is None:
-                raise ValueError(f"Product with id {product['id']} not found")
+    return save_sale(connection, products_info, total, headers, idempotency_key)
 
-            if product_info[2] < product['quantity']:
-                raise ValueError(f"Product with id {product['id']} does not have enough stock")
+def get_products_info(connection, products):
+    for product in products:
+        if product['quantity'] <= 0:
+            raise ValueError(f"Product with id {product['id']} has invalid quantity")
 
-            products_info.append({
-                "id": product_info[0],
-                "price": product_info[1],
-                "quantity": product['quantity']
-            })
+    # Cantidad total pedida por producto, por si se repite en el carrito
+    requested = {}
+    for product in products:
+        requested[product['id']] = requested.get(product['id'], 0) + product['quantity']
 
-        return products_info
+    try:
+        cursor = connection.cursor()
+        # Una sola consulta para todo el carrito, sin bloquear: el stock definitivo lo revisa el UPDATE condicional
+        placeholders = ", ".join(["%s"] * len(requested))
+        cursor.execute(f"SELECT id, price, stock FROM products WHERE id IN ({placeholders})",
+                       sorted(requested))
+        found = {row[0]: row for row in cursor.fetchall()}
     except Exception as e:
         logger.error("Database query error: %s", str(e), exc_info=True)
         raise
-    finally:
-        connection.close()
 
-def save_sale(products_info, total, headers):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    products_info = []
+    for product in products:
+        product_info = found.get(product['id'])
+
+        if product_info is None:
+            raise ValueError(f"Product with id {product['id']} not found")
+
+        if product_info[2] < requested[product['id']]:
+            raise ValueError(f"Product with id {product['id']} does not have enough stock")
+
+        products_info.append({
+            "id": product_info[0],
+            "price": product_info[1],
+            "quantity": product['quantity']
+        })
+
+    return products_info
+
+def save_sale(connection, products_info, total, headers, idempotency_key=None):
     try:
         cursor = connection.cursor()
         cursor.execute("INSERT INTO sales (total, status) VALUES (%s, 1)", (total,))
         sale_id = cursor.lastrowid
 
-        for product in products_info:
-            cursor.execute("INSERT INTO sales_products (sale_id, product_id, quantity) VALUES (%s, %s, %s)",
-                           (sale_id, product['id'], product['quantity']))
-            cursor.execute("UPDATE products SET stock = stock - %s WHERE id = %s",
-                           (product['quantity'], product['id']))
+        # executemany envía todas las líneas en un solo INSERT de varias filas
+        cursor.executemany("INSERT INTO sales_products (sale_id, product_id, quantity) VALUES (%s, %s, %s)",
+                           [(sale_id, product['id'], product['quantity']) for product in products_info])
+
+        # Otra venta pudo llevarse el stock después de la validación; el descuento condicional lo detecta
+        stock.decrement(cursor, sale_ingest.requested_quantities(products_info))
+        inventory.record_sales(cursor, sale_id, sale_id)
+
+        # El resumen diario se actualiza en la misma transacción que la venta
+        sales_summary.record_sale(cursor, sale_id)
+
+        body = json.dumps({
+            "message": "SALE_SAVED",
+            "sale_id": sale_id
+        })
+        if idempotency_key is not None:
+            idempotency.store(cursor, idempotency_key, 200, body)
 
         connection.commit()
 
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({
-                "message": "SALE_SAVED",
-                "sale_id": sale_id
-            })
+            "body": body
         }
     except Exception as e:
+        # El handler responde 400 al stock insuficiente y repite la venta ante un deadlock
+        if isinstance(e, stock.InsufficientStockError) or transactions.is_retryable(e):
+            raise
         logger.error("Database transaction error: %s", str(e), exc_info=True)
         return {
             "statusCode": 500,
@@ -167,5 +201,7 @@ def save_sale(products_info, total, headers):
                 "error": str(e)
             })
         }
-    finally:
-        connection.close()
+
+def purge_handler(event, __):
+    # Ejecución programada (IdempotencyPurgeFunction): borra las llaves de idempotencia vencidas
+    return {"deleted": idempotency.purge()}
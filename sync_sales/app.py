@@ -0,0 +1,217 @@
+import json
+import logging
+import pymysql
+from datetime import datetime, timedelta, timezone
+
+from balu_common import db, idempotency, sale_ingest
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MAX_SYNC_SALES = 500
+# Ventas por transacción: un bloqueo de filas corto y un fallo solo afecta a su bloque
+CHUNK_SIZE = 100
+MAX_CLIENT_ID_LENGTH = 200
+# Tolerancia para relojes de terminal adelantados
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+def lambda_handler(event, __):
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, X-Amz-Date, Authorization, X-Api-Key, X-Amz-Security-Token"
+    }
+    try:
+        claims = event['requestContext']['authorizer']['claims']
+        role = claims['cognito:groups']
+
+        if 'admin' not in role and 'sales' not in role:
+            return {
+                "statusCode": 403,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "FORBIDDEN"
+                }),
+            }
+
+        if 'body' not in event:
+            raise KeyError('body')
+
+        try:
+            sales = json.loads(event['body']).get('sales')
+        except (json.JSONDecodeError, AttributeError):
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_JSON_FORMAT"
+                }),
+            }
+
+        if not isinstance(sales, list) or not sales:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "MISSING_FIELDS",
+                    "missing_fields": ["sales"]
+                }),
+            }
+
+        if len(sales) > MAX_SYNC_SALES:
+            return {
+                "statusCode": 413,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "TOO_MANY_SALES",
+                    "max_sales": MAX_SYNC_SALES
+                }),
+            }
+
+        results = sync_sales(sales)
+        saved = sum(result["message"] in ("SALE_SAVED", "DUPLICATE") for result in results)
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "SALES_SYNCED",
+                "saved": saved,
+                "failed": len(results) - saved,
+                "results": results
+            }),
+        }
+    except KeyError as e:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "MISSING_KEY",
+                "error": str(e)
+            }),
+        }
+    except pymysql.MySQLError as e:
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "DATABASE_ERROR",
+                "error": str(e)
+            }),
+        }
+    except Exception as e:
+        logger.error("Unexpected error: %s", str(e), exc_info=True)
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "INTERNAL_SERVER_ERROR",
+                "error": str(e)
+            }),
+        }
+
+def parse_created_at(value):
+    # ISO 8601 de la terminal; sin zona horaria se toma como UTC, igual que RDS
+    created_at = datetime.fromisoformat(value)
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if created_at > datetime.now(timezone.utc).replace(tzinfo=None) + MAX_CLOCK_SKEW:
+        raise ValueError("created_at is in the future")
+    return created_at.strftime('%Y-%m-%d %H:%M:%S')
+
+def to_job(sale):
+    client_id = sale.get('client_id')
+    if not isinstance(client_id, str) or not client_id or len(client_id) > MAX_CLIENT_ID_LENGTH:
+        raise ValueError("INVALID_CLIENT_ID")
+    if not isinstance(sale.get('products'), list) or not sale['products'] or sale.get('total') is None:
+        raise ValueError("MISSING_FIELDS")
+    try:
+        sale_ingest.validate(sale['products'], sale['total'])
+    except ValueError:
+        raise ValueError("INVALID_PRODUCT")
+    try:
+        created_at = parse_created_at(sale.get('created_at'))
+    except (TypeError, ValueError):
+        raise ValueError("INVALID_CREATED_AT")
+
+    return {
+        "ingest_id": client_id,
+        # El id de la terminal es la llave: volver a sincronizar la misma venta no la duplica
+        "idempotency_key": f"sync:{client_id}",
+        "client_id": client_id,
+        "request_hash": idempotency.request_hash(sale),
+        "products": sale['products'],
+        "total": sale['total'],
+        "created_at": created_at
+    }
+
+def prefetch(jobs):
+    # Stock de todos los productos y ventas ya sincronizadas, en una sola visita a la base
+    jobs = list(jobs)
+    product_ids = sorted({product['id'] for job in jobs for product in job['products']})
+    keys = [job['idempotency_key'] for job in jobs]
+    stock, synced, sold = {}, {}, {}
+    if not keys:
+        return stock, synced, sold
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor()
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(f"SELECT id, stock FROM products WHERE id IN ({placeholders})", product_ids)
+        stock = {row[0]: row[1] for row in cursor.fetchall()}
+        placeholders = ", ".join(["%s"] * len(keys))
+        cursor.execute(f"SELECT idempotency_key, request_hash, response_body FROM idempotency_keys "
+                       f"WHERE idempotency_key IN ({placeholders}) AND status_code IS NOT NULL", keys)
+        synced = {row[0]: (row[1], json.loads(row[2]).get("sale_id")) for row in cursor.fetchall()}
+        sold = sale_ingest.synced_sales(cursor, [job['client_id'] for job in jobs])
+        return stock, synced, sold
+    finally:
+        db.release_connection(connection)
+
+def sync_sales(sales):
+    """Valida y escribe las ventas de una terminal que estuvo sin conexión.
+
+    Devuelve un resultado por venta, en el mismo orden, con su client_id.
+    """
+    results = [None] * len(sales)
+    jobs = {}
+    for index, sale in enumerate(sales):
+        try:
+            jobs[index] = to_job(sale if isinstance(sale, dict) else {})
+        except ValueError as e:
+            results[index] = {"message": str(e)}
+
+    # Una sola lectura descarta antes de escribir las ventas repetidas y las que no pueden pasar
+    stock, synced, sold = prefetch(jobs.values())
+    pending = []
+    for index, job in jobs.items():
+        if job['idempotency_key'] in synced:
+            request_hash, sale_id = synced[job['idempotency_key']]
+            if request_hash == job['request_hash']:
+                results[index] = {"message": "DUPLICATE", "sale_id": sale_id}
+            else:
+                results[index] = {"message": "IDEMPOTENCY_KEY_REUSED"}
+            continue
+        if job['client_id'] in sold:
+            # La llave ya venció o se purgó, pero la venta sigue registrada con su client_id
+            results[index] = {"message": "DUPLICATE", "sale_id": sold[job['client_id']]}
+            continue
+        requested, reason = sale_ingest.reserve(job['products'], stock)
+        if requested is None:
+            results[index] = {"message": reason}
+        else:
+            pending.append(index)
+
+    # Cada bloque vuelve a bloquear y revisar su stock; si un bloque falla, los demás se conservan
+    for start in range(0, len(pending), CHUNK_SIZE):
+        chunk = pending[start:start + CHUNK_SIZE]
+        try:
+            chunk_results = sale_ingest.write_batch([jobs[index] for index in chunk])
+        except pymysql.MySQLError as e:
+            logger.error("Sync chunk of %s sales failed: %s", len(chunk), str(e), exc_info=True)
+            chunk_results = [{"message": "DATABASE_ERROR"} for _ in chunk]
+        for index, result in zip(chunk, chunk_results):
+            results[index] = result
+
+    for sale, result in zip(sales, results):
+        result["client_id"] = sale.get('client_id') if isinstance(sale, dict) else None
+    return results
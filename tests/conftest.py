@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+
+import pytest
+
+# En Lambda balu_common llega desde CommonLayer; en las pruebas se importa desde el código fuente
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+
+from balu_common import aws, catalog_cache, credentials, db, images, sale_ingest
+
+
+def api_event(body, role="admin", headers=None):
+    # Evento de API Gateway con el grupo de Cognito indicado; un body str se envía tal cual (CSV)
+    return {
+        "requestContext": {"authorizer": {"claims": {"cognito:groups": role}}},
+        "headers": headers or {},
+        "body": body if isinstance(body, str) else json.dumps(body)
+    }
+
+
+def _reset_shared_state():
+    db.close_connection()
+    credentials.invalidate()
+    aws.reset_clients()
+    catalog_cache.reset()
+    images.reset()
+    sale_ingest.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    # Evitar que una conexión, secreto, cliente, catálogo o cola simulados de una prueba se reutilice en la siguiente
+    _reset_shared_state()
+    yield
+    _reset_shared_state()
@@ -0,0 +1,135 @@
+"""
+Runs EXPLAIN against a throwaway local MySQL database to check that the report queries use the
+indexes created by balu_common.migrations. Set BALU_TEST_DB_HOST, BALU_TEST_DB_USER,
+BALU_TEST_DB_PASSWORD and BALU_TEST_DB_NAME; the database is dropped and recreated.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pymysql
+import pytest
+
+from balu_common import migrations, sales_summary
+
+DB_HOST = os.environ.get("BALU_TEST_DB_HOST")
+
+pytestmark = pytest.mark.skipif(DB_HOST is None, reason="BALU_TEST_DB_HOST is not set")
+
+
+class TestSalesIndexes:
+
+    @pytest.fixture(scope="class")
+    def connection(self):
+        name = os.environ.get("BALU_TEST_DB_NAME", "balu_explain")
+        server = pymysql.connect(host=DB_HOST, user=os.environ.get("BALU_TEST_DB_USER", "root"),
+                                 password=os.environ.get("BALU_TEST_DB_PASSWORD", ""), autocommit=True)
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+            cursor.execute(f"CREATE DATABASE `{name}`")
+        server.select_db(name)
+
+        migrations.migrate(server)
+        self.seed(server)
+        yield server
+
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        server.close()
+
+    def seed(self, connection):
+        cursor = connection.cursor()
+        cursor.executemany("INSERT INTO categories (name, status) VALUES (%s, 1)",
+                           [(f"category {i}",) for i in range(20)])
+        cursor.executemany("INSERT INTO products (name, stock, price, category_id, status) VALUES (%s, 100, 10, %s, 1)",
+                           [(f"product {i}", i % 20 + 1) for i in range(400)])
+        start = datetime(2024, 1, 1)
+        cursor.executemany("INSERT INTO sales (total, status, createdAt) VALUES (%s, %s, %s)",
+                           [(10 + i % 50, int(i % 10 != 0), start + timedelta(minutes=97 * i)) for i in range(5000)])
+        cursor.executemany("INSERT INTO sales_products (sale_id, product_id, quantity) VALUES (%s, %s, %s)",
+                           [(i // 3 + 1, i % 400 + 1, i % 5 + 1) for i in range(15000)])
+        connection.commit()
+        sales_summary.rebuild(connection)
+        cursor.execute("ANALYZE TABLE categories, products, sales, sales_products, product_sales_totals")
+        cursor.fetchall()
+
+    def explain(self, connection, query, params=()):
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute("EXPLAIN " + query, params)
+            return {row["table"]: row for row in cursor.fetchall()}
+
+    def test_sales_date_range_uses_index(self, connection):
+        plan = self.explain(connection, """
+            SELECT COUNT(*), SUM(total) FROM sales s
+            WHERE s.createdAt >= %s AND s.createdAt < %s AND s.status = 1
+        """, (datetime(2024, 3, 1), datetime(2024, 3, 2)))
+
+        assert plan["s"]["key"] == "idx_sales_created_status"
+        assert plan["s"]["type"] == "range"
+        assert "Using index" in (plan["s"]["Extra"] or "")
+
+    def test_history_per_day_uses_index(self, connection):
+        plan = self.explain(connection, """
+            SELECT sales.id, sales.createdAt, sales.status, sales.total, products.name, sales_products.quantity
+            FROM sales
+            INNER JOIN sales_products ON sales.id = sales_products.sale_id
+            INNER JOIN products ON sales_products.product_id = products.id
+            WHERE sales.createdAt >= %s AND sales.createdAt < %s
+        """, (datetime(2024, 3, 1), datetime(2024, 3, 2)))
+
+        assert plan["sales"]["key"] == "idx_sales_created_status"
+        assert plan["sales_products"]["key"] == "idx_sales_products_sale"
+        assert plan["products"]["key"] == "PRIMARY"
+
+    def test_history_page_uses_keyset_index(self, connection):
+        after = datetime(2024, 3, 1, 12, 0)
+        plan = self.explain(connection, """
+            SELECT id AS sale_id, createdAt, status, total
+            FROM sales
+            WHERE createdAt >= %s AND createdAt < %s AND (createdAt > %s OR (createdAt = %s AND id > %s))
+            ORDER BY createdAt, id
+            LIMIT %s
+        """, (datetime(2024, 1, 1), datetime(2024, 12, 31), after, after, 800, 50))
+
+        assert plan["sales"]["key"] == "idx_sales_created_id"
+        assert plan["sales"]["type"] == "range"
+        assert "Using index" in (plan["sales"]["Extra"] or "")
+        assert "Using filesort" not in (plan["sales"]["Extra"] or "")
+
+    def test_top_sold_by_category_uses_index(self, connection):
+        plan = self.explain(connection, """
+            SELECT p.name, c.name, SUM(sp.quantity) AS total_quantity_sold
+            FROM sales_products sp
+            JOIN products p ON sp.product_id = p.id
+            JOIN categories c ON p.category_id = c.id
+            JOIN sales s ON sp.sale_id = s.id
+            WHERE s.status = 1 AND c.id = %s
+            GROUP BY p.name, c.name
+            ORDER BY total_quantity_sold DESC
+            LIMIT 10
+        """, (3,))
+
+        assert plan["p"]["key"] == "idx_products_category_name"
+        assert all(row["type"] != "ALL" for row in plan.values())
+
+    def test_category_leaderboard_uses_index(self, connection):
+        plan = self.explain(connection, """
+            SELECT p.name, c.name, t.quantity
+            FROM product_sales_totals t
+            JOIN products p ON t.product_id = p.id
+            JOIN categories c ON p.category_id = c.id
+            WHERE t.quantity > 0 AND t.category_id = %s
+            ORDER BY t.quantity DESC
+            LIMIT 10
+        """, (3,))
+
+        assert plan["t"]["key"] == "idx_product_sales_totals_category"
+        assert "Using filesort" not in (plan["t"]["Extra"] or "")
+
+    def test_end_of_day_summary_uses_primary_key(self, connection):
+        plan = self.explain(connection, """
+            SELECT total_sales FROM daily_sales_summary WHERE sale_date = %s
+        """, ("2024-03-01",))
+
+        row = plan.get("daily_sales_summary")
+        # Sin filas para ese día MySQL resuelve el plan sin tocar la tabla
+        assert row is None or row["key"] == "PRIMARY"
@@ -0,0 +1,93 @@
+"""
+Runs 50 parallel buyers of the same product against a throwaway local MySQL database and checks that
+the conditional stock decrement never oversells. Uses the same BALU_TEST_DB_* variables as
+test_sales_indexes; the database is dropped and recreated.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+import pytest
+
+from balu_common import inventory, migrations, transactions
+from save_sale import app
+
+DB_HOST = os.environ.get("BALU_TEST_DB_HOST")
+BUYERS = 50
+STOCK = 20
+
+pytestmark = pytest.mark.skipif(DB_HOST is None, reason="BALU_TEST_DB_HOST is not set")
+
+
+def connect(name=None):
+    return pymysql.connect(host=DB_HOST, user=os.environ.get("BALU_TEST_DB_USER", "root"),
+                           password=os.environ.get("BALU_TEST_DB_PASSWORD", ""), db=name, autocommit=True)
+
+
+class TestStockConcurrency:
+
+    @pytest.fixture(scope="class")
+    def database(self):
+        name = os.environ.get("BALU_TEST_DB_NAME", "balu_stock")
+        server = connect()
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+            cursor.execute(f"CREATE DATABASE `{name}`")
+        server.select_db(name)
+        migrations.migrate(server)
+        yield name
+
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        server.close()
+
+    @pytest.fixture()
+    def product_id(self, database):
+        connection = connect(database)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO categories (name) VALUES ('hot')")
+            cursor.execute("INSERT INTO products (name, stock, price, category_id) VALUES ('best seller', %s, 10, %s)",
+                           (STOCK, cursor.lastrowid))
+            product_id = cursor.lastrowid
+            inventory.record_adjustments(cursor, {product_id: STOCK})
+        connection.close()
+        return product_id
+
+    def buy(self, database, product_id):
+        # Cada comprador es un contenedor distinto con su propia conexión
+        connection = connect(database)
+        products = [{"id": product_id, "quantity": 1}]
+        try:
+            response = transactions.run_with_retry(
+                connection, lambda: app.checkout(connection, {}, products, 10, {}, None))
+            return response["statusCode"]
+        except ValueError:
+            connection.rollback()
+            return 400
+        finally:
+            connection.close()
+
+    def test_parallel_buyers_do_not_oversell(self, database, product_id):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=BUYERS) as pool:
+            statuses = list(pool.map(lambda _: self.buy(database, product_id), range(BUYERS)))
+        elapsed = time.monotonic() - started
+
+        assert statuses.count(200) == STOCK
+        assert statuses.count(400) == BUYERS - STOCK
+
+        connection = connect(database)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT stock FROM products WHERE id = %s", (product_id,))
+            assert cursor.fetchone()[0] == 0
+            cursor.execute("SELECT SUM(quantity) FROM sales_products WHERE product_id = %s", (product_id,))
+            assert cursor.fetchone()[0] == STOCK
+            cursor.execute("SELECT quantity FROM product_sales_totals WHERE product_id = %s", (product_id,))
+            assert cursor.fetchone()[0] == STOCK
+            # Cada venta dejó su movimiento en el libro de inventario
+            assert inventory.reconcile(cursor, [product_id]) == []
+        connection.close()
+
+        # Los compradores esperan el bloqueo de una fila, no el tiempo de espera de InnoDB
+        assert elapsed < 10
@@ -104,5 +104,31 @@ class TestCancelSales(unittest.TestCase):
         body = json.loads(result["body"])
         self.assertEqual(body["message"], "INTERNAL_SERVER_ERROR")
 
+    # Prueba para verificar que la cancelación individual usa la misma ruta que devuelve el stock.
+    @patch("cancel_sales.app.cancellations.cancel")
+    @patch("cancel_sales.app.db")
+    def test_cancel_sale_restores_stock(self, mock_db, mock_cancel):
+        mock_connection = mock_db.get_connection.return_value
+        mock_cancel.return_value = {5: "CANCELLED"}
+
+        self.assertEqual(app.cancel_sale(5), "CANCELLED")
+        mock_cancel.assert_called_once_with(mock_connection.cursor.return_value, [5])
+        mock_connection.begin.assert_called_once()
+        mock_connection.commit.assert_called_once()
+
+    # Prueba para verificar que una venta inexistente responde 404 sin una consulta previa aparte.
+    @patch("cancel_sales.app.cancel_sale")
+    def test_lambda_handler_cancel_not_found(self, mock_cancel_sale):
+        mock_cancel_sale.return_value = "ID_NOT_FOUND"
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin"}}},
+            "pathParameters": {"id": "77"}
+        }
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 404)
+        mock_cancel_sale.assert_called_once_with(77)
+
 if __name__ == "__main__":
     unittest.main()
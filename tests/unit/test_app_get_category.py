@@ -78,6 +78,20 @@ class TestGetCategory(unittest.TestCase):
         self.assertIn("message", body)
         self.assertEqual(body["message"], "INTERNAL_SERVER_ERROR")
 
+    # Prueba para verificar que se responde 304 cuando el cliente ya tiene la versión actual.
+    @patch("get_category.app.get_all_categories")
+    def test_get_categories_not_modified(self, mock_get_all_categories):
+        mock_get_all_categories.return_value = [{"id": 1, "name": "Snacks", "status": 1}]
+
+        first = app.lambda_handler(mock_success_active, None)
+        etag = first["headers"]["ETag"]
+        result = app.lambda_handler(dict(mock_success_active, headers={"if-none-match": etag}), None)
+
+        self.assertEqual(result["statusCode"], 304)
+        self.assertEqual(result["body"], "")
+        self.assertEqual(result["headers"]["ETag"], etag)
+        mock_get_all_categories.assert_called_once()
+
     # Prueba para verificar que se lanza una excepción cuando se intenta convertir un tipo no soportado a float.
     def test_decimal_to_float_invalid_type(self):
         with self.assertRaises(TypeError):
@@ -29,7 +29,7 @@ mock_internal_error = {
 
 class TestUpdateCategory(unittest.TestCase):
 
-    @patch("get_products.app.get_secret")
+    @patch("balu_common.db.get_secret")
     def setUp(self, mock_get_secret):
         mock_get_secret.return_value = {
             "host": "database-cafe-balu.cziym6ii4nn7.us-east-2.rds.amazonaws.com",
@@ -123,6 +123,77 @@ class TestUpdateCategory(unittest.TestCase):
         self.assertIn("message", body)
         self.assertEqual(body["message"], "PRODUCTS_FETCHED")
 
+    @patch("get_products.app.get_all_products")
+    def test_get_products_served_from_cache(self, mock_get_all_products):
+        mock_get_all_products.return_value = [{"id": 1, "name": "Test product", "price": 10.0, "status": 1}]
+
+        first = app.lambda_handler(mock_success_active, None)
+        second = app.lambda_handler(mock_success_active, None)
+
+        mock_get_all_products.assert_called_once_with(1, None, None, None)
+        self.assertEqual(first["body"], second["body"])
+
+    @patch("get_products.app.get_all_products")
+    def test_get_products_etag(self, mock_get_all_products):
+        mock_get_all_products.return_value = [{"id": 1, "name": "Test product", "price": 10.0, "status": 1}]
+
+        first = app.lambda_handler(mock_success_active, None)
+        etag = first["headers"]["ETag"]
+        not_modified = app.lambda_handler(dict(mock_success_active, headers={"If-None-Match": etag}), None)
+        stale = app.lambda_handler(dict(mock_success_active, headers={"If-None-Match": '"old"'}), None)
+
+        self.assertEqual(first["statusCode"], 200)
+        self.assertEqual(not_modified["statusCode"], 304)
+        self.assertEqual(stale["statusCode"], 200)
+        self.assertEqual(stale["body"], first["body"])
+
+    @patch("get_products.app.get_all_products")
+    def test_get_products_page(self, mock_get_all_products):
+        mock_get_all_products.return_value = [{"id": 11, "name": "A"}, {"id": 12, "name": "B"}]
+        event = dict(mock_success_active, queryStringParameters={"after": "10", "limit": "2", "fields": "name"})
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        mock_get_all_products.assert_called_once_with(1, 10, 2, ["id", "name"])
+        body = json.loads(result["body"])
+        self.assertEqual(body["next_after"], 12)
+
+    @patch("get_products.app.get_all_products")
+    def test_get_products_last_page(self, mock_get_all_products):
+        mock_get_all_products.return_value = [{"id": 11, "name": "A"}]
+        event = dict(mock_success_active, queryStringParameters={"after": "10", "limit": "2"})
+
+        body = json.loads(app.lambda_handler(event, None)["body"])
+
+        self.assertIsNone(body["next_after"])
+
+    def test_get_products_invalid_pagination(self):
+        for query in [{"limit": "0"}, {"limit": "10000"}, {"after": "-1"}, {"after": "abc"}]:
+            with self.subTest(query=query):
+                result = app.lambda_handler(dict(mock_success_active, queryStringParameters=query), None)
+                self.assertEqual(result["statusCode"], 400)
+                self.assertEqual(json.loads(result["body"])["message"], "INVALID_PAGINATION")
+
+    def test_get_products_invalid_fields(self):
+        event = dict(mock_success_active, queryStringParameters={"fields": "name,password"})
+        result = app.lambda_handler(event, None)
+        self.assertEqual(result["statusCode"], 400)
+        self.assertEqual(json.loads(result["body"])["message"], "INVALID_FIELDS")
+
+    @patch("get_products.app.db")
+    def test_get_all_products_keyset_query(self, mock_db):
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.description = [("id",), ("name",)]
+        mock_cursor.__iter__.return_value = iter([(11, "A")])
+
+        result = app.get_all_products(1, 10, 2, ["id", "name"])
+
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertEqual(query, "select p.id, p.name from products p inner join categories c on p.category_id = c.id WHERE c.status = %s AND p.id > %s ORDER BY p.id LIMIT %s")
+        self.assertEqual(params, [1, 10, 2])
+        self.assertEqual(result, [{"id": 11, "name": "A"}])
+
     def test_decimal_to_float_invalid_type(self):
         with self.assertRaises(TypeError):
             app.decimal_to_float("string")
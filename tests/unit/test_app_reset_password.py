@@ -14,7 +14,7 @@ mock_success = {
 
 
 class TestResetPassword(unittest.TestCase):
-    @patch("newPassword.app.boto3.client")
+    @patch("newPassword.app.aws.get_client")
     def test_new_password_success(self, mock_boto_client):
         mock_client_instance = mock_boto_client.return_value
         mock_client_instance.admin_initiate_auth.return_value = {
@@ -25,7 +25,7 @@ class TestResetPassword(unittest.TestCase):
         status_code = result["statusCode"]
         self.assertEqual(status_code, 200)
 
-    @patch("newPassword.app.boto3.client")
+    @patch("newPassword.app.aws.get_client")
     def test_unexpected_challege(self, mock_boto_client):
         mock_client_instance = mock_boto_client.return_value
         mock_client_instance.admin_initiate_auth.return_value = {
@@ -36,7 +36,7 @@ class TestResetPassword(unittest.TestCase):
         status_code = result["statusCode"]
         self.assertEqual(status_code, 400)
 
-    @patch("newPassword.app.boto3.client")
+    @patch("newPassword.app.aws.get_client")
     def test_client_error(self, mock_boto_client):
         mock_client_instance = mock_boto_client.return_value
         error_response ={
@@ -52,7 +52,7 @@ class TestResetPassword(unittest.TestCase):
         status_code = result["statusCode"]
         self.assertEqual(status_code, 400)
 
-    @patch("newPassword.app.boto3.client")
+    @patch("newPassword.app.aws.get_client")
     def test_error_500(self, mock_boto_client):
         mock_client_instance = mock_boto_client.return_value
         error_response ={
@@ -1,7 +1,8 @@
 import unittest
 import json
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from save_sale import app
+from balu_common import inventory, stock
 
 mock_event_valid = {
     "requestContext": {
@@ -85,9 +86,10 @@ mock_event_insufficient_stock = {
 
 class TestSaveSale(unittest.TestCase):
     # Prueba para verificar la recuperación exitosa de la venta.
+    @patch("save_sale.app.db")
     @patch("save_sale.app.get_products_info")
     @patch("save_sale.app.save_sale")
-    def test_save_sale_success(self, mock_save_sale, mock_get_products_info):
+    def test_save_sale_success(self, mock_save_sale, mock_get_products_info, mock_db):
         mock_get_products_info.return_value = [{"id": 1, "price": 50.0, "quantity": 2}]
         mock_save_sale.return_value = {
             "statusCode": 200,
@@ -120,8 +122,9 @@ class TestSaveSale(unittest.TestCase):
         self.assertEqual(body["message"], "BAD_REQUEST")
 
 # Prueba para verificar el manejo de una cantidad de producto inválida.
+    @patch("save_sale.app.db")
     @patch("save_sale.app.get_products_info")
-    def test_save_sale_invalid_product_quantity(self, mock_get_products_info):
+    def test_save_sale_invalid_product_quantity(self, mock_get_products_info, mock_db):
         mock_get_products_info.side_effect = ValueError("Product with id 1 has invalid quantity")
         result = app.lambda_handler(mock_event_invalid_product_quantity, None)
         status_code = result["statusCode"]
@@ -131,8 +134,9 @@ class TestSaveSale(unittest.TestCase):
         self.assertEqual(body["message"], "Product with id 1 has invalid quantity")
 
 # Prueba para verificar el manejo de un producto no encontrado.
+    @patch("save_sale.app.db")
     @patch("save_sale.app.get_products_info")
-    def test_save_sale_product_not_found(self, mock_get_products_info):
+    def test_save_sale_product_not_found(self, mock_get_products_info, mock_db):
         mock_get_products_info.side_effect = ValueError("Product with id 999 not found")
         result = app.lambda_handler(mock_event_product_not_found, None)
         status_code = result["statusCode"]
@@ -142,8 +146,9 @@ class TestSaveSale(unittest.TestCase):
         self.assertEqual(body["message"], "Product with id 999 not found")
 
     # Prueba para verificar el manejo de un stock insuficiente.
+    @patch("save_sale.app.db")
     @patch("save_sale.app.get_products_info")
-    def test_save_sale_insufficient_stock(self, mock_get_products_info):
+    def test_save_sale_insufficient_stock(self, mock_get_products_info, mock_db):
         mock_get_products_info.side_effect = ValueError("Product with id 1 does not have enough stock")
         result = app.lambda_handler(mock_event_insufficient_stock, None)
         status_code = result["statusCode"]
@@ -152,5 +157,156 @@ class TestSaveSale(unittest.TestCase):
         self.assertIn("message", body)
         self.assertEqual(body["message"], "Product with id 1 does not have enough stock")
 
+    # Prueba para verificar que el carrito se valida con una sola consulta que no bloquea las filas.
+    def test_get_products_info_single_query(self):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.fetchall.return_value = [(1, 50.0, 10), (2, 20.0, 5)]
+
+        result = app.get_products_info(mock_connection, [{"id": 2, "quantity": 1}, {"id": 1, "quantity": 2}])
+
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("WHERE id IN (%s, %s)", query)
+        self.assertNotIn("FOR UPDATE", query)
+        self.assertEqual(params, [1, 2])
+        self.assertEqual(result, [{"id": 2, "price": 20.0, "quantity": 1}, {"id": 1, "price": 50.0, "quantity": 2}])
+
+    # Prueba para verificar que las líneas repetidas suman su cantidad al validar el stock.
+    def test_get_products_info_repeated_lines(self):
+        mock_connection = MagicMock()
+        mock_connection.cursor.return_value.fetchall.return_value = [(1, 50.0, 3)]
+
+        with self.assertRaises(ValueError) as context:
+            app.get_products_info(mock_connection, [{"id": 1, "quantity": 2}, {"id": 1, "quantity": 2}])
+
+        self.assertEqual(str(context.exception), "Product with id 1 does not have enough stock")
+
+    # Prueba para verificar que la venta agrupa las líneas y descuenta el stock con un UPDATE condicional por producto.
+    def test_save_sale_conditional_decrement(self):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.lastrowid = 7
+        products_info = [
+            {"id": 3, "price": 10.0, "quantity": 1},
+            {"id": 1, "price": 50.0, "quantity": 2},
+            {"id": 3, "price": 10.0, "quantity": 4}
+        ]
+
+        result = app.save_sale(mock_connection, products_info, 140.0, {})
+
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual(json.loads(result["body"])["sale_id"], 7)
+        mock_cursor.executemany.assert_called_once_with(
+            "INSERT INTO sales_products (sale_id, product_id, quantity) VALUES (%s, %s, %s)",
+            [(7, 3, 1), (7, 1, 2), (7, 3, 4)]
+        )
+        self.assertEqual(mock_cursor.execute.call_count, 7)
+        self.assertEqual(mock_cursor.execute.call_args_list[1][0], (stock.DECREMENT, (2, 1, 2)))
+        self.assertEqual(mock_cursor.execute.call_args_list[2][0], (stock.DECREMENT, (5, 3, 5)))
+        # Una fila por producto en el libro de inventario, con una sola sentencia
+        self.assertEqual(mock_cursor.execute.call_args_list[3][0], (inventory.SALE_MOVEMENTS, (7, 7)))
+        mock_connection.commit.assert_called_once()
+
+    # Prueba para verificar que si otra venta se llevó el stock tras la validación, la venta responde 400 sin guardarse.
+    def test_save_sale_stock_taken_concurrently(self):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.rowcount = 0
+
+        with self.assertRaises(stock.InsufficientStockError):
+            app.save_sale(mock_connection, [{"id": 1, "price": 10.0, "quantity": 3}], 30.0, {})
+
+        mock_connection.commit.assert_not_called()
+
+    # Prueba para verificar que un deadlock repite la venta completa.
+    @patch("balu_common.transactions.time.sleep")
+    @patch("save_sale.app.db")
+    @patch("save_sale.app.get_products_info")
+    @patch("save_sale.app.save_sale")
+    def test_save_sale_retries_deadlock(self, mock_save_sale, mock_get_products_info, mock_db, mock_sleep):
+        mock_get_products_info.return_value = [{"id": 1, "price": 50.0, "quantity": 2}]
+        mock_save_sale.side_effect = [
+            app.pymysql.err.OperationalError(1213, "Deadlock found when trying to get lock"),
+            {"statusCode": 200, "headers": {}, "body": json.dumps({"message": "SALE_SAVED", "sale_id": 3})}
+        ]
+
+        result = app.lambda_handler(mock_event_valid, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual(mock_save_sale.call_count, 2)
+        mock_connection = mock_db.get_connection.return_value
+        self.assertEqual(mock_connection.begin.call_count, 2)
+        mock_connection.rollback.assert_called_once()
+
+    # Prueba para verificar que la venta suma su total al resumen diario dentro de la misma transacción.
+    @patch("save_sale.app.sales_summary.record_sale")
+    def test_save_sale_updates_daily_summary(self, mock_record_sale):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.lastrowid = 9
+        mock_record_sale.side_effect = lambda cursor, sale_id: self.assertFalse(mock_connection.commit.called)
+
+        result = app.save_sale(mock_connection, [{"id": 1, "price": 10.0, "quantity": 1}], 10.0, {})
+
+        self.assertEqual(result["statusCode"], 200)
+        mock_record_sale.assert_called_once_with(mock_cursor, 9)
+        mock_connection.commit.assert_called_once()
+
+    # Prueba para verificar que un reintento con la misma llave devuelve la respuesta guardada sin tocar stock.
+    @patch("save_sale.app.db")
+    @patch("save_sale.app.get_products_info")
+    @patch("save_sale.app.idempotency.claim")
+    def test_save_sale_idempotent_replay(self, mock_claim, mock_get_products_info, mock_db):
+        stored_body = json.dumps({"message": "SALE_SAVED", "sale_id": 42})
+        mock_claim.return_value = {"statusCode": 200, "body": stored_body}
+        event = dict(mock_event_valid, headers={"Idempotency-Key": "cart-123"})
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual(result["body"], stored_body)
+        self.assertEqual(result["headers"]["Idempotent-Replayed"], "true")
+        self.assertEqual(mock_claim.call_args[0][1], "cart-123")
+        mock_get_products_info.assert_not_called()
+        mock_db.get_connection.return_value.cursor.return_value.execute.assert_not_called()
+
+    # Prueba para verificar que reutilizar una llave con otra venta se rechaza.
+    @patch("save_sale.app.db")
+    @patch("save_sale.app.idempotency.claim")
+    def test_save_sale_idempotency_key_reused(self, mock_claim, mock_db):
+        mock_claim.side_effect = app.idempotency.KeyReusedError("cart-123")
+        event = dict(mock_event_valid, headers={"idempotency-key": "cart-123"})
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 422)
+        self.assertEqual(json.loads(result["body"])["message"], "IDEMPOTENCY_KEY_REUSED")
+
+    # Prueba para verificar que la respuesta se guarda con la llave antes del commit de la venta.
+    @patch("save_sale.app.idempotency.store")
+    def test_save_sale_stores_idempotent_response(self, mock_store):
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.lastrowid = 11
+        mock_store.side_effect = lambda *args: self.assertFalse(mock_connection.commit.called)
+
+        result = app.save_sale(mock_connection, [{"id": 1, "price": 10.0, "quantity": 1}], 10.0, {}, "cart-123")
+
+        mock_store.assert_called_once_with(mock_cursor, "cart-123", 200, result["body"])
+        mock_connection.commit.assert_called_once()
+
+    # Prueba para verificar que en modo cola la venta se encola sin abrir conexión a la base.
+    @patch("save_sale.app.db")
+    @patch("save_sale.app.sale_ingest.MODE", "queue")
+    def test_save_sale_queue_mode(self, mock_db):
+        result = app.lambda_handler(mock_event_valid, None)
+
+        self.assertEqual(result["statusCode"], 202)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "SALE_QUEUED")
+        self.assertEqual(app.sale_ingest.get_queue().jobs[0]["ingest_id"], body["ingest_id"])
+        mock_db.get_connection.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
@@ -99,6 +99,8 @@ class TestUpdateCategory(unittest.TestCase):
         body = json.loads(result["body"])
         self.assertIn("message", body)
         self.assertEqual(body["message"], "CATEGORY_UPDATED")
+        # La existencia de la categoría se consulta una sola vez por petición
+        mock_category_exist.assert_called_once()
 
     @patch("update_category.app.duplicated_name")
     @patch("update_category.app.category_exist")
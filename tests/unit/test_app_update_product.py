@@ -1,5 +1,6 @@
 import unittest
 import json
+import pymysql
 from unittest.mock import patch
 from update_product import app
 
@@ -99,11 +100,16 @@ mock_event_category_not_found = {
 
 class TestUpdateProduct(unittest.TestCase):
     # Prueba de actualización exitosa del producto
+    @patch("update_product.app.db")
+    @patch("update_product.app.images.enqueue_variants")
+    @patch("update_product.app.get_product_image")
     @patch("update_product.app.update_product")
-    @patch("update_product.app.category_exists")
+    @patch("update_product.app.products.validate_write")
     @patch("update_product.app.upload_image_to_s3")
-    def test_update_product_success(self, mock_upload_image_to_s3, mock_category_exists, mock_update_product):
-        mock_category_exists.return_value = True
+    def test_update_product_success(self, mock_upload_image_to_s3, mock_validate_write, mock_update_product,
+                                    mock_get_product_image, mock_enqueue_variants, mock_db):
+        mock_validate_write.return_value = None
+        mock_get_product_image.return_value = "https://example.com/old.jpg"
         mock_upload_image_to_s3.return_value = "https://example.com/image.jpg"
         mock_event_admin["body"] = json.dumps({
             "id": 1,
@@ -123,6 +129,120 @@ class TestUpdateProduct(unittest.TestCase):
         body = json.loads(result["body"])
         self.assertIn("message", body)
         self.assertEqual(body["message"], "PRODUCT_UPDATED")
+        mock_enqueue_variants.assert_called_once_with(1, "https://example.com/image.jpg")
+        mock_db.get_connection.assert_not_called()
+
+    # Prueba de actualización con una imagen ya subida directo a S3 mediante URL prefirmada
+    @patch("update_product.app.get_product_image")
+    @patch("update_product.app.images.is_uploaded_image")
+    @patch("update_product.app.update_product")
+    @patch("update_product.app.products.validate_write")
+    @patch("update_product.app.upload_image_to_s3")
+    def test_update_product_with_image_key(self, mock_upload_image_to_s3, mock_validate_write,
+                                           mock_update_product, mock_is_uploaded_image,
+                                           mock_get_product_image):
+        mock_get_product_image.return_value = "https://cafe-balu-images.s3.amazonaws.com/images/old.png"
+        mock_validate_write.return_value = None
+        mock_is_uploaded_image.return_value = True
+        key = "images/3f2b8c1e-1111-4a2b-9c3d-abcdefabcdef.png"
+        event = dict(mock_event_admin, body=json.dumps({
+            "id": 1,
+            "name": "New Product",
+            "stock": 10,
+            "price": 100,
+            "status": 1,
+            "image_key": key,
+            "category_id": 1
+        }))
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        mock_upload_image_to_s3.assert_not_called()
+        mock_is_uploaded_image.assert_called_once_with(key)
+        self.assertEqual(mock_update_product.call_args[0][5], app.images.public_url(key))
+
+    # Prueba de actualización sin imagen: solo cambian los demás campos y no se sube nada
+    @patch("update_product.app.images.enqueue_variants")
+    @patch("update_product.app.db")
+    @patch("update_product.app.products.validate_write")
+    @patch("update_product.app.upload_image_to_s3")
+    def test_update_product_without_image(self, mock_upload_image_to_s3, mock_validate_write,
+                                          mock_db, mock_enqueue_variants):
+        mock_validate_write.return_value = None
+        event = dict(mock_event_admin, body=json.dumps({
+            "id": 1, "name": "New Product", "stock": 10, "price": 120, "status": 1, "category_id": 1
+        }))
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        mock_upload_image_to_s3.assert_not_called()
+        mock_enqueue_variants.assert_not_called()
+        calls = [c[0] for c in mock_db.get_connection.return_value.cursor.return_value.execute.call_args_list]
+        query, params = next(c for c in calls if c[0].startswith("UPDATE products"))
+        self.assertNotIn("image", query)
+        self.assertEqual(params[-1], 1)
+        # El acumulado de ventas sigue a la categoría del producto
+        self.assertEqual(calls[-1], (app.sales_summary.CATEGORY_SYNC.format(ids="%s"), [1]))
+
+    # Prueba de actualización con la misma imagen: no se reemplaza ni se regeneran variantes
+    @patch("update_product.app.images.enqueue_variants")
+    @patch("update_product.app.get_product_image")
+    @patch("update_product.app.update_product")
+    @patch("update_product.app.products.validate_write")
+    @patch("update_product.app.upload_image_to_s3")
+    def test_update_product_same_image(self, mock_upload_image_to_s3, mock_validate_write,
+                                       mock_update_product, mock_get_product_image, mock_enqueue_variants):
+        mock_validate_write.return_value = None
+        mock_upload_image_to_s3.return_value = "https://cafe-balu-images.s3.amazonaws.com/images/abc.png"
+        mock_get_product_image.return_value = "https://cafe-balu-images.s3.amazonaws.com/images/abc.png"
+        event = dict(mock_event_admin, body=json.dumps({
+            "id": 1, "name": "New Product", "stock": 10, "price": 120, "status": 1, "category_id": 1,
+            "image": "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAUA"
+        }))
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        self.assertIsNone(mock_update_product.call_args[0][5])
+        mock_enqueue_variants.assert_not_called()
+
+    # Prueba de actualización con una llave de imagen que no fue emitida o no se subió
+    @patch("update_product.app.images.is_uploaded_image")
+    @patch("update_product.app.products.validate_write")
+    def test_update_product_invalid_image_key(self, mock_validate_write, mock_is_uploaded_image):
+        mock_validate_write.return_value = None
+        mock_is_uploaded_image.return_value = False
+        event = dict(mock_event_admin, body=json.dumps({
+            "id": 1,
+            "name": "New Product",
+            "stock": 10,
+            "price": 100,
+            "status": 1,
+            "image_key": "../secret.png",
+            "category_id": 1
+        }))
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 400)
+        self.assertEqual(json.loads(result["body"])["message"], "INVALID_IMAGE")
+
+    # Prueba de actualización cuando otra petición guarda el mismo nombre después de validar
+    @patch("update_product.app.update_product")
+    @patch("update_product.app.products.validate_write")
+    def test_update_product_duplicate_race(self, mock_validate_write, mock_update_product):
+        mock_validate_write.return_value = None
+        mock_update_product.side_effect = pymysql.err.IntegrityError(1062, "Duplicate entry '1-New Product'")
+        event = dict(mock_event_admin, body=json.dumps({
+            "id": 1, "name": "New Product", "stock": 10, "price": 120, "status": 1, "category_id": 1
+        }))
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 400)
+        self.assertEqual(json.loads(result["body"])["message"], "PRODUCT_EXISTS")
 
     # Prueba de actualización del producto con campos faltantes
     def test_update_product_missing_fields(self):
@@ -135,7 +255,11 @@ class TestUpdateProduct(unittest.TestCase):
         self.assertEqual(body["message"], "MISSING_FIELDS")
 
     # Prueba de actualización del producto con datos de imagen inválidos
-    def test_update_product_invalid_image(self):
+    @patch("update_product.app.db")
+    @patch("update_product.app.images")
+    @patch("update_product.app.products.validate_write")
+    def test_update_product_invalid_image(self, mock_validate_write, mock_images, mock_db):
+        mock_validate_write.return_value = None
         result = app.lambda_handler(mock_event_invalid_image, None)
         status_code = result["statusCode"]
         self.assertEqual(status_code, 400, f"Se esperaba el código de estado 400 pero se obtuvo {status_code}. Respuesta: {result}")
@@ -143,6 +267,8 @@ class TestUpdateProduct(unittest.TestCase):
         body = json.loads(result["body"])
         self.assertIn("message", body)
         self.assertEqual(body["message"], "INVALID_IMAGE")
+        mock_images.store_original.assert_not_called()
+        mock_db.get_connection.assert_not_called()
 
     # Prueba de actualización del producto con acceso prohibido
     def test_update_product_forbidden(self):
@@ -156,9 +282,9 @@ class TestUpdateProduct(unittest.TestCase):
 
     # Prueba de actualización del producto cuando la categoría no se encuentra
     @patch("update_product.app.update_product")
-    @patch("update_product.app.category_exists")
-    def test_update_product_category_not_found(self, mock_category_exists, mock_update_product):
-        mock_category_exists.return_value = False
+    @patch("update_product.app.products.validate_write")
+    def test_update_product_category_not_found(self, mock_validate_write, mock_update_product):
+        mock_validate_write.return_value = "CATEGORY_NOT_FOUND"
         result = app.lambda_handler(mock_event_category_not_found, None)
         status_code = result["statusCode"]
         self.assertEqual(status_code, 400, f"Se esperaba el código de estado 400 pero se obtuvo {status_code}. Respuesta: {result}")
@@ -127,6 +127,214 @@ class TestLambdaHandler(unittest.TestCase):
         body = json.loads(result["body"])
         self.assertEqual(body["message"], "INTERNAL_SERVER_ERROR")
 
+    def sale_rows(self):
+        return [
+            {"sale_id": 1, "createdAt": datetime(2023, 6, 1, 10, 30, 0), "status": 1, "total": Decimal('100.00'),
+             "product_id": 101, "name": "Product A", "price": Decimal('50.00'), "quantity": 1},
+            {"sale_id": 1, "createdAt": datetime(2023, 6, 1, 10, 30, 0), "status": 1, "total": Decimal('100.00'),
+             "product_id": 102, "name": "Product B", "price": Decimal('50.00'), "quantity": 1},
+            {"sale_id": 2, "createdAt": datetime(2023, 6, 2, 9, 0, 0), "status": 0, "total": Decimal('20.00'),
+             "product_id": 101, "name": "Product A", "price": Decimal('10.00'), "quantity": 2}
+        ]
+
+    # Prueba para verificar que las ventas se agrupan conforme llegan las filas ordenadas.
+    def test_group_sales_incremental(self):
+        sales = list(app.group_sales(iter(self.sale_rows())))
+
+        self.assertEqual([sale["sale_id"] for sale in sales], [1, 2])
+        self.assertEqual(len(sales[0]["products"]), 2)
+        self.assertEqual(sales[1]["products"][0]["quantity"], 2)
+
+    # Prueba para verificar que el CSV escribe una fila por producto vendido.
+    def test_serialize_sale_csv(self):
+        sale = next(app.group_sales(iter(self.sale_rows())))
+
+        lines = app.serialize_sale(sale, "csv").splitlines()
+
+        self.assertEqual(lines, ["1,2023-06-01 10:30:00,1,100.0,101,Product A,50.0,1",
+                                 "1,2023-06-01 10:30:00,1,100.0,102,Product B,50.0,1"])
+
+    # Prueba para verificar que un archivo pequeño se sube en una sola petición.
+    @patch('view_sales_history_per_day.app.aws.get_client')
+    def test_s3_writer_small_file(self, mock_get_client):
+        s3 = mock_get_client.return_value
+        writer = app.S3MultipartWriter("bucket", "key", "text/csv")
+
+        writer.write("a,b\r\n")
+        writer.close()
+
+        s3.put_object.assert_called_once_with(Bucket="bucket", Key="key", Body=b"a,b\r\n", ContentType="text/csv")
+        s3.create_multipart_upload.assert_not_called()
+
+    # Prueba para verificar que un archivo grande se sube por partes sin acumularlo completo.
+    @patch('view_sales_history_per_day.app.EXPORT_PART_SIZE', 4)
+    @patch('view_sales_history_per_day.app.aws.get_client')
+    def test_s3_writer_multipart(self, mock_get_client):
+        s3 = mock_get_client.return_value
+        s3.create_multipart_upload.return_value = {"UploadId": "u1"}
+        s3.upload_part.side_effect = [{"ETag": "e1"}, {"ETag": "e2"}, {"ETag": "e3"}]
+        writer = app.S3MultipartWriter("bucket", "key", "application/x-ndjson")
+
+        writer.write("12345")
+        self.assertEqual(len(writer.buffer), 0)
+        writer.write("678")
+        writer.write("9")
+        writer.write("0")
+        writer.close()
+
+        self.assertEqual([c.kwargs["Body"] for c in s3.upload_part.call_args_list], [b"12345", b"6789", b"0"])
+        s3.complete_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key="key", UploadId="u1",
+            MultipartUpload={"Parts": [{"ETag": "e1", "PartNumber": 1}, {"ETag": "e2", "PartNumber": 2},
+                                       {"ETag": "e3", "PartNumber": 3}]}
+        )
+        s3.put_object.assert_not_called()
+
+    # Prueba para verificar que los rangos largos se exportan a S3 leyendo con un cursor sin búfer.
+    @patch('view_sales_history_per_day.app.EXPORT_BUCKET', "exports")
+    @patch('view_sales_history_per_day.app.aws.get_client')
+    @patch('view_sales_history_per_day.app.db')
+    def test_lambda_handler_export(self, mock_db, mock_get_client):
+        mock_connection = mock_db.get_connection.return_value
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.__iter__.return_value = iter(self.sale_rows())
+        s3 = mock_get_client.return_value
+        s3.generate_presigned_url.return_value = "https://exports/presigned"
+
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin,sales"}}},
+            "body": json.dumps({
+                "startDate": "2023-06-01",
+                "endDate": "2023-06-30"
+            })
+        }
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "EXPORT_READY")
+        self.assertEqual(body["url"], "https://exports/presigned")
+        self.assertEqual(body["sales"], 2)
+        mock_connection.cursor.assert_called_once_with(pymysql.cursors.SSDictCursor)
+        mock_cursor.fetchall.assert_not_called()
+        uploaded = s3.put_object.call_args.kwargs["Body"].decode().splitlines()
+        self.assertEqual([json.loads(line)["sale_id"] for line in uploaded], [1, 2])
+        mock_db.release_connection.assert_called_once_with(mock_connection)
+
+    def test_lambda_handler_invalid_format(self):
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin,sales"}}},
+            "body": json.dumps({
+                "startDate": "2023-06-01",
+                "endDate": "2023-06-01",
+                "format": "xml"
+            })
+        }
+
+        result = app.lambda_handler(event, None)
+        self.assertEqual(result["statusCode"], 400)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "INVALID_FORMAT")
+
+    # Prueba para verificar que cada página consulta primero las ventas y después solo sus líneas.
+    @patch('view_sales_history_per_day.app.db')
+    def test_lambda_handler_page(self, mock_db):
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value
+        mock_cursor.fetchall.side_effect = [
+            [{"sale_id": 4, "createdAt": datetime(2023, 6, 1, 10, 0, 0), "status": 1, "total": Decimal('30.00')},
+             {"sale_id": 6, "createdAt": datetime(2023, 6, 2, 11, 0, 0), "status": 1, "total": Decimal('10.00')}],
+            [{"sale_id": 4, "product_id": 101, "name": "Product A", "price": Decimal('15.00'), "quantity": 2},
+             {"sale_id": 6, "product_id": 102, "name": "Product B", "price": Decimal('10.00'), "quantity": 1}]
+        ]
+
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin,sales"}}},
+            "body": json.dumps({
+                "startDate": "2023-06-01",
+                "endDate": "2023-06-30",
+                "after": {"createdAt": "2023-06-01 10:00:00", "sale_id": 3},
+                "limit": 2
+            })
+        }
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "SALES_HISTORY_FETCHED")
+        self.assertEqual([sale["sale_id"] for sale in body["sales"]], [4, 6])
+        self.assertEqual(body["sales"][0]["products"][0]["quantity"], 2)
+        self.assertEqual(body["next_after"], {"createdAt": "2023-06-02 11:00:00", "sale_id": 6})
+        page_query, page_params = mock_cursor.execute.call_args_list[0][0]
+        self.assertIn("(createdAt > %s OR (createdAt = %s AND id > %s))", page_query)
+        self.assertIn("ORDER BY createdAt, id", page_query)
+        self.assertNotIn("JOIN", page_query)
+        after = datetime(2023, 6, 1, 10, 0, 0)
+        self.assertEqual(page_params[2:], [after, after, 3, 2])
+        self.assertEqual(mock_cursor.execute.call_args_list[1][0][1], [4, 6])
+
+    def test_lambda_handler_invalid_page(self):
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin,sales"}}},
+            "body": json.dumps({
+                "startDate": "2023-06-01",
+                "endDate": "2023-06-30",
+                "limit": 5000
+            })
+        }
+
+        result = app.lambda_handler(event, None)
+        self.assertEqual(result["statusCode"], 400)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "INVALID_PAGINATION")
+
+    # Prueba para verificar que un cursor que no es el next_after de una página se rechaza.
+    def test_lambda_handler_invalid_cursor(self):
+        for after in (3, {"sale_id": 3}, {"createdAt": "2023-06-01", "sale_id": 3}):
+            event = {
+                "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin,sales"}}},
+                "body": json.dumps({
+                    "startDate": "2023-06-01",
+                    "endDate": "2023-06-30",
+                    "after": after
+                })
+            }
+
+            result = app.lambda_handler(event, None)
+            self.assertEqual(result["statusCode"], 400)
+            body = json.loads(result["body"])
+            self.assertEqual(body["message"], "INVALID_PAGINATION")
+
+    # Prueba para verificar que el modo resumen devuelve totales por día calculados en SQL.
+    @patch('view_sales_history_per_day.app.db')
+    def test_lambda_handler_summary(self, mock_db):
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value
+        mock_cursor.fetchall.return_value = [
+            {"day": datetime(2023, 6, 1).date(), "total_sales": Decimal('130.00'), "transactions": Decimal('3'),
+             "cancelled_transactions": Decimal('1')}
+        ]
+
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admin,sales"}}},
+            "body": json.dumps({
+                "startDate": "2023-06-01",
+                "endDate": "2023-06-30",
+                "summary": True
+            })
+        }
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "SALES_SUMMARY_FETCHED")
+        self.assertEqual(body["days"], [{"day": "2023-06-01", "total_sales": 130.0, "transactions": 3,
+                                         "cancelled_transactions": 1}])
+        query = mock_cursor.execute.call_args[0][0]
+        self.assertIn("GROUP BY DATE(createdAt)", query)
+        self.assertNotIn("sales_products", query)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,42 @@
+import json
+import unittest
+from unittest.mock import patch
+from bulk_cancel_sales import app
+from tests.conftest import api_event
+
+class TestBulkCancelSales(unittest.TestCase):
+
+    # Prueba para verificar que se reporta el resultado de cada id en una sola transacción.
+    @patch("bulk_cancel_sales.app.cancellations.cancel")
+    @patch("bulk_cancel_sales.app.db")
+    def test_bulk_cancel(self, mock_db, mock_cancel):
+        mock_cancel.return_value = {1: "CANCELLED", 2: "ALREADY_CANCELLED", 3: "ID_NOT_FOUND"}
+
+        result = app.lambda_handler(api_event({"ids": [3, 1, 2]}), None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual(body["cancelled"], 1)
+        self.assertEqual(body["results"], [
+            {"id": 3, "message": "ID_NOT_FOUND"},
+            {"id": 1, "message": "CANCELLED"},
+            {"id": 2, "message": "ALREADY_CANCELLED"}
+        ])
+        mock_db.get_connection.assert_called_once()
+        mock_db.get_connection.return_value.commit.assert_called_once()
+
+    def test_bulk_cancel_invalid_id(self):
+        result = app.lambda_handler(api_event({"ids": [1, "2"]}), None)
+        self.assertEqual(result["statusCode"], 400)
+        self.assertEqual(json.loads(result["body"])["message"], "INVALID_ID")
+
+    def test_bulk_cancel_too_many_ids(self):
+        result = app.lambda_handler(api_event({"ids": list(range(1, app.MAX_SALE_IDS + 2))}), None)
+        self.assertEqual(result["statusCode"], 413)
+
+    def test_bulk_cancel_forbidden(self):
+        result = app.lambda_handler(api_event({"ids": [1]}, role="sales"), None)
+        self.assertEqual(result["statusCode"], 403)
+
+if __name__ == '__main__':
+    unittest.main()
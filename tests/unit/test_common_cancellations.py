@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import MagicMock
+from balu_common import cancellations, inventory, sales_summary
+
+class TestCancellations(unittest.TestCase):
+
+    # Prueba para verificar que solo las ventas activas se cancelan y su stock vuelve con un solo UPDATE.
+    def test_cancel(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(3, 1), (5, 0), (8, 1)]
+
+        outcomes = cancellations.cancel(cursor, [8, 3, 5, 9, 3])
+
+        self.assertEqual(outcomes, {3: "CANCELLED", 5: "ALREADY_CANCELLED", 8: "CANCELLED", 9: "ID_NOT_FOUND"})
+        calls = [c[0] for c in cursor.execute.call_args_list]
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(calls[0][1], [3, 5, 8, 9])
+        self.assertEqual(calls[1], ("UPDATE sales SET status = 0 WHERE id IN (%s, %s) AND status = 1", [3, 8]))
+        self.assertIn("JOIN (", calls[2][0])
+        self.assertEqual(calls[2][1], [3, 8])
+        self.assertEqual(calls[3], (inventory.CANCELLATION_MOVEMENTS.format(ids="%s, %s"), [3, 8]))
+        self.assertEqual(calls[4][0], sales_summary.DAY_CANCEL_UPSERT.format(ids="%s, %s"))
+        self.assertIn(calls[4][1][0], range(sales_summary.DAY_SLOTS))
+        self.assertEqual(calls[4][1][1:], [3, 8])
+        self.assertEqual(calls[6], (sales_summary.TOTALS_CANCEL_UPSERT.format(ids="%s, %s"), [3, 8]))
+
+    # Prueba para verificar que sin ventas activas no se toca el stock ni el resumen.
+    def test_cancel_nothing_active(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(5, 0)]
+
+        self.assertEqual(cancellations.cancel(cursor, [5, 6]), {5: "ALREADY_CANCELLED", 6: "ID_NOT_FOUND"})
+        cursor.execute.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+from balu_common import catalog_cache
+
+class TestCatalogCache(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = catalog_cache.LocalBackend()
+        catalog_cache.set_backend(self.backend)
+
+    def tearDown(self):
+        catalog_cache.reset()
+
+    # Prueba para verificar que una segunda lectura no vuelve a consultar la base de datos.
+    def test_read_through(self):
+        loader = MagicMock(return_value=[{"id": 1, "price": Decimal("12.50")}])
+
+        first = catalog_cache.get_or_load("products:1", loader)
+        second = catalog_cache.get_or_load("products:1", loader)
+
+        loader.assert_called_once()
+        self.assertEqual(first, second)
+
+    # Prueba para verificar que otro contenedor reutiliza la entrada del almacén compartido.
+    def test_shared_backend_hit(self):
+        catalog_cache.get_or_load("products:1", lambda: [{"id": 1, "price": Decimal("12.50")}])
+        catalog_cache._local.clear()
+
+        loader = MagicMock()
+        result = catalog_cache.get_or_load("products:1", loader)
+
+        loader.assert_not_called()
+        self.assertEqual(result, [{"id": 1, "price": 12.5}])
+
+    # Prueba para verificar que una escritura invalida la copia local y la compartida.
+    def test_invalidate(self):
+        catalog_cache.get_or_load("products:1", lambda: ["old"])
+
+        catalog_cache.invalidate()
+
+        self.assertEqual(catalog_cache.get_or_load("products:1", lambda: ["new"]), ["new"])
+        self.assertEqual(self.backend.get_version(), 1)
+
+    # Prueba para verificar que la copia local expira.
+    def test_local_entry_expires(self):
+        catalog_cache.get_or_load("categories:0", lambda: ["old"])
+        catalog_cache._local["categories:0"] = (["old"], 0)
+        self.backend.bump_version()
+
+        self.assertEqual(catalog_cache.get_or_load("categories:0", lambda: ["new"]), ["new"])
+
+    # Prueba para verificar que un fallo del almacén compartido no impide leer el catálogo.
+    def test_backend_failure_falls_back_to_loader(self):
+        broken = MagicMock()
+        broken.get_version.side_effect = Exception("unavailable")
+        catalog_cache.set_backend(broken)
+
+        self.assertEqual(catalog_cache.get_or_load("product:1", lambda: {"id": 1}), {"id": 1})
+        broken.set.assert_not_called()
+
+    # Prueba para verificar que los errores del cargador no se guardan en caché.
+    def test_loader_errors_are_not_cached(self):
+        with self.assertRaises(Exception):
+            catalog_cache.get_or_load("product:9", MagicMock(side_effect=Exception("PRODUCT_NOT_FOUND")))
+        self.assertEqual(catalog_cache.get_or_load("product:9", lambda: {"id": 9}), {"id": 9})
+
+    # Prueba para verificar que se usa DynamoDB cuando hay tabla configurada.
+    @patch("balu_common.catalog_cache.TABLE_NAME", "catalog-cache")
+    def test_dynamodb_backend_selected(self):
+        catalog_cache.reset()
+        backend = catalog_cache.get_backend()
+        self.assertIsInstance(backend, catalog_cache.DynamoDBBackend)
+        self.assertEqual(backend.table_name, "catalog-cache")
+
+if __name__ == '__main__':
+    unittest.main()
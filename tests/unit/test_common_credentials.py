@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+import pymysql
+from balu_common import credentials, db
+
+mock_secret = {
+    "host": "localhost",
+    "username": "user",
+    "password": "password",
+    "dbname": "cafe_balu"
+}
+
+rotated_secret = dict(mock_secret, password="rotated")
+
+class TestCredentials(unittest.TestCase):
+
+    def setUp(self):
+        credentials.invalidate()
+
+    def tearDown(self):
+        credentials.invalidate()
+
+    # Prueba para verificar que el secreto se pide una sola vez mientras no expire.
+    @patch("balu_common.credentials._fetch_secret", return_value=mock_secret)
+    def test_secret_is_cached(self, mock_fetch):
+        self.assertEqual(credentials.get_secret(), mock_secret)
+        self.assertEqual(credentials.get_secret(), mock_secret)
+        mock_fetch.assert_called_once()
+
+    # Prueba para verificar que el secreto se vuelve a pedir al expirar el TTL.
+    @patch("balu_common.credentials._fetch_secret", side_effect=[mock_secret, rotated_secret])
+    def test_secret_expires(self, mock_fetch):
+        credentials.get_secret()
+        credentials._cached_at -= credentials.CACHE_TTL + 1
+
+        self.assertEqual(credentials.get_secret(), rotated_secret)
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    # Prueba para verificar que force_refresh ignora la caché.
+    @patch("balu_common.credentials._fetch_secret", side_effect=[mock_secret, rotated_secret])
+    def test_force_refresh(self, mock_fetch):
+        credentials.get_secret()
+        self.assertEqual(credentials.get_secret(force_refresh=True), rotated_secret)
+
+    # Prueba para verificar que el secreto se reutiliza desde el archivo de caché.
+    @patch("balu_common.credentials._fetch_secret", return_value=mock_secret)
+    def test_secret_cache_file(self, mock_fetch):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_file = os.path.join(tmp, "secret.json")
+            with patch("balu_common.credentials.CACHE_FILE", cache_file):
+                credentials.get_secret()
+                self.assertEqual(os.stat(cache_file).st_mode & 0o777, 0o600)
+                with open(cache_file) as f:
+                    self.assertEqual(json.load(f)["secret"], mock_secret)
+
+                # Simula un runtime nuevo en el mismo sandbox
+                credentials._cached_secret = None
+                self.assertEqual(credentials.get_secret(), mock_secret)
+                mock_fetch.assert_called_once()
+
+                credentials.invalidate()
+                self.assertFalse(os.path.exists(cache_file))
+
+    # Prueba para verificar que se refresca el secreto y se reintenta si MySQL rechaza las credenciales.
+    @patch("balu_common.db.get_secret")
+    @patch("balu_common.db.pymysql.connect")
+    def test_connect_refreshes_rotated_secret(self, mock_connect, mock_get_secret):
+        mock_get_secret.side_effect = lambda force_refresh=False: rotated_secret if force_refresh else mock_secret
+        mock_connect.side_effect = [pymysql.err.OperationalError(1045, "Access denied"), "connection"]
+
+        self.assertEqual(db._connect(), "connection")
+        self.assertEqual(mock_connect.call_args.kwargs["password"], "rotated")
+
+    # Prueba para verificar que otros errores de conexión no provocan un refresco.
+    @patch("balu_common.db.get_secret", return_value=mock_secret)
+    @patch("balu_common.db.pymysql.connect")
+    def test_connect_other_errors_are_raised(self, mock_connect, mock_get_secret):
+        mock_connect.side_effect = pymysql.err.OperationalError(2003, "Can't connect")
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            db._connect()
+        mock_get_secret.assert_called_once_with()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from balu_common import db
+
+mock_secret = {
+    "host": "localhost",
+    "username": "user",
+    "password": "password",
+    "dbname": "cafe_balu"
+}
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        db.close_connection()
+
+    def tearDown(self):
+        db.close_connection()
+
+    # Prueba para verificar que la conexión se reutiliza entre llamadas.
+    @patch("balu_common.db.get_secret", return_value=mock_secret)
+    @patch("balu_common.db.pymysql.connect")
+    def test_connection_is_reused(self, mock_connect, mock_get_secret):
+        mock_connect.return_value.server_status = 0
+
+        first = db.get_connection()
+        db.release_connection(first)
+        second = db.get_connection()
+
+        self.assertIs(first, second)
+        mock_connect.assert_called_once()
+        mock_get_secret.assert_called_once()
+        first.close.assert_not_called()
+
+    # Prueba para verificar que una conexión inactiva se valida con ping.
+    @patch("balu_common.db.get_secret", return_value=mock_secret)
+    @patch("balu_common.db.pymysql.connect")
+    def test_stale_connection_is_pinged(self, mock_connect, _):
+        connection = db.get_connection()
+        db._last_used -= db.PING_INTERVAL + 1
+
+        db.get_connection()
+
+        connection.ping.assert_called_once_with(reconnect=True)
+        mock_connect.assert_called_once()
+
+    # Prueba para verificar que se reconecta si el ping falla.
+    @patch("balu_common.db.get_secret", return_value=mock_secret)
+    @patch("balu_common.db.pymysql.connect")
+    def test_reconnect_when_ping_fails(self, mock_connect, _):
+        stale = MagicMock()
+        stale.ping.side_effect = pymysql.err.OperationalError(2006, "MySQL server has gone away")
+        fresh = MagicMock()
+        mock_connect.side_effect = [stale, fresh]
+
+        db.get_connection()
+        db._last_used -= db.PING_INTERVAL + 1
+
+        self.assertIs(db.get_connection(), fresh)
+        stale.close.assert_called_once()
+
+    # Prueba para verificar que una transacción abierta se revierte al liberar la conexión.
+    @patch("balu_common.db.get_secret", return_value=mock_secret)
+    @patch("balu_common.db.pymysql.connect")
+    def test_release_rolls_back_open_transaction(self, mock_connect, _):
+        mock_connect.return_value.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+        connection = db.get_connection()
+        db.release_connection(connection)
+
+        connection.rollback.assert_called_once()
+
+    # Prueba para verificar que una conexión cerrada se descarta al liberarla.
+    @patch("balu_common.db.get_secret", return_value=mock_secret)
+    @patch("balu_common.db.pymysql.connect")
+    def test_release_discards_closed_connection(self, mock_connect, _):
+        closed = MagicMock()
+        closed.open = False
+        mock_connect.side_effect = [closed, MagicMock()]
+
+        db.release_connection(db.get_connection())
+
+        self.assertIsNot(db.get_connection(), closed)
+        self.assertEqual(mock_connect.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
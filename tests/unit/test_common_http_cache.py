@@ -0,0 +1,24 @@
+import unittest
+from balu_common import http_cache
+
+class TestHttpCache(unittest.TestCase):
+
+    # Prueba para verificar que el ETag es estable y depende del contenido.
+    def test_etag_for(self):
+        self.assertEqual(http_cache.etag_for("{}"), http_cache.etag_for("{}"))
+        self.assertNotEqual(http_cache.etag_for("{}"), http_cache.etag_for("[]"))
+        self.assertTrue(http_cache.etag_for("{}").startswith('"'))
+
+    # Prueba para verificar las formas aceptadas de If-None-Match.
+    def test_matches_if_none_match(self):
+        etag = '"abc"'
+        self.assertTrue(http_cache.matches_if_none_match({"headers": {"If-None-Match": '"abc"'}}, etag))
+        self.assertTrue(http_cache.matches_if_none_match({"headers": {"if-none-match": 'W/"abc"'}}, etag))
+        self.assertTrue(http_cache.matches_if_none_match({"headers": {"If-None-Match": '"x", "abc"'}}, etag))
+        self.assertTrue(http_cache.matches_if_none_match({"headers": {"If-None-Match": "*"}}, etag))
+        self.assertFalse(http_cache.matches_if_none_match({"headers": {"If-None-Match": '"x"'}}, etag))
+        self.assertFalse(http_cache.matches_if_none_match({"headers": None}, etag))
+        self.assertFalse(http_cache.matches_if_none_match({}, etag))
+
+if __name__ == '__main__':
+    unittest.main()
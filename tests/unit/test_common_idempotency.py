@@ -0,0 +1,70 @@
+import unittest
+import pymysql
+from unittest.mock import patch, MagicMock
+from pymysql.constants import ER
+from balu_common import idempotency
+
+DUPLICATE = pymysql.err.IntegrityError(ER.DUP_ENTRY, "Duplicate entry 'cart-123' for key 'PRIMARY'")
+
+class TestIdempotency(unittest.TestCase):
+
+    # Prueba para verificar que el encabezado se lee sin importar mayúsculas.
+    def test_get_key(self):
+        self.assertEqual(idempotency.get_key({"headers": {"IDEMPOTENCY-KEY": "abc"}}), "abc")
+        self.assertIsNone(idempotency.get_key({"headers": None}))
+        with self.assertRaises(ValueError):
+            idempotency.get_key({"headers": {"Idempotency-Key": "x" * 256}})
+
+    # Prueba para verificar que el mismo cuerpo produce la misma huella sin importar el orden de las llaves.
+    def test_request_hash(self):
+        self.assertEqual(idempotency.request_hash({"total": 10, "products": []}),
+                         idempotency.request_hash({"products": [], "total": 10}))
+        self.assertNotEqual(idempotency.request_hash({"total": 10}), idempotency.request_hash({"total": 11}))
+
+    # Prueba para verificar que una llave nueva se reserva con un solo INSERT.
+    def test_claim_new_key(self):
+        cursor = MagicMock()
+
+        self.assertIsNone(idempotency.claim(cursor, "cart-123", "hash"))
+        cursor.execute.assert_called_once()
+        self.assertEqual(cursor.execute.call_args[0][1], ("cart-123", "hash", idempotency.TTL_HOURS))
+
+    # Prueba para verificar que un reintento devuelve la respuesta guardada.
+    def test_claim_replay(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = [DUPLICATE, None]
+        cursor.fetchone.return_value = ("hash", 200, '{"sale_id": 1}', 0)
+
+        self.assertEqual(idempotency.claim(cursor, "cart-123", "hash"), {"statusCode": 200, "body": '{"sale_id": 1}'})
+
+    # Prueba para verificar que la misma llave con otro cuerpo se rechaza.
+    def test_claim_reused_key(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = [DUPLICATE, None]
+        cursor.fetchone.return_value = ("other", 200, '{"sale_id": 1}', 0)
+
+        with self.assertRaises(idempotency.KeyReusedError):
+            idempotency.claim(cursor, "cart-123", "hash")
+
+    # Prueba para verificar que una llave vencida que aún no se purga se reutiliza.
+    def test_claim_expired_key(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = [DUPLICATE, None, None]
+        cursor.fetchone.return_value = ("other", 200, '{"sale_id": 1}', 1)
+
+        self.assertIsNone(idempotency.claim(cursor, "cart-123", "hash"))
+        self.assertTrue(cursor.execute.call_args[0][0].startswith("UPDATE idempotency_keys"))
+
+    # Prueba para verificar que la purga borra por lotes hasta vaciar las llaves vencidas.
+    @patch("balu_common.idempotency.db")
+    def test_purge(self, mock_db):
+        cursor = mock_db.get_connection.return_value.cursor.return_value
+        counts = iter([idempotency.PURGE_BATCH_SIZE, 3])
+        cursor.execute.side_effect = lambda *args: setattr(cursor, "rowcount", next(counts))
+
+        self.assertEqual(idempotency.purge(), idempotency.PURGE_BATCH_SIZE + 3)
+        self.assertEqual(cursor.execute.call_count, 2)
+        mock_db.release_connection.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import io
+import json
+import base64
+import hashlib
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+from PIL import Image
+from balu_common import images
+
+def png_data_url(size=(1600, 1200)):
+    output = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(output, "PNG")
+    return "data:image/png;base64," + base64.b64encode(output.getvalue()).decode()
+
+NOT_FOUND = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+class TestImages(unittest.TestCase):
+
+    # Prueba para verificar que un PNG se guarda como PNG y no como JPEG.
+    @patch("balu_common.images.aws.get_client")
+    def test_store_original_keeps_content_type(self, mock_get_client):
+        mock_get_client.return_value.head_object.side_effect = NOT_FOUND
+        data_url = png_data_url((10, 10))
+
+        key = images.store_original(data_url)
+
+        _, binary_data = images.parse_data_url(data_url)
+        self.assertEqual(key, f"images/{hashlib.sha256(binary_data).hexdigest()}.png")
+        kwargs = mock_get_client.return_value.put_object.call_args.kwargs
+        self.assertEqual(kwargs["ContentType"], "image/png")
+        self.assertEqual(kwargs["Key"], key)
+
+    # Prueba para verificar que una imagen ya guardada no se vuelve a subir.
+    @patch("balu_common.images.aws.get_client")
+    def test_store_original_reuses_existing_object(self, mock_get_client):
+        mock_get_client.return_value.head_object.return_value = {"ContentType": "image/png", "ContentLength": 10}
+        data_url = png_data_url((10, 10))
+
+        first = images.store_original(data_url)
+        second = images.store_original(data_url)
+
+        self.assertEqual(first, second)
+        mock_get_client.return_value.put_object.assert_not_called()
+        # Reusar el objeto renueva su fecha para que sweep no lo borre
+        mock_get_client.return_value.copy_object.assert_called_with(
+            Bucket=images.BUCKET_NAME, Key=first, CopySource={"Bucket": images.BUCKET_NAME, "Key": first},
+            MetadataDirective="REPLACE", ContentType="image/png")
+
+    # Prueba para verificar que sin cola configurada los trabajos quedan en la cola local.
+    def test_enqueue_uses_local_queue(self):
+        images.enqueue_variants(7, "https://cafe-balu-images.s3.amazonaws.com/images/a.png")
+
+        queue = images.get_queue()
+        self.assertIsInstance(queue, images.LocalQueue)
+        self.assertEqual(queue.jobs, [{"product_id": 7, "image": "https://cafe-balu-images.s3.amazonaws.com/images/a.png"}])
+
+    # Prueba para verificar que con cola configurada el trabajo se envía a SQS.
+    @patch("balu_common.images.aws.get_client")
+    def test_enqueue_uses_sqs(self, mock_get_client):
+        images.set_queue(images.SQSQueue("https://sqs/queue"))
+
+        images.enqueue_variants(7, "https://cafe-balu-images.s3.amazonaws.com/images/a.png")
+
+        kwargs = mock_get_client.return_value.send_message.call_args.kwargs
+        self.assertEqual(kwargs["QueueUrl"], "https://sqs/queue")
+        self.assertEqual(json.loads(kwargs["MessageBody"])["product_id"], 7)
+
+    # Prueba para verificar que las variantes WebP respetan el tamaño máximo de cada una.
+    def test_render_variants(self):
+        _, original = images.parse_data_url(png_data_url())
+
+        rendered = images.render_variants(original)
+
+        self.assertEqual(set(rendered), set(images.VARIANTS))
+        for name, data in rendered.items():
+            with Image.open(io.BytesIO(data)) as variant:
+                self.assertEqual(variant.format, "WEBP")
+                self.assertEqual(max(variant.size), images.VARIANTS[name])
+
+    # Prueba para verificar que el trabajador sube las variantes y las registra en el producto.
+    @patch("balu_common.images.catalog_cache.invalidate")
+    @patch("balu_common.images.db")
+    @patch("balu_common.images.aws.get_client")
+    def test_process(self, mock_get_client, mock_db, mock_invalidate):
+        _, original = images.parse_data_url(png_data_url())
+        s3 = mock_get_client.return_value
+        s3.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=original))}
+        s3.head_object.side_effect = NOT_FOUND
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value
+        mock_cursor.rowcount = 1
+        url = images.public_url("images/abc.png")
+
+        images.get_queue().send({"product_id": 3, "image": url})
+        images.get_queue().drain()
+
+        s3.get_object.assert_called_once_with(Bucket=images.BUCKET_NAME, Key="images/abc.png")
+        keys = [c.kwargs["Key"] for c in s3.put_object.call_args_list]
+        self.assertEqual(keys, ["images/thumb/abc.webp", "images/medium/abc.webp"])
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertEqual(json.loads(params[0]), {"thumb": images.public_url("images/thumb/abc.webp"),
+                                                 "medium": images.public_url("images/medium/abc.webp")})
+        self.assertEqual(params[1:], (3, url))
+        mock_invalidate.assert_called_once()
+
+    # Prueba para verificar que si las variantes de la imagen ya existen solo se enlazan.
+    @patch("balu_common.images.catalog_cache.invalidate")
+    @patch("balu_common.images.db")
+    @patch("balu_common.images.aws.get_client")
+    def test_process_reuses_existing_variants(self, mock_get_client, mock_db, mock_invalidate):
+        s3 = mock_get_client.return_value
+        s3.head_object.return_value = {"ContentType": "image/webp", "ContentLength": 10}
+        mock_db.get_connection.return_value.cursor.return_value.rowcount = 1
+
+        self.assertTrue(images.process({"product_id": 3, "image": images.public_url("images/abc.png")}))
+
+        s3.get_object.assert_not_called()
+        s3.put_object.assert_not_called()
+
+    # Prueba para verificar que el barrido borra solo objetos huérfanos fuera del periodo de gracia.
+    @patch("balu_common.images.db")
+    @patch("balu_common.images.aws.get_client")
+    def test_sweep(self, mock_get_client, mock_db):
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.__iter__.side_effect = lambda: iter([
+            (images.public_url("images/used.png"), None),
+            (images.public_url("images/other.jpg"), json.dumps({"thumb": images.public_url("images/thumb/legacy.webp")})),
+            ("https://example.com/external.jpg", None)
+        ])
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        recent = datetime.now(timezone.utc)
+        s3 = mock_get_client.return_value
+        s3.get_paginator.return_value.paginate.return_value = [{"Contents": [
+            {"Key": "images/used.png", "LastModified": old},
+            {"Key": "images/thumb/used.webp", "LastModified": old},
+            {"Key": "images/thumb/legacy.webp", "LastModified": old},
+            {"Key": "images/orphan.png", "LastModified": old},
+            {"Key": "images/medium/orphan.webp", "LastModified": old},
+            {"Key": "images/just-uploaded.png", "LastModified": recent}
+        ]}]
+
+        self.assertEqual(images.sweep(), 2)
+
+        s3.delete_objects.assert_called_once_with(Bucket=images.BUCKET_NAME, Delete={
+            "Objects": [{"Key": "images/orphan.png"}, {"Key": "images/medium/orphan.webp"}], "Quiet": True
+        })
+
+    # Prueba para verificar que el barrido no borra una llave que un producto empezó a usar tras la primera lectura.
+    @patch("balu_common.images.referenced_keys")
+    @patch("balu_common.images.aws.get_client")
+    def test_sweep_rechecks_references(self, mock_get_client, mock_referenced_keys):
+        mock_referenced_keys.side_effect = [set(), {"images/reused.png"}]
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        s3 = mock_get_client.return_value
+        s3.get_paginator.return_value.paginate.return_value = [{"Contents": [
+            {"Key": "images/reused.png", "LastModified": old},
+            {"Key": "images/orphan.png", "LastModified": old}
+        ]}]
+
+        self.assertEqual(images.sweep(), 1)
+
+        s3.delete_objects.assert_called_once_with(Bucket=images.BUCKET_NAME, Delete={
+            "Objects": [{"Key": "images/orphan.png"}], "Quiet": True
+        })
+
+    # Prueba para verificar que no se registran variantes si el producto ya cambió de imagen.
+    @patch("balu_common.images.catalog_cache.invalidate")
+    @patch("balu_common.images.db")
+    def test_record_variants_stale(self, mock_db, mock_invalidate):
+        mock_db.get_connection.return_value.cursor.return_value.rowcount = 0
+
+        self.assertFalse(images.record_variants(3, "https://old", {"thumb": "https://t"}))
+        mock_invalidate.assert_not_called()
+
+    # Prueba para verificar que las llaves repetidas o con otro formato no generan un HEAD a S3.
+    @patch("balu_common.images.aws.get_client")
+    def test_uploaded_images(self, mock_get_client):
+        valid = "images/3f2b8c1e-1111-4a2b-9c3d-abcdefabcdef.png"
+        missing = "images/3f2b8c1e-2222-4a2b-9c3d-abcdefabcdef.jpg"
+        heads = {valid: {"ContentType": "image/png", "ContentLength": 1024}}
+
+        def head_object(Bucket, Key):
+            if Key not in heads:
+                raise NOT_FOUND
+            return heads[Key]
+        mock_get_client.return_value.head_object.side_effect = head_object
+
+        uploaded = images.uploaded_images([valid, missing, valid, None, "images/../x.png"])
+
+        self.assertEqual(uploaded, {valid})
+        self.assertEqual(mock_get_client.return_value.head_object.call_count, 2)
+
+    # Prueba para verificar que un error de permisos de S3 no se confunde con una imagen inexistente.
+    @patch("balu_common.images.aws.get_client")
+    def test_object_exists_access_denied(self, mock_get_client):
+        mock_get_client.return_value.head_object.side_effect = ClientError({"Error": {"Code": "403"}}, "HeadObject")
+
+        with self.assertRaises(ClientError):
+            images.is_uploaded_image("images/3f2b8c1e-1111-4a2b-9c3d-abcdefabcdef.png")
+
+        mock_get_client.return_value.head_object.side_effect = NOT_FOUND
+        self.assertIsNone(images.object_exists("images/a.png"))
+
+if __name__ == '__main__':
+    unittest.main()
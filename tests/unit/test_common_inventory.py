@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import MagicMock
+from balu_common import inventory
+
+class TestInventory(unittest.TestCase):
+
+    # Prueba para verificar que los ajustes sin cambio de stock no dejan movimiento.
+    def test_record_adjustments(self):
+        cursor = MagicMock()
+
+        inventory.record_adjustments(cursor, {4: 0, 9: -3, 2: 5})
+
+        cursor.executemany.assert_called_once_with(inventory.ADJUSTMENT_MOVEMENT, [(2, 5), (9, -3)])
+
+        cursor.reset_mock()
+        inventory.record_adjustments(cursor, {4: 0})
+        cursor.executemany.assert_not_called()
+
+    # Prueba para verificar que la compactación suma al snapshot solo el rango nuevo de movimientos.
+    def test_compact(self):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.fetchone.side_effect = [(120,), (180,)]
+
+        self.assertEqual(inventory.compact(connection), 180)
+
+        self.assertIn("FOR UPDATE", cursor.execute.call_args_list[0][0][0])
+        self.assertEqual(cursor.execute.call_args_list[1][0][1], (120, 120, inventory.COMPACTION_LAG_MINUTES))
+        self.assertEqual(cursor.execute.call_args_list[2][0], (inventory.SNAPSHOT_UPSERT, (180, 120, 180)))
+        connection.commit.assert_called_once()
+
+    # Prueba para verificar que sin movimientos nuevos la compactación no escribe.
+    def test_compact_nothing_new(self):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.fetchone.side_effect = [(120,), (120,)]
+
+        self.assertEqual(inventory.compact(connection), 120)
+        self.assertEqual(cursor.execute.call_count, 2)
+
+    # Prueba para verificar que la conciliación solo reporta los productos que no coinciden con el libro.
+    def test_reconcile(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(1, 10, 10), (2, 4, 7)]
+
+        drift = inventory.reconcile(cursor, [1, 2])
+
+        self.assertEqual(drift, [{"product_id": 2, "stock": 4, "ledger_stock": 7}])
+        query, params = cursor.execute.call_args[0]
+        self.assertIn("WHERE p.id IN (%s, %s)", query)
+        self.assertEqual(params, [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import pymysql
+from unittest.mock import MagicMock
+from balu_common import migrations
+
+class TestMigrations(unittest.TestCase):
+
+    def connection_at(self, version):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.fetchone.return_value = (version,)
+        return connection, cursor
+
+    def fail_on_index(self, cursor, error):
+        def execute(query, *args):
+            if "ADD INDEX" in query:
+                raise error
+        cursor.execute.side_effect = execute
+
+    # Prueba para verificar que solo se aplican las migraciones pendientes y en orden.
+    def test_applies_pending_in_order(self):
+        connection, cursor = self.connection_at(1)
+
+        applied = migrations.migrate(connection)
+
+        self.assertEqual(applied, [number for number, _, _ in migrations.MIGRATIONS if number > 1])
+        recorded = [c[0][1][0] for c in cursor.execute.call_args_list if "INSERT INTO schema_migrations" in c[0][0]]
+        self.assertEqual(recorded, applied)
+        self.assertEqual(connection.commit.call_count, len(applied))
+
+    # Prueba para verificar que una base al día no ejecuta nada.
+    def test_up_to_date(self):
+        latest = migrations.MIGRATIONS[-1][0]
+        connection, _ = self.connection_at(latest)
+
+        self.assertEqual(migrations.migrate(connection), [])
+        connection.commit.assert_not_called()
+
+    # Prueba para verificar que se puede detener en una versión concreta.
+    def test_target(self):
+        connection, _ = self.connection_at(0)
+
+        self.assertEqual(migrations.migrate(connection, target=2), [1, 2])
+
+    # Prueba para verificar que un índice que ya existía en una base previa no detiene la migración.
+    def test_existing_index_is_skipped(self):
+        connection, cursor = self.connection_at(1)
+        self.fail_on_index(cursor, pymysql.err.OperationalError(migrations.ER.DUP_KEYNAME, "Duplicate key name"))
+
+        self.assertEqual(migrations.migrate(connection, target=2), [2])
+
+    # Prueba para verificar que otros errores sí detienen la migración.
+    def test_other_errors_propagate(self):
+        connection, cursor = self.connection_at(1)
+        self.fail_on_index(cursor, pymysql.err.OperationalError(1005, "Can't create table"))
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            migrations.migrate(connection)
+        connection.commit.assert_not_called()
+
+    # Prueba para verificar que los índices cubren los filtros de los reportes de ventas.
+    def test_report_indexes_defined(self):
+        statements = " ".join(s for _, _, group in migrations.MIGRATIONS for s in group)
+
+        self.assertIn("sales ADD INDEX idx_sales_created_status (createdAt, status, total)", statements)
+        self.assertIn("sales_products ADD INDEX idx_sales_products_sale (sale_id, product_id, quantity)", statements)
+        self.assertIn("products ADD INDEX idx_products_category_name (category_id, name)", statements)
+
+if __name__ == '__main__':
+    unittest.main()
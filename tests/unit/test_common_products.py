@@ -0,0 +1,55 @@
+import unittest
+import pymysql
+from unittest.mock import patch
+from pymysql.constants import ER
+from balu_common import products
+
+class TestProducts(unittest.TestCase):
+
+    # Prueba para verificar que categoría y nombre duplicado se validan en una sola consulta.
+    @patch("balu_common.products.db")
+    def test_validate_write_single_query(self, mock_db):
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value
+        mock_cursor.fetchone.return_value = (1, 0)
+
+        self.assertIsNone(products.validate_write(2, "Café Latte", 7))
+
+        mock_cursor.execute.assert_called_once_with(products.VALIDATION_QUERY, (2, 2, "café latte", 7))
+        mock_db.release_connection.assert_called_once_with(mock_db.get_connection.return_value)
+
+    # Prueba para verificar que una categoría inexistente se reporta antes que un duplicado.
+    @patch("balu_common.products.db")
+    def test_validate_write_category_not_found(self, mock_db):
+        mock_db.get_connection.return_value.cursor.return_value.fetchone.return_value = (0, 1)
+
+        self.assertEqual(products.validate_write(99, "Latte"), "CATEGORY_NOT_FOUND")
+
+    # Prueba para verificar que se detecta un nombre repetido en la categoría.
+    @patch("balu_common.products.db")
+    def test_validate_write_duplicate(self, mock_db):
+        mock_cursor = mock_db.get_connection.return_value.cursor.return_value
+        mock_cursor.fetchone.return_value = (1, 1)
+
+        self.assertEqual(products.validate_write(2, "Latte"), "PRODUCT_EXISTS")
+        # Sin id de producto se compara contra todos los productos de la categoría
+        self.assertEqual(mock_cursor.execute.call_args[0][1][3], 0)
+
+    # Prueba para verificar que sin categoría solo se valida el nombre.
+    @patch("balu_common.products.db")
+    def test_validate_write_without_category(self, mock_db):
+        mock_db.get_connection.return_value.cursor.return_value.fetchone.return_value = (0, 0)
+
+        self.assertIsNone(products.validate_write(None, "Latte"))
+
+    # Prueba para verificar la traducción de errores de integridad a mensajes para el cliente.
+    def test_integrity_error_message(self):
+        duplicate = pymysql.err.IntegrityError(ER.DUP_ENTRY, "Duplicate entry '2-Latte'")
+        missing_category = pymysql.err.IntegrityError(ER.NO_REFERENCED_ROW_2, "Cannot add or update a child row")
+        other = pymysql.err.IntegrityError(ER.BAD_NULL_ERROR, "Column 'name' cannot be null")
+
+        self.assertEqual(products.integrity_error_message(duplicate), "PRODUCT_EXISTS")
+        self.assertEqual(products.integrity_error_message(missing_category), "CATEGORY_NOT_FOUND")
+        self.assertIsNone(products.integrity_error_message(other))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import json
+import unittest
+import pymysql
+from unittest.mock import patch, MagicMock
+from pymysql.constants import ER
+from balu_common import sale_ingest, sales_summary
+
+def job(ingest_id, products, total=10.0, key=None):
+    return {
+        "ingest_id": ingest_id,
+        "idempotency_key": key or f"ingest:{ingest_id}",
+        "request_hash": "hash-" + ingest_id,
+        "products": products,
+        "total": total,
+        "created_at": "2024-07-01 12:00:00"
+    }
+
+class TestSaleIngest(unittest.TestCase):
+
+    # Prueba para verificar que la venta encolada conserva la hora en que se aceptó y una llave propia.
+    def test_enqueue_local(self):
+        body = {"products": [{"id": 1, "quantity": 2}], "total": 20.0}
+
+        ingest_id = sale_ingest.enqueue(body)
+
+        queued = sale_ingest.get_queue().jobs
+        self.assertEqual(len(queued), 1)
+        self.assertEqual(queued[0]["idempotency_key"], f"ingest:{ingest_id}")
+        self.assertEqual(queued[0]["products"], body["products"])
+        self.assertRegex(queued[0]["created_at"], r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+    # Prueba para verificar las validaciones que no necesitan la base.
+    def test_validate(self):
+        sale_ingest.validate([{"id": 1, "quantity": 1}], 10)
+        with self.assertRaises(ValueError):
+            sale_ingest.validate([{"id": 1, "quantity": 0}], 10)
+        with self.assertRaises(ValueError):
+            sale_ingest.validate([{"id": "1", "quantity": 1}], 10)
+        with self.assertRaises(ValueError):
+            sale_ingest.validate([{"id": 1, "quantity": 1}], "10")
+        with self.assertRaises(ValueError):
+            sale_ingest.validate([1], 10)
+
+    # Prueba para verificar que un lote se escribe con un número fijo de sentencias en una transacción.
+    @patch("balu_common.sale_ingest.db")
+    def test_process_batch(self, mock_db):
+        connection = mock_db.get_connection.return_value
+        cursor = connection.cursor.return_value
+        cursor.fetchall.return_value = [(1, 10), (2, 1)]
+        cursor.lastrowid = 40
+        jobs = [
+            job("a", [{"id": 1, "quantity": 2}, {"id": 2, "quantity": 1}]),
+            job("b", [{"id": 1, "quantity": 3}]),
+            job("c", [{"id": 1, "quantity": 1}])
+        ]
+
+        rejected = sale_ingest.process_batch(jobs)
+
+        self.assertEqual(rejected, [])
+        connection.begin.assert_called_once()
+        connection.commit.assert_called_once()
+        queries = [c[0][0] for c in cursor.execute.call_args_list]
+        self.assertEqual(sum(q.startswith("INSERT INTO idempotency_keys") for q in queries), 3)
+        insert_sales = next(c[0] for c in cursor.execute.call_args_list if c[0][0].startswith("INSERT INTO sales "))
+        self.assertEqual(insert_sales[0].count("(%s, 1, %s, %s)"), 3)
+        lines = cursor.executemany.call_args[0][1]
+        self.assertEqual(lines, [(40, 1, 2), (40, 2, 1), (41, 1, 3), (42, 1, 1)])
+        update = next(c[0] for c in cursor.execute.call_args_list if c[0][0].startswith("UPDATE products"))
+        self.assertEqual(update[1], [1, 6, 2, 1, 1, 2])
+        self.assertIn(((sales_summary.TOTALS_RANGE_UPSERT, (40, 42)),), cursor.execute.call_args_list)
+        stored = [c[0][1] for c in cursor.execute.call_args_list if c[0][0].startswith("UPDATE idempotency_keys")]
+        self.assertEqual([json.loads(params[1])["sale_id"] for params in stored], [40, 41, 42])
+
+    # Prueba para verificar que una venta sin stock se devuelve para reintento y libera su llave.
+    @patch("balu_common.sale_ingest.db")
+    def test_process_batch_rejects_out_of_stock(self, mock_db):
+        cursor = mock_db.get_connection.return_value.cursor.return_value
+        cursor.fetchall.return_value = [(1, 3)]
+        cursor.lastrowid = 7
+        jobs = [job("a", [{"id": 1, "quantity": 2}]), job("b", [{"id": 1, "quantity": 2}]), job("c", [{"id": 9, "quantity": 1}])]
+
+        rejected = sale_ingest.process_batch(jobs)
+
+        self.assertEqual(rejected, ["b", "c"])
+        delete = next(c[0] for c in cursor.execute.call_args_list if c[0][0].startswith("DELETE FROM idempotency_keys"))
+        self.assertEqual(delete[1], ["ingest:b", "ingest:c"])
+        self.assertEqual(cursor.executemany.call_args[0][1], [(7, 1, 2)])
+
+    # Prueba para verificar que una entrega repetida de SQS no vuelve a escribir la venta.
+    @patch("balu_common.sale_ingest.db")
+    def test_process_batch_skips_duplicates(self, mock_db):
+        cursor = mock_db.get_connection.return_value.cursor.return_value
+        duplicate = pymysql.err.IntegrityError(ER.DUP_ENTRY, "Duplicate entry")
+        cursor.execute.side_effect = [duplicate, None]
+        cursor.fetchone.return_value = ("hash-a", 200, '{"sale_id": 3}', 0)
+
+        self.assertEqual(sale_ingest.process_batch([job("a", [{"id": 1, "quantity": 1}])]), [])
+        cursor.executemany.assert_not_called()
+        mock_db.get_connection.return_value.commit.assert_called_once()
+
+    # Prueba para verificar que una venta con un client_id ya guardado no se escribe aunque su llave haya vencido.
+    @patch("balu_common.sale_ingest.db")
+    def test_write_batch_synced_client_id(self, mock_db):
+        cursor = mock_db.get_connection.return_value.cursor.return_value
+        cursor.fetchall.return_value = [("t1-1", 55)]
+        synced = dict(job("a", [{"id": 1, "quantity": 1}]), idempotency_key="sync:t1-1", client_id="t1-1")
+
+        results = sale_ingest.write_batch([synced])
+
+        self.assertEqual(results, [{"message": "DUPLICATE", "sale_id": 55}])
+        stored = next(c[0][1] for c in cursor.execute.call_args_list if c[0][0].startswith("UPDATE idempotency_keys"))
+        self.assertEqual(json.loads(stored[1])["sale_id"], 55)
+        cursor.executemany.assert_not_called()
+        mock_db.get_connection.return_value.commit.assert_called_once()
+
+    # Prueba para verificar que write_batch devuelve un resultado por venta en el orden recibido.
+    @patch("balu_common.sale_ingest.db")
+    def test_write_batch_results(self, mock_db):
+        cursor = mock_db.get_connection.return_value.cursor.return_value
+        cursor.fetchall.return_value = [(1, 2)]
+        cursor.lastrowid = 20
+
+        results = sale_ingest.write_batch([job("a", [{"id": 1, "quantity": 5}]), job("b", [{"id": 1, "quantity": 2}])])
+
+        self.assertEqual(results, [{"message": "INSUFFICIENT_STOCK"}, {"message": "SALE_SAVED", "sale_id": 20}])
+
+    # Prueba para verificar que la cola local entrega los trabajos en lotes.
+    def test_local_queue_batches(self):
+        queue = sale_ingest.get_queue()
+        for number in range(5):
+            queue.send(number)
+        batches = []
+
+        queue.drain_batches(batches.append, 2)
+
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+from balu_common import sales_summary
+
+class TestSalesSummary(unittest.TestCase):
+
+    # Prueba para verificar que una venta suma al día y a cada producto.
+    @patch("balu_common.sales_summary.random.randrange", return_value=5)
+    def test_record_sale(self, mock_randrange):
+        cursor = MagicMock()
+
+        sales_summary.record_sale(cursor, 7)
+
+        mock_randrange.assert_called_once_with(sales_summary.DAY_SLOTS)
+        self.assertEqual(cursor.execute.call_args_list[0][0], (sales_summary.DAY_UPSERT, (5, 1, 1, 0, 7)))
+        self.assertEqual(cursor.execute.call_args_list[1][0], (sales_summary.PRODUCT_UPSERT, (1, 1, 7)))
+        self.assertEqual(cursor.execute.call_args_list[2][0], (sales_summary.TOTALS_UPSERT, (1, 7)))
+
+    # Prueba para verificar que la categoría del acumulado se copia de los productos indicados.
+    def test_sync_categories(self):
+        cursor = MagicMock()
+
+        sales_summary.sync_categories(cursor, [4, 9])
+        sales_summary.sync_categories(cursor, [])
+
+        cursor.execute.assert_called_once_with(sales_summary.CATEGORY_SYNC.format(ids="%s, %s"), [4, 9])
+
+    # Prueba para verificar que la reconstrucción usa un rango semiabierto sobre createdAt.
+    def test_rebuild_range(self):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.rowcount = 2
+
+        days = sales_summary.rebuild(connection, "2024-07-18", "2024-07-19")
+
+        self.assertEqual(days, 2)
+        statements = [c[0] for c in cursor.execute.call_args_list]
+        for query, params in statements:
+            self.assertEqual(params, (date(2024, 7, 18), date(2024, 7, 20)))
+            self.assertNotIn("DATE(s.createdAt) =", query)
+        connection.begin.assert_called_once()
+        connection.commit.assert_called_once()
+
+    # Prueba para verificar que un fallo a medio camino deshace la reconstrucción.
+    def test_rebuild_rollback(self):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.execute.side_effect = [None, Exception("boom")]
+
+        with self.assertRaises(Exception):
+            sales_summary.rebuild(connection)
+
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+
+    # Prueba para verificar que solo la reconstrucción completa recalcula el acumulado histórico.
+    def test_rebuild_all_history_refreshes_totals(self):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+
+        sales_summary.rebuild(connection, "2024-07-18")
+        ranged = [c[0][0] for c in cursor.execute.call_args_list]
+        cursor.reset_mock()
+        sales_summary.rebuild(connection)
+        full = [c[0][0] for c in cursor.execute.call_args_list]
+
+        self.assertFalse(any("product_sales_totals" in query for query in ranged))
+        self.assertTrue(any("DELETE FROM product_sales_totals" in query for query in full))
+
+if __name__ == '__main__':
+    unittest.main()
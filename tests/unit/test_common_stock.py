@@ -0,0 +1,30 @@
+import unittest
+from unittest.mock import MagicMock
+from balu_common import stock
+
+class TestStock(unittest.TestCase):
+
+    # Prueba para verificar que el stock se descuenta con UPDATE condicionales en orden de id.
+    def test_decrement_in_id_order(self):
+        cursor = MagicMock()
+        cursor.rowcount = 1
+
+        stock.decrement(cursor, {7: 1, 2: 3})
+
+        self.assertEqual([c[0] for c in cursor.execute.call_args_list],
+                         [(stock.DECREMENT, (3, 2, 3)), (stock.DECREMENT, (1, 7, 1))])
+
+    # Prueba para verificar que un UPDATE sin filas afectadas detiene la venta.
+    def test_decrement_insufficient_stock(self):
+        cursor = MagicMock()
+        type(cursor).rowcount = property(lambda _: 0 if cursor.execute.call_count == 2 else 1)
+
+        with self.assertRaises(stock.InsufficientStockError) as context:
+            stock.decrement(cursor, {1: 1, 4: 2, 9: 1})
+
+        self.assertEqual(context.exception.product_id, 4)
+        self.assertEqual(str(context.exception), "Product with id 4 does not have enough stock")
+        self.assertEqual(cursor.execute.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
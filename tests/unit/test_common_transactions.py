@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import pymysql
+from pymysql.constants import ER
+from balu_common import transactions
+
+class TestTransactions(unittest.TestCase):
+
+    # Prueba para verificar que un deadlock deshace la transacción y la repite tras una espera aleatoria.
+    @patch("balu_common.transactions.time.sleep")
+    def test_retry_on_deadlock(self, mock_sleep):
+        connection = MagicMock()
+        transaction = MagicMock(side_effect=[pymysql.err.OperationalError(ER.LOCK_DEADLOCK, "Deadlock found"), "ok"])
+
+        self.assertEqual(transactions.run_with_retry(connection, transaction), "ok")
+        self.assertEqual(transaction.call_count, 2)
+        connection.rollback.assert_called_once()
+        self.assertLessEqual(mock_sleep.call_args[0][0], transactions.RETRY_BASE_DELAY)
+
+    # Prueba para verificar que los reintentos tienen un límite.
+    @patch("balu_common.transactions.time.sleep")
+    def test_retry_gives_up(self, mock_sleep):
+        transaction = MagicMock(side_effect=pymysql.err.OperationalError(ER.LOCK_WAIT_TIMEOUT, "Lock wait timeout"))
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            transactions.run_with_retry(MagicMock(), transaction, attempts=3)
+
+        self.assertEqual(transaction.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    # Prueba para verificar que otros errores de la base no se repiten.
+    def test_no_retry_on_other_errors(self):
+        transaction = MagicMock(side_effect=pymysql.err.OperationalError(2013, "Lost connection"))
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            transactions.run_with_retry(MagicMock(), transaction)
+
+        transaction.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 import json
 import pymysql
 from end_of_day_balance import app
@@ -65,4 +65,25 @@ class TestEndOfDayBalance(unittest.TestCase):
         mock_connect.side_effect = pymysql.MySQLError("Simulated connection error")
         with self.assertRaises(Exception) as context:
             app.connect_to_database()
-        self.assertIn("ERROR CONNECTING TO DATABASE", str(context.exception))
\ No newline at end of file
+        self.assertIn("ERROR CONNECTING TO DATABASE", str(context.exception))
+
+    # Prueba para verificar que el balance se lee de las tablas de resumen y no de las ventas del día.
+    @patch("end_of_day_balance.app.connect_to_database")
+    def test_end_of_day_balance_reads_summary(self, mock_connect_to_database):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = ("Pan", 25.0, 100.0, 4, 1)
+        mock_connect_to_database.return_value.cursor.return_value = mock_cursor
+
+        balance = app.get_end_of_day_balance("2024-07-19")
+
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("daily_sales_summary", query)
+        self.assertNotIn("DATE(s.createdAt)", query)
+        self.assertEqual(params, ("2024-07-19",) * 5)
+        self.assertEqual(balance, {
+            "most_sold_product": "Pan",
+            "average_sale": 25.0,
+            "total_sales_today": 100.0,
+            "total_transactions_today": 4,
+            "total_cancelled_transactions": 1
+        })
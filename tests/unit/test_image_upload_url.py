@@ -0,0 +1,56 @@
+import json
+import unittest
+from unittest.mock import patch
+from image_upload_url import app
+from tests.conftest import api_event
+
+class TestImageUploadUrl(unittest.TestCase):
+
+    # Prueba para verificar que la URL prefirmada limita el tipo y el tamaño del archivo.
+    @patch("balu_common.images.aws.get_client")
+    def test_upload_url_created(self, mock_get_client):
+        mock_get_client.return_value.generate_presigned_post.return_value = {
+            "url": "https://cafe-balu-images.s3.amazonaws.com/",
+            "fields": {"key": "images/x.png", "Content-Type": "image/png", "policy": "p"}
+        }
+
+        result = app.lambda_handler(api_event({"content_type": "image/png"}), None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "UPLOAD_URL_CREATED")
+        self.assertTrue(app.images.UPLOAD_KEY_PATTERN.match(body["key"]))
+        kwargs = mock_get_client.return_value.generate_presigned_post.call_args.kwargs
+        self.assertEqual(kwargs["Key"], body["key"])
+        self.assertIn({"Content-Type": "image/png"}, kwargs["Conditions"])
+        self.assertIn(["content-length-range", 1, app.images.MAX_UPLOAD_BYTES], kwargs["Conditions"])
+
+    def test_upload_url_invalid_content_type(self):
+        result = app.lambda_handler(api_event({"content_type": "image/gif"}), None)
+        self.assertEqual(result["statusCode"], 400)
+        self.assertEqual(json.loads(result["body"])["message"], "INVALID_CONTENT_TYPE")
+
+    def test_upload_url_forbidden(self):
+        result = app.lambda_handler(api_event({"content_type": "image/png"}, role="sales"), None)
+        self.assertEqual(result["statusCode"], 403)
+
+    # Prueba para verificar que solo se aceptan llaves emitidas cuyo objeto existe en S3.
+    @patch("balu_common.images.aws.get_client")
+    def test_is_uploaded_image(self, mock_get_client):
+        from botocore.exceptions import ClientError
+        head = mock_get_client.return_value.head_object
+        key = "images/3f2b8c1e-1111-4a2b-9c3d-abcdefabcdef.png"
+
+        head.return_value = {"ContentType": "image/png", "ContentLength": 1024}
+        self.assertTrue(app.images.is_uploaded_image(key))
+
+        head.return_value = {"ContentType": "text/html", "ContentLength": 1024}
+        self.assertFalse(app.images.is_uploaded_image(key))
+
+        head.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        self.assertFalse(app.images.is_uploaded_image(key))
+
+        self.assertFalse(app.images.is_uploaded_image("images/../../etc/passwd.png"))
+
+if __name__ == '__main__':
+    unittest.main()
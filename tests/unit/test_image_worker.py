@@ -0,0 +1,29 @@
+import json
+import unittest
+from unittest.mock import patch
+from image_worker import app
+
+class TestImageWorker(unittest.TestCase):
+
+    # Prueba para verificar que solo los mensajes fallidos vuelven a la cola.
+    @patch("image_worker.app.images.process")
+    def test_partial_batch_failure(self, mock_process):
+        mock_process.side_effect = [True, Exception("corrupt image")]
+        event = {"Records": [
+            {"messageId": "m1", "body": json.dumps({"product_id": 1, "image": "https://a"})},
+            {"messageId": "m2", "body": json.dumps({"product_id": 2, "image": "https://b"})}
+        ]}
+
+        result = app.lambda_handler(event, None)
+
+        self.assertEqual(result, {"batchItemFailures": [{"itemIdentifier": "m2"}]})
+        mock_process.assert_any_call({"product_id": 1, "image": "https://a"})
+    # Prueba para verificar que la ejecución programada lanza el barrido de huérfanos.
+    @patch("image_worker.app.images.sweep")
+    def test_sweep_handler(self, mock_sweep):
+        mock_sweep.return_value = 4
+
+        self.assertEqual(app.sweep_handler({"source": "aws.events"}, None), {"deleted": 4})
+
+if __name__ == '__main__':
+    unittest.main()
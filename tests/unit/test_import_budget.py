@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FUNCTIONS = [
+    "bulk_cancel_sales",
+    "cancel_sales",
+    "change_status_category_or_product",
+    "end_of_day_balance",
+    "get_category",
+    "get_low_stock_products",
+    "get_one_product",
+    "get_products",
+    "image_upload_url",
+    "import_products",
+    "image_worker",
+    "inventory_compaction",
+    "login",
+    "newPassword",
+    "sale_worker",
+    "save_category",
+    "save_product",
+    "save_sale",
+    "sync_sales",
+    "top_sold_products",
+    "update_category",
+    "update_product",
+    "view_sales_history_per_day",
+]
+
+# Tiempo máximo de importación de cada función en un proceso limpio
+IMPORT_BUDGET_SECONDS = 0.5
+
+IMPORT_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+import {module}.app
+print(json.dumps({{"seconds": time.perf_counter() - start, "boto3": "boto3" in sys.modules,
+                  "botocore": "botocore" in sys.modules}}))
+"""
+
+class TestImportBudget(unittest.TestCase):
+
+    # Prueba para verificar que ninguna función importa boto3 o botocore ni crea clientes al cargarse.
+    def test_functions_import_within_budget(self):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT, "common"), ROOT]))
+        for module in FUNCTIONS:
+            with self.subTest(function=module):
+                output = subprocess.run(
+                    [sys.executable, "-c", IMPORT_SCRIPT.format(module=module)],
+                    cwd=ROOT, env=env, capture_output=True, text=True, check=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                self.assertFalse(result["boto3"])
+                self.assertFalse(result["botocore"])
+                self.assertLess(result["seconds"], IMPORT_BUDGET_SECONDS)
+
+if __name__ == '__main__':
+    unittest.main()
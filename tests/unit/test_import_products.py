@@ -0,0 +1,139 @@
+import json
+import unittest
+from unittest.mock import patch
+from import_products import app
+from tests.conftest import api_event
+
+KEY = "images/3f2b8c1e-1111-4a2b-9c3d-abcdefabcdef.png"
+EXISTING = {
+    1: {"category_id": 1, "name": "Latte", "image": "https://cafe-balu-images.s3.amazonaws.com/images/latte.png"},
+    2: {"category_id": 1, "name": "Mocha", "image": None}
+}
+
+class TestImportProducts(unittest.TestCase):
+
+    # Prueba para verificar que una carga válida se escribe de una vez y devuelve el conteo.
+    @patch("import_products.app.images.enqueue_variants")
+    @patch("import_products.app.catalog_cache.invalidate")
+    @patch("import_products.app.images.is_uploaded_image", return_value=True)
+    @patch("import_products.app.write_rows")
+    @patch("import_products.app.prefetch")
+    def test_import_json(self, mock_prefetch, mock_write_rows, _, mock_invalidate, mock_enqueue):
+        mock_prefetch.return_value = ({1}, EXISTING)
+        mock_write_rows.return_value = [(3, app.images.public_url(KEY))]
+
+        result = app.lambda_handler(api_event({"products": [
+            {"name": "Espresso", "stock": 5, "price": 30, "category_id": 1, "image_key": KEY},
+            {"id": 1, "name": "Latte", "stock": 8, "price": 45, "category_id": 1, "status": 1}
+        ]}), None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual((body["created"], body["updated"]), (1, 1))
+        inserts, updates = mock_write_rows.call_args[0]
+        self.assertEqual(inserts[0]["image"], app.images.public_url(KEY))
+        self.assertIsNone(updates[0]["image"])
+        mock_invalidate.assert_called_once()
+        mock_enqueue.assert_called_once_with(3, app.images.public_url(KEY))
+
+    # Prueba para verificar que se reporta el error de cada fila y no se escribe nada.
+    @patch("import_products.app.images.is_uploaded_image", return_value=True)
+    @patch("import_products.app.write_rows")
+    @patch("import_products.app.prefetch")
+    def test_import_reports_row_errors(self, mock_prefetch, mock_write_rows, _):
+        mock_prefetch.return_value = ({1}, EXISTING)
+
+        result = app.lambda_handler(api_event({"products": [
+            {"name": "Espresso", "stock": 5, "price": 30, "category_id": 1, "image_key": KEY},
+            {"name": "espresso", "stock": 5, "price": 30, "category_id": 1, "image_key": KEY},
+            {"name": "Té", "stock": 5, "price": 30, "category_id": 9, "image_key": KEY},
+            {"id": 2, "name": "Latte", "stock": 1, "price": 10, "category_id": 1, "status": 1},
+            {"id": 7, "name": "Chai", "stock": 1, "price": 10, "category_id": 1, "status": 1},
+            {"name": "Cortado", "stock": 1, "price": 0, "category_id": 1, "image_key": KEY}
+        ]}), None)
+
+        self.assertEqual(result["statusCode"], 400)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "INVALID_ROWS")
+        self.assertEqual(body["errors"], [
+            {"row": 2, "message": "PRODUCT_EXISTS"},
+            {"row": 3, "message": "CATEGORY_NOT_FOUND"},
+            {"row": 4, "message": "PRODUCT_EXISTS"},
+            {"row": 5, "message": "PRODUCT_NOT_FOUND"},
+            {"row": 6, "message": "INVALID_PRICE"}
+        ])
+        mock_write_rows.assert_not_called()
+
+    # Prueba para verificar que un CSV se convierte a los mismos tipos que el JSON.
+    def test_parse_csv(self):
+        csv_body = "id,name,stock,price,category_id,status,description,image_key\n,Espresso,5,30.5,1,,,images/a.png\n1,Latte,8,45,1,0,Con leche,\n"
+
+        rows = app.parse_rows(api_event(csv_body, headers={"Content-Type": "text/csv; charset=utf-8"}))
+        coerced = [app.coerce(row)[0] for row in rows]
+
+        self.assertEqual(coerced[0], {"name": "Espresso", "stock": 5, "price": 30.5, "category_id": 1, "image_key": "images/a.png"})
+        self.assertEqual(coerced[1]["id"], 1)
+        self.assertEqual(coerced[1]["status"], 0)
+
+    # Prueba para verificar que un CSV con columnas desconocidas se rechaza.
+    def test_import_csv_unknown_column(self):
+        result = app.lambda_handler(api_event("name,color\nLatte,red\n", headers={"content-type": "text/csv"}), None)
+        self.assertEqual(result["statusCode"], 400)
+        self.assertEqual(json.loads(result["body"])["message"], "INVALID_IMPORT_FORMAT")
+
+    # Prueba para verificar que las filas se escriben con sentencias de varias filas en una transacción.
+    @patch("import_products.app.db")
+    def test_write_rows(self, mock_db):
+        connection = mock_db.get_connection.return_value
+        cursor = connection.cursor.return_value
+        cursor.fetchall.side_effect = [[(1, 8), (2, 5)], [(10, 1, "Espresso"), (11, 1, "Cortado")]]
+        image = app.images.public_url(KEY)
+        inserts = [
+            {"id": None, "name": "Espresso", "stock": 5, "price": 30, "category_id": 1, "status": 1, "description": "Sin descripción", "image": image},
+            {"id": None, "name": "Cortado", "stock": 5, "price": 35, "category_id": 1, "status": 1, "description": "Sin descripción", "image": image}
+        ]
+        updates = [
+            {"id": 1, "name": "Latte", "stock": 8, "price": 45, "category_id": 1, "status": 1, "description": "Sin descripción", "image": None},
+            {"id": 2, "name": "Mocha", "stock": 3, "price": 50, "category_id": 1, "status": 1, "description": "Sin descripción", "image": image}
+        ]
+
+        new_images = app.write_rows(inserts, updates)
+
+        connection.begin.assert_called_once()
+        connection.commit.assert_called_once()
+        self.assertEqual(len(cursor.executemany.call_args_list[0][0][1]), 2)
+        # Solo cambian el stock de Mocha y el de los dos productos nuevos
+        self.assertEqual(cursor.executemany.call_args_list[1][0],
+                         (app.inventory.ADJUSTMENT_MOVEMENT, [(2, -2), (10, 5), (11, 5)]))
+        self.assertIn("FOR UPDATE", cursor.execute.call_args_list[0][0][0])
+        update_query, update_params = cursor.execute.call_args_list[1][0]
+        self.assertEqual(update_query.count("UNION ALL"), 1)
+        self.assertEqual(len(update_params), 16)
+        self.assertEqual(cursor.execute.call_args_list[2][0],
+                         (app.sales_summary.CATEGORY_SYNC.format(ids="%s, %s"), [1, 2]))
+        self.assertEqual(new_images, [(10, image), (11, image), (2, image)])
+
+    # Prueba para verificar que un error de la base deshace toda la carga.
+    @patch("import_products.app.db")
+    def test_write_rows_rolls_back(self, mock_db):
+        connection = mock_db.get_connection.return_value
+        connection.cursor.return_value.execute.side_effect = app.pymysql.err.IntegrityError(1062, "Duplicate entry")
+        update = {"id": 1, "name": "Latte", "stock": 8, "price": 45, "category_id": 1, "status": 1, "description": "x", "image": None}
+
+        with self.assertRaises(app.pymysql.err.IntegrityError):
+            app.write_rows([], [update])
+
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+
+    def test_import_too_many_rows(self):
+        rows = [{"name": "p", "stock": 1, "price": 1, "category_id": 1}] * (app.MAX_IMPORT_ROWS + 1)
+        result = app.lambda_handler(api_event({"products": rows}), None)
+        self.assertEqual(result["statusCode"], 413)
+
+    def test_import_forbidden(self):
+        result = app.lambda_handler(api_event({"products": []}, role="sales"), None)
+        self.assertEqual(result["statusCode"], 403)
+
+if __name__ == '__main__':
+    unittest.main()
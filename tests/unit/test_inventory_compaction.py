@@ -0,0 +1,22 @@
+import unittest
+from unittest.mock import patch
+from inventory_compaction import app
+
+class TestInventoryCompaction(unittest.TestCase):
+
+    # Prueba para verificar que la ejecución programada compacta y reporta las diferencias de stock.
+    @patch("inventory_compaction.app.inventory.reconcile")
+    @patch("inventory_compaction.app.inventory.compact")
+    @patch("inventory_compaction.app.db")
+    def test_lambda_handler(self, mock_db, mock_compact, mock_reconcile):
+        mock_compact.return_value = 500
+        mock_reconcile.return_value = [{"product_id": 2, "stock": 4, "ledger_stock": 7}]
+
+        result = app.lambda_handler({}, None)
+
+        self.assertEqual(result, {"movement_id": 500, "drift": [{"product_id": 2, "stock": 4, "ledger_stock": 7}]})
+        mock_compact.assert_called_once_with(mock_db.get_connection.return_value)
+        mock_db.release_connection.assert_called_once_with(mock_db.get_connection.return_value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import unittest
+import json
+from unittest.mock import patch
+from router import app
+
+mock_save_sale = {
+    "resource": "/save_sale",
+    "httpMethod": "POST",
+    "body": json.dumps({"products": [{"id": 1, "quantity": 1}], "total": 10.0})
+}
+
+mock_unknown_route = {
+    "resource": "/unknown",
+    "httpMethod": "GET"
+}
+
+class TestRouter(unittest.TestCase):
+
+    def setUp(self):
+        app._handlers.clear()
+
+    # Prueba para verificar que la petición llega al lambda_handler de la función correspondiente.
+    @patch("save_sale.app.lambda_handler")
+    def test_dispatch_to_function(self, mock_handler):
+        mock_handler.return_value = {"statusCode": 200, "body": json.dumps({"message": "SALE_SAVED"})}
+
+        result = app.lambda_handler(mock_save_sale, "context")
+
+        mock_handler.assert_called_once_with(mock_save_sale, "context")
+        self.assertEqual(result["statusCode"], 200)
+
+    # Prueba para verificar que el método se compara sin distinguir mayúsculas.
+    @patch("get_products.app.lambda_handler")
+    def test_dispatch_lowercase_method(self, mock_handler):
+        event = {"resource": "/get_products/{status}", "httpMethod": "get", "pathParameters": {"status": "1"}}
+
+        app.lambda_handler(event, None)
+
+        mock_handler.assert_called_once()
+
+    # Prueba para verificar el manejo de una ruta desconocida.
+    def test_route_not_found(self):
+        result = app.lambda_handler(mock_unknown_route, None)
+        self.assertEqual(result["statusCode"], 404)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "ROUTE_NOT_FOUND")
+
+    # Prueba para verificar que todas las rutas apuntan a una función existente.
+    def test_all_routes_resolve(self):
+        for package in set(app.ROUTES.values()):
+            with self.subTest(package=package):
+                self.assertTrue(callable(app.get_handler(package)))
+
+    # Prueba para verificar que el Makefile empaqueta en el monolito cada función a la que despacha el router.
+    def test_makefile_packages_every_route(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(os.path.join(root, "Makefile")) as makefile:
+            text = makefile.read()
+        packages = text.split("MONOLITH_PACKAGES =", 1)[1].split("\n\n", 1)[0].replace("\\", " ").split()
+
+        self.assertEqual(set(packages), set(app.ROUTES.values()) | {"router"})
+
+if __name__ == '__main__':
+    unittest.main()
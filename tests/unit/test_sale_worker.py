@@ -0,0 +1,31 @@
+import json
+import unittest
+from unittest.mock import patch
+from sale_worker import app
+
+def record(message_id, ingest_id):
+    return {"messageId": message_id, "body": json.dumps({"ingest_id": ingest_id, "products": [], "total": 0})}
+
+class TestSaleWorker(unittest.TestCase):
+
+    # Prueba para verificar que solo se reintentan los mensajes de las ventas rechazadas.
+    @patch("sale_worker.app.sale_ingest.process_batch")
+    def test_reports_rejected_sales(self, mock_process_batch):
+        mock_process_batch.return_value = ["b"]
+
+        result = app.lambda_handler({"Records": [record("m1", "a"), record("m2", "b")]}, None)
+
+        self.assertEqual(result, {"batchItemFailures": [{"itemIdentifier": "m2"}]})
+        self.assertEqual([job["ingest_id"] for job in mock_process_batch.call_args[0][0]], ["a", "b"])
+
+    # Prueba para verificar que si falla la transacción se reintenta el lote completo.
+    @patch("sale_worker.app.sale_ingest.process_batch")
+    def test_failed_batch(self, mock_process_batch):
+        mock_process_batch.side_effect = Exception("Lock wait timeout")
+
+        result = app.lambda_handler({"Records": [record("m1", "a"), record("m2", "b")]}, None)
+
+        self.assertEqual(result, {"batchItemFailures": [{"itemIdentifier": "m1"}, {"itemIdentifier": "m2"}]})
+
+if __name__ == '__main__':
+    unittest.main()
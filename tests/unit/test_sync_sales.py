@@ -0,0 +1,117 @@
+import json
+import unittest
+from unittest.mock import patch
+from sync_sales import app
+from tests.conftest import api_event
+
+def sale(client_id, products, created_at="2024-07-01T09:30:00-06:00", total=10.0):
+    return {"client_id": client_id, "created_at": created_at, "products": products, "total": total}
+
+class TestSyncSales(unittest.TestCase):
+
+    # Prueba para verificar que cada venta recibe su resultado y solo las válidas se escriben.
+    @patch("sync_sales.app.sale_ingest.write_batch")
+    @patch("sync_sales.app.prefetch")
+    def test_sync_reports_each_sale(self, mock_prefetch, mock_write_batch):
+        mock_prefetch.return_value = ({1: 5}, {}, {})
+        mock_write_batch.side_effect = lambda jobs: [{"message": "SALE_SAVED", "sale_id": 100 + n} for n in range(len(jobs))]
+
+        result = app.lambda_handler(api_event({"sales": [
+            sale("t1-1", [{"id": 1, "quantity": 2}]),
+            sale("t1-2", [{"id": 1, "quantity": 4}]),
+            sale("t1-3", [{"id": 9, "quantity": 1}]),
+            sale("t1-4", [{"id": 1, "quantity": 1}], created_at="ayer"),
+            sale("t1-5", [{"id": 1, "quantity": 3}])
+        ]}, role="sales"), None)
+
+        self.assertEqual(result["statusCode"], 200)
+        body = json.loads(result["body"])
+        self.assertEqual((body["saved"], body["failed"]), (2, 3))
+        self.assertEqual(body["results"], [
+            {"message": "SALE_SAVED", "sale_id": 100, "client_id": "t1-1"},
+            {"message": "INSUFFICIENT_STOCK", "client_id": "t1-2"},
+            {"message": "PRODUCT_NOT_FOUND", "client_id": "t1-3"},
+            {"message": "INVALID_CREATED_AT", "client_id": "t1-4"},
+            {"message": "SALE_SAVED", "sale_id": 101, "client_id": "t1-5"}
+        ])
+        jobs = mock_write_batch.call_args[0][0]
+        self.assertEqual([job["idempotency_key"] for job in jobs], ["sync:t1-1", "sync:t1-5"])
+        # La hora de la terminal se guarda en UTC
+        self.assertEqual(jobs[0]["created_at"], "2024-07-01 15:30:00")
+
+    # Prueba para verificar que una venta ya sincronizada se reporta sin volver a escribirse.
+    @patch("sync_sales.app.sale_ingest.write_batch")
+    @patch("sync_sales.app.prefetch")
+    def test_sync_duplicate(self, mock_prefetch, mock_write_batch):
+        original = sale("t1-1", [{"id": 1, "quantity": 2}])
+        mock_prefetch.return_value = ({1: 0}, {"sync:t1-1": (app.idempotency.request_hash(original), 55)}, {"t1-1": 55})
+
+        body = json.loads(app.lambda_handler(api_event({"sales": [original]}, role="sales"), None)["body"])
+
+        self.assertEqual(body["results"], [{"message": "DUPLICATE", "sale_id": 55, "client_id": "t1-1"}])
+        mock_write_batch.assert_not_called()
+
+    # Prueba para verificar que una venta sincronizada de nuevo después de purgar su llave no se duplica.
+    @patch("sync_sales.app.sale_ingest.write_batch")
+    @patch("sync_sales.app.db")
+    def test_sync_duplicate_after_key_purged(self, mock_db, mock_write_batch):
+        cursor = mock_db.get_connection.return_value.cursor.return_value
+        # Stock, llaves de idempotencia (ya purgadas) y ventas con ese client_id
+        cursor.fetchall.side_effect = [[(1, 0)], [], [("t1-1", 55)]]
+
+        body = json.loads(app.lambda_handler(api_event({"sales": [sale("t1-1", [{"id": 1, "quantity": 2}])]}, role="sales"), None)["body"])
+
+        self.assertEqual(body["results"], [{"message": "DUPLICATE", "sale_id": 55, "client_id": "t1-1"}])
+        query, params = cursor.execute.call_args[0]
+        self.assertIn("FROM sales WHERE client_id IN", query)
+        self.assertEqual(params, ["t1-1"])
+        mock_write_batch.assert_not_called()
+
+    # Prueba para verificar que un producto que no es un objeto solo rechaza su propia venta.
+    @patch("sync_sales.app.sale_ingest.write_batch")
+    @patch("sync_sales.app.prefetch")
+    def test_sync_invalid_product_entry(self, mock_prefetch, mock_write_batch):
+        mock_prefetch.return_value = ({1: 5}, {}, {})
+        mock_write_batch.return_value = [{"message": "SALE_SAVED", "sale_id": 7}]
+
+        result = app.lambda_handler(api_event({"sales": [sale("t1-1", [1]), sale("t1-2", ["x"]), sale("t1-3", [{"id": 1, "quantity": 1}])]}, role="sales"), None)
+
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual([r["message"] for r in json.loads(result["body"])["results"]],
+                         ["INVALID_PRODUCT", "INVALID_PRODUCT", "SALE_SAVED"])
+
+    # Prueba para verificar que las ventas se escriben en bloques y un bloque fallido no afecta a los demás.
+    @patch("sync_sales.app.CHUNK_SIZE", 2)
+    @patch("sync_sales.app.sale_ingest.write_batch")
+    @patch("sync_sales.app.prefetch")
+    def test_sync_chunks(self, mock_prefetch, mock_write_batch):
+        mock_prefetch.return_value = ({1: 100}, {}, {})
+        mock_write_batch.side_effect = [
+            [{"message": "SALE_SAVED", "sale_id": 1}, {"message": "SALE_SAVED", "sale_id": 2}],
+            app.pymysql.err.OperationalError(1213, "Deadlock found"),
+            [{"message": "SALE_SAVED", "sale_id": 3}]
+        ]
+
+        body = json.loads(app.lambda_handler(api_event({"sales": [sale(f"t-{n}", [{"id": 1, "quantity": 1}]) for n in range(5)]}, role="sales"), None)["body"])
+
+        self.assertEqual(mock_write_batch.call_count, 3)
+        self.assertEqual([r["message"] for r in body["results"]],
+                         ["SALE_SAVED", "SALE_SAVED", "DATABASE_ERROR", "DATABASE_ERROR", "SALE_SAVED"])
+        self.assertEqual((body["saved"], body["failed"]), (3, 2))
+
+    # Prueba para verificar que la fecha de la terminal no puede estar en el futuro.
+    def test_parse_created_at_future(self):
+        with self.assertRaises(ValueError):
+            app.parse_created_at("2999-01-01T00:00:00Z")
+        self.assertEqual(app.parse_created_at("2024-07-01T12:00:00"), "2024-07-01 12:00:00")
+
+    def test_sync_too_many_sales(self):
+        result = app.lambda_handler(api_event({"sales": [{}] * (app.MAX_SYNC_SALES + 1)}, role="sales"), None)
+        self.assertEqual(result["statusCode"], 413)
+
+    def test_sync_forbidden(self):
+        result = app.lambda_handler(api_event({"sales": []}, role="guest"), None)
+        self.assertEqual(result["statusCode"], 403)
+
+if __name__ == '__main__':
+    unittest.main()
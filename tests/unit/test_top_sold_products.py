@@ -1,5 +1,6 @@
 import unittest
 import json
+from datetime import date
 from unittest.mock import patch
 from top_sold_products import app
 
@@ -46,4 +47,41 @@ class TestTopSoldProducts(unittest.TestCase):
         result = app.lambda_handler(mock_category, None)
         self.assertEqual(result["statusCode"], 500)
         body = json.loads(result["body"])
-        self.assertEqual(body["message"], "INTERNAL_SERVER_ERROR")
\ No newline at end of file
+        self.assertEqual(body["message"], "INTERNAL_SERVER_ERROR")
+
+    def test_top_sold_products_invalid_window(self):
+        result = app.lambda_handler({"body": json.dumps({"window": "90d"})}, None)
+        self.assertEqual(result["statusCode"], 400)
+        body = json.loads(result["body"])
+        self.assertEqual(body["message"], "INVALID_WINDOW")
+
+    # Prueba para verificar que sin ventana se lee el acumulado mantenido y no se agrega el historial.
+    @patch("top_sold_products.app.connect_to_database")
+    def test_top_sold_products_reads_leaderboard(self, mock_connect_to_database):
+        mock_cursor = mock_connect_to_database.return_value.cursor.return_value
+        mock_cursor.fetchall.return_value = [("Pan", "Panadería", 12)]
+        mock_cursor.description = [("product_name",), ("category_name",), ("total_quantity_sold",)]
+
+        result = app.get_top_sold_products(1)
+
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("FROM\n                product_sales_totals t", query)
+        self.assertIn("t.category_id = %s", query)
+        self.assertNotIn("sales_products", query)
+        self.assertEqual(params, [1])
+        self.assertEqual(result, [{"product_name": "Pan", "category_name": "Panadería", "total_quantity_sold": 12}])
+
+    # Prueba para verificar que una ventana suma solo los días recientes del resumen diario.
+    @patch("top_sold_products.app.date")
+    @patch("top_sold_products.app.connect_to_database")
+    def test_top_sold_products_window(self, mock_connect_to_database, mock_date):
+        mock_date.today.return_value = date(2024, 7, 19)
+        mock_cursor = mock_connect_to_database.return_value.cursor.return_value
+        mock_cursor.fetchall.return_value = []
+        mock_cursor.description = []
+
+        app.get_top_sold_products(None, "7d")
+
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("daily_sales_product_summary", query)
+        self.assertEqual(params, [date(2024, 7, 13)])
@@ -1,38 +1,16 @@
 import json
 import pymysql
 from decimal import Decimal
-import boto3
-from botocore.exceptions import ClientError
+from datetime import date, timedelta
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
+from balu_common import db
 
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+# Días que cubre cada ventana, contando el día de hoy
+WINDOWS = {
+    "today": 1,
+    "7d": 7,
+    "30d": 30
+}
 
 def lambda_handler(event, __):
     headers = {
@@ -46,6 +24,18 @@ def lambda_handler(event, __):
            if 'category' in json.loads(event['body']):
             category = json.loads(event['body']).get('category')
 
+       window = None
+       if 'body' in event and 'window' in json.loads(event['body']):
+           window = json.loads(event['body']).get('window')
+           if window not in WINDOWS:
+               return {
+                   "statusCode": 400,
+                   "headers": headers,
+                   "body": json.dumps({
+                       "message": "INVALID_WINDOW"
+                   }),
+               }
+
        if category != None:
             if not category_exists(category):
                 return {
@@ -55,7 +45,7 @@ def lambda_handler(event, __):
                         "message": "CATEGORY_NOT_FOUND"
                     }),
                 }
-       top_products = get_top_sold_products(category)
+       top_products = get_top_sold_products(category, window)
        return {
             "statusCode": 200,
             "headers": headers,
@@ -76,55 +66,62 @@ def lambda_handler(event, __):
             }),
         }
 
-def get_top_sold_products(category):
+def get_top_sold_products(category, window=None):
     connection = connect_to_database()
     cursor = connection.cursor()
-    
-    if category == None:
-        cursor.execute("""
+
+    params = []
+    category_filter = ""
+    if category != None:
+        category_filter = "AND p.category_id = %s"
+        params.append(category)
+
+    if window is None:
+        # Acumulado que mantienen save_sale y cancel_sales; el índice por cantidad (o por categoría y
+        # cantidad) resuelve el top 10
+        category_filter = "AND t.category_id = %s" if category != None else ""
+        cursor.execute(f"""
         SELECT
             p.name AS product_name,
             c.name AS category_name,
-            SUM(sp.quantity) AS total_quantity_sold
+            t.quantity AS total_quantity_sold
             FROM
-                sales_products sp
+                product_sales_totals t
             JOIN
-                products p ON sp.product_id = p.id
+                products p ON t.product_id = p.id
             JOIN
                 categories c ON p.category_id = c.id
-            JOIN
-                sales s ON sp.sale_id = s.id
             WHERE
-                s.status = 1
-            GROUP BY
-                p.name, c.name
+                t.quantity > 0 {category_filter}
             ORDER BY
-                total_quantity_sold DESC
-            LIMIT 10;""", ())
+                t.quantity DESC
+            LIMIT 10;""", params)
     else:
-        cursor.execute("""
+        since = date.today() - timedelta(days=WINDOWS[window] - 1)
+        cursor.execute(f"""
         SELECT
             p.name AS product_name,
             c.name AS category_name,
-            SUM(sp.quantity) AS total_quantity_sold
+            SUM(d.quantity) AS total_quantity_sold
             FROM
-                sales_products sp
+                daily_sales_product_summary d
             JOIN
-                products p ON sp.product_id = p.id
+                products p ON d.product_id = p.id
             JOIN
                 categories c ON p.category_id = c.id
-            JOIN
-                sales s ON sp.sale_id = s.id
             WHERE
-                s.status = 1 AND c.id = %s
+                d.sale_date >= %s {category_filter}
             GROUP BY
-                p.name, c.name
+                d.product_id, p.name, c.name
+            HAVING
+                total_quantity_sold > 0
             ORDER BY
                 total_quantity_sold DESC
-            LIMIT 10;""", (category,))
-    
+            LIMIT 10;""", [since] + params)
+
     result = cursor.fetchall()
     result = [dict(zip([column[0] for column in cursor.description], row)) for row in result]
+    db.release_connection(connection)
     return result
 
 def category_exists(category):
@@ -132,12 +129,12 @@ def category_exists(category):
     cursor = connection.cursor()
     cursor.execute("select * from categories where id = %s", (category))
     result = cursor.fetchone()
-    connection.close()
+    db.release_connection(connection)
     return result != None
 
 def connect_to_database():
     try:
-        connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+        connection = db.get_connection()
         return connection
     except pymysql.MySQLError as e:
         raise Exception("ERROR CONNECTING TO DATABASE: " + str(e))
@@ -1,38 +1,8 @@
 import json
 import pymysql
 import logging
-import boto3
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import catalog_cache, db
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -98,16 +68,15 @@ def lambda_handler(event, __):
 
         id = int(id)
         newName = newName.strip()
-        exist = category_exist(id)
         if category_exist(id) is False:
-                logger.error("Category not found for id=%s", id)
-                return {
-                    "statusCode": 404,
-                    "headers": headers,
-                    "body": json.dumps({
-                        "message": "CATEGORY_NOT_FOUND"
-                    }),
-                }
+            logger.error("Category not found for id=%s", id)
+            return {
+                "statusCode": 404,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "CATEGORY_NOT_FOUND"
+                }),
+            }
 
         if duplicated_name(newName) is True:
             logger.error("Category already exists: newName=%s", newName)
@@ -120,6 +89,7 @@ def lambda_handler(event, __):
             }
 
         update_category(id, newName, headers)
+        catalog_cache.invalidate()
 
         logger.info("Category updated successfully: id=%s, newName=%s", id, newName)
 
@@ -153,8 +123,7 @@ def lambda_handler(event, __):
 
 
 def update_category(id, newName, headers):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
-    print(connection)
+    connection = db.get_connection()
     try:
         try:
             cursor = connection.cursor()
@@ -179,17 +148,15 @@ def update_category(id, newName, headers):
             }),
         }
     finally:
-        connection.close()
+        db.release_connection(connection)
 
 def category_exist(id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         try:
             cursor = connection.cursor()
             cursor.execute("SELECT * FROM categories WHERE id = %s", (id))
             result = cursor.fetchone()
-            print("result", result)
-
             if result is None:
                 return False
 
@@ -201,17 +168,15 @@ def category_exist(id):
         logger.error("Database connection error: %s", str(e))
         return False
     finally:
-        connection.close()
+        db.release_connection(connection)
 
 def duplicated_name(newName):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         try:
             cursor = connection.cursor()
             cursor.execute("SELECT * FROM categories WHERE lower(name) = %s", (newName.lower()))
             result = cursor.fetchone()
-            print("result", result)
-
             if result is None:
                 return False
 
@@ -223,4 +188,4 @@ def duplicated_name(newName):
         logger.error("Database connection error: %s", str(e))
         return False
     finally:
-        connection.close()
\ No newline at end of file
+        db.release_connection(connection)
\ No newline at end of file
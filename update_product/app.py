@@ -1,52 +1,12 @@
 import json
 import pymysql
 import re
-import boto3
-import uuid
-import base64
-from botocore.exceptions import ClientError
 
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
+from balu_common import catalog_cache, db, images, inventory, products, sales_summary
 
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
-
-bucket_name = "cafe-balu-images"
-s3 = boto3.client('s3')
-
-def upload_image_to_s3(base64_data):
-    # Remover el prefijo de la cadena base64
-    base64_data = base64_data.split(",")[1]
-    binary_data = base64.b64decode(base64_data)
-    file_name = f"images/{uuid.uuid4()}.jpg"
-    s3.put_object(Bucket=bucket_name, Key=file_name, Body=binary_data, ContentType='image/jpeg')
-    s3_url = f"https://{bucket_name}.s3.amazonaws.com/{file_name}"
-    return s3_url
+def upload_image_to_s3(data_url):
+    # Se guarda el original con su tipo real; las miniaturas WebP las genera image_worker
+    return images.public_url(images.store_original(data_url))
 
 def lambda_handler(event, __):
     headers = {
@@ -87,6 +47,8 @@ def lambda_handler(event, __):
         price = body.get('price')
         status = body.get('status')
         image = body.get('image')
+        # Llave de una imagen ya subida con /image_upload_url; sustituye al base64 en 'image'
+        image_key = body.get('image_key')
         category_id = body.get('category_id')
         description = "Sin descripción"
 
@@ -106,7 +68,8 @@ def lambda_handler(event, __):
             description = "Sin descripción"
 
         # Validar campos faltantes: 'product_id', 'name', 'stock', 'price', 'status', 'image', 'category_id'
-        missing_fields = [field for field in ['id', 'name', 'stock', 'price', 'status', 'image', 'category_id'] if body.get(field) is None]
+        # Sin 'image' ni 'image_key' el producto conserva su imagen actual
+        missing_fields = [field for field in ['id', 'name', 'stock', 'price', 'status', 'category_id'] if body.get(field) is None]
 
         if missing_fields:
             return {
@@ -157,37 +120,50 @@ def lambda_handler(event, __):
                     "message": "INVALID_CATEGORY_ID"
                 }),
             }
-        if not category_exists(category_id):
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({
-                    "message": "CATEGORY_NOT_FOUND"
-                }),
-            }
 
-        if product_exists_in_category(category_id, name, product_id):
+        # Categoría y nombre duplicado se validan en una sola consulta
+        validation_error = products.validate_write(category_id, name, product_id)
+        if validation_error:
             return {
                 "statusCode": 400,
                 "headers": headers,
                 "body": json.dumps({
-                    "message": "PRODUCT_EXISTS"
+                    "message": validation_error
                 }),
             }
 
-        if is_invalid_image(image):
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({
-                    "message": "INVALID_IMAGE"
-                }),
-            }
+        image_url = None
+        if image_key is not None:
+            if not images.is_uploaded_image(image_key):
+                return {
+                    "statusCode": 400,
+                    "headers": headers,
+                    "body": json.dumps({
+                        "message": "INVALID_IMAGE"
+                    }),
+                }
+            image_url = images.public_url(image_key)
+        elif image is not None:
+            if is_invalid_image(image):
+                return {
+                    "statusCode": 400,
+                    "headers": headers,
+                    "body": json.dumps({
+                        "message": "INVALID_IMAGE"
+                    }),
+                }
+
+            # Subir imagen a S3 y obtener la URL
+            image_url = upload_image_to_s3(image)
 
-        # Subir imagen a S3 y obtener la URL
-        image_url = upload_image_to_s3(image)
+        # La llave depende del contenido: si coincide con la actual la imagen no cambió y sus variantes siguen valiendo
+        if image_url is not None and image_url == get_product_image(product_id):
+            image_url = None
 
         update_product(product_id, name, stock, price, status, image_url, category_id, description)
+        catalog_cache.invalidate()
+        if image_url is not None:
+            images.enqueue_variants(product_id, image_url)
         return {
             "statusCode": 200,
             "headers": headers,
@@ -204,6 +180,25 @@ def lambda_handler(event, __):
                 "error": str(e)
             }),
         }
+    except pymysql.err.IntegrityError as e:
+        # Otra petición escribió el mismo nombre o borró la categoría después de validar
+        message = products.integrity_error_message(e)
+        if message:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": message
+                }),
+            }
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": json.dumps({
+                "message": "DATABASE_ERROR",
+                "error": str(e)
+            }),
+        }
     except pymysql.MySQLError as e:
         return {
             "statusCode": 500,
@@ -224,49 +219,37 @@ def lambda_handler(event, __):
         }
 
 def update_product(product_id, name, stock, price, status, image_url, category_id, description):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
-        cursor.execute("""
-            UPDATE products 
-            SET name=%s, stock=%s, price=%s, status=%s, image=%s, category_id=%s, description=%s 
-            WHERE id=%s
-        """, (name, stock, price, status, image_url, category_id, description, product_id))
+        connection.begin()
+        # El stock nuevo queda en el libro como ajuste manual: la diferencia con el que tenía
+        cursor.execute("SELECT stock FROM products WHERE id = %s FOR UPDATE", (product_id,))
+        current = cursor.fetchone()
+        if current is not None:
+            inventory.record_adjustments(cursor, {product_id: stock - current[0]})
+        columns = "name=%s, stock=%s, price=%s, status=%s, category_id=%s, description=%s"
+        params = [name, stock, price, status, category_id, description]
+        if image_url is not None:
+            columns += ", image=%s, image_variants=NULL"
+            params.append(image_url)
+        cursor.execute(f"UPDATE products SET {columns} WHERE id=%s", params + [product_id])
+        sales_summary.sync_categories(cursor, [product_id])
         connection.commit()
     except Exception as e:
         raise e
     finally:
-        connection.close()
+        db.release_connection(connection)
 
-def category_exists(category_id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+def get_product_image(product_id):
+    connection = db.get_connection()
     try:
         cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM categories WHERE id = %s", (category_id,))
-        connection.commit()
+        cursor.execute("SELECT image FROM products WHERE id = %s", (product_id,))
         result = cursor.fetchone()
-        if result is None:
-            return False
-        return result[0] > 0
-    except Exception as e:
-        raise e
-    finally:
-        connection.close()
-
-def product_exists_in_category(category_id, name, product_id):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
-    try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM products WHERE category_id = %s AND lower(name) = %s AND id != %s", (category_id, name.lower(), product_id))
-        connection.commit()
-        result = cursor.fetchone()
-        if result is None:
-            return False
-        return result[0] > 0
-    except Exception as e:
-        raise e
+        return result[0] if result else None
     finally:
-        connection.close()
+        db.release_connection(connection)
 
 def is_invalid_image(image):
     pattern = r"^data:image/(png|jpg|jpeg);base64,([a-zA-Z0-9+/=]+)$"
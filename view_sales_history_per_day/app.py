@@ -1,44 +1,32 @@
+import io
+import os
+import csv
 import json
+import uuid
 import pymysql
 from datetime import datetime, timedelta
 from decimal import Decimal
 import logging
-import boto3
-from botocore.exceptions import ClientError
-
-def get_secret():
-    secret_name = "prod/Balu/RDS"
-    region_name = "us-east-2"
-
-    # Crear un cliente de Secrets Manager
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
 
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # Para obtener una lista de excepciones lanzadas, vea
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-# Obtener las credenciales desde Secrets Manager
-secrets = get_secret()
-rds_host = secrets["host"]
-rds_user = secrets["username"]
-rds_password = secrets["password"]
-rds_db = secrets["dbname"]
+from balu_common import db, aws
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Rangos de más días que este umbral se exportan a S3 en lugar de viajar en la respuesta
+EXPORT_THRESHOLD_DAYS = int(os.environ.get("SALES_EXPORT_THRESHOLD_DAYS", "7"))
+EXPORT_BUCKET = os.environ.get("SALES_EXPORT_BUCKET", "")
+EXPORT_URL_TTL = int(os.environ.get("SALES_EXPORT_URL_TTL", "900"))
+# S3 exige partes de al menos 5 MB salvo la última
+EXPORT_PART_SIZE = 8 * 1024 * 1024
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+CSV_COLUMNS = ["sale_id", "createdAt", "status", "total", "product_id", "name", "price", "quantity"]
+
 def decimal_to_float(obj):
     if isinstance(obj, Decimal):
         return float(obj)
@@ -118,31 +106,69 @@ def lambda_handler(event, __):
                 }),
             }
 
-        sales = history_per_day(start_date, end_date)
-
-        # Agrupar ventas por sales_id y seleccionar una vez el createdAt, status y total
-        grouped_sales = {}
-        for sale in sales:
-            sale_id = sale['sale_id']
-            if sale_id not in grouped_sales:
-                grouped_sales[sale_id] = {
-                    "sale_id": sale_id,
-                    "createdAt": sale["createdAt"].strftime('%Y-%m-%d %H:%M:%S'),
-                    "status": sale["status"],
-                    "total": float(sale["total"]),
-                    "products": []
+        export_format = body.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_FORMAT"
+                }),
+            }
+
+        if body.get('summary'):
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "SALES_SUMMARY_FETCHED",
+                    "days": daily_totals(start_date, end_date)
+                }, default=decimal_to_float),
+            }
+
+        try:
+            after, limit = parse_page(body)
+        except (TypeError, ValueError):
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "INVALID_PAGINATION"
+                }),
+            }
+
+        if limit is not None:
+            sales = history_page(start_date, end_date, after, limit)
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": json.dumps({
+                    "message": "SALES_HISTORY_FETCHED",
+                    "sales": sales,
+                    "next_after": page_cursor(sales[-1]) if len(sales) == limit else None
+                }, default=decimal_to_float),
+            }
+
+        days = (datetime.strptime(end_date, '%Y-%m-%d') - datetime.strptime(start_date, '%Y-%m-%d')).days + 1
+        if body.get('export') or days > EXPORT_THRESHOLD_DAYS:
+            if EXPORT_BUCKET:
+                export = export_history(start_date, end_date, export_format)
+                return {
+                    "statusCode": 200,
+                    "headers": headers,
+                    "body": json.dumps({
+                        "message": "EXPORT_READY",
+                        **export
+                    }),
                 }
-            grouped_sales[sale_id]["products"].append({
-                "product_id": sale["product_id"],
-                "name": sale["name"],
-                "price": float(sale["price"]),
-                "quantity": sale["quantity"]
-            })
+            logger.warning("SALES_EXPORT_BUCKET is not set, answering the export inline")
+
+        grouped_sales = list(group_sales(history_per_day(start_date, end_date)))
 
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(list(grouped_sales.values()), default=decimal_to_float),
+            "body": json.dumps(grouped_sales, default=decimal_to_float),
         }
     except KeyError as e:
         logger.error(f"KeyError: {str(e)}")
@@ -165,40 +191,248 @@ def lambda_handler(event, __):
             }),
         }
 
+HISTORY_QUERY = """
+    SELECT
+        sales.id AS sale_id,
+        sales.createdAt,
+        sales.status,
+        sales.total,
+        products.id AS product_id,
+        products.name,
+        products.price,
+        sales_products.quantity
+    FROM
+        sales
+    INNER JOIN
+        sales_products
+    ON
+        sales.id = sales_products.sale_id
+    INNER JOIN
+        products
+    ON
+        sales_products.product_id = products.id
+    WHERE
+        sales.createdAt >= %s AND sales.createdAt < %s
+    ORDER BY
+        sales.id;
+"""
+
+def group_sales(rows):
+    # Las filas llegan ordenadas por venta, así que cada venta se cierra en cuanto cambia el sale_id
+    current = None
+    for row in rows:
+        if current is None or current["sale_id"] != row["sale_id"]:
+            if current is not None:
+                yield current
+            current = {
+                "sale_id": row["sale_id"],
+                "createdAt": row["createdAt"].strftime('%Y-%m-%d %H:%M:%S'),
+                "status": row["status"],
+                "total": float(row["total"]),
+                "products": []
+            }
+        current["products"].append({
+            "product_id": row["product_id"],
+            "name": row["name"],
+            "price": float(row["price"]),
+            "quantity": row["quantity"]
+        })
+    if current is not None:
+        yield current
+
 def history_per_day(start_date, end_date):
-    connection = pymysql.connect(host=rds_host, user=rds_user, password=rds_password, db=rds_db)
+    connection = db.get_connection()
     try:
         cursor = connection.cursor(pymysql.cursors.DictCursor)
-        query = """
-            SELECT
-                sales.id AS sale_id,
-                sales.createdAt,
-                sales.status,
-                sales.total,
-                products.id AS product_id,
-                products.name,
-                products.price,
-                sales_products.quantity
-            FROM
-                sales
-            INNER JOIN
-                sales_products
-            ON
-                sales.id = sales_products.sale_id
-            INNER JOIN
-                products
-            ON
-                sales_products.product_id = products.id
-            WHERE
-                sales.createdAt >= %s AND sales.createdAt < %s;
-        """
         # Ajustar la fecha final para incluir hasta el final del día
         end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-        cursor.execute(query, (start_date, end_date))
+        cursor.execute(HISTORY_QUERY, (start_date, end_date))
         sales = cursor.fetchall()
         return sales
     except Exception as e:
         logger.error(f"Database query error: {str(e)}", exc_info=True)
         raise
     finally:
-        connection.close()
\ No newline at end of file
+        db.release_connection(connection)
+
+def parse_page(body):
+    after = body.get('after')
+    limit = body.get('limit')
+
+    # Sin parámetros se conserva la respuesta completa para los clientes existentes
+    if after is None and limit is None:
+        return None, None
+
+    # El cursor es el next_after de la página anterior: la última venta por (createdAt, id)
+    if after is not None:
+        if not isinstance(after, dict):
+            raise ValueError("INVALID_PAGINATION")
+        after = (datetime.strptime(after.get('createdAt'), '%Y-%m-%d %H:%M:%S'), int(after.get('sale_id')))
+        if after[1] < 0:
+            raise ValueError("INVALID_PAGINATION")
+    limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    if limit <= 0 or limit > MAX_PAGE_SIZE:
+        raise ValueError("INVALID_PAGINATION")
+    return after, limit
+
+def page_cursor(sale):
+    return {"createdAt": sale["createdAt"], "sale_id": sale["sale_id"]}
+
+def history_page(start_date, end_date, after, limit):
+    # Primero la página de ventas y luego solo sus líneas, para no multiplicar filas en un join de tres tablas
+    end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    conditions = ["createdAt >= %s", "createdAt < %s"]
+    params = [start_date, end_date]
+    if after is not None:
+        # Sin comparar filas (createdAt, id) > (...): MySQL solo usa el rango del índice con OR explícito
+        conditions.append("(createdAt > %s OR (createdAt = %s AND id > %s))")
+        params += [after[0], after[0], after[1]]
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        # El orden coincide con idx_sales_created_id, así que MySQL lee el rango del índice y se detiene en LIMIT
+        cursor.execute(f"""
+            SELECT id AS sale_id, createdAt, status, total
+            FROM sales
+            WHERE {" AND ".join(conditions)}
+            ORDER BY createdAt, id
+            LIMIT %s
+        """, params + [limit])
+        sales = [{
+            "sale_id": sale["sale_id"],
+            "createdAt": sale["createdAt"].strftime('%Y-%m-%d %H:%M:%S'),
+            "status": sale["status"],
+            "total": float(sale["total"]),
+            "products": []
+        } for sale in cursor.fetchall()]
+        if not sales:
+            return sales
+
+        by_id = {sale["sale_id"]: sale for sale in sales}
+        placeholders = ", ".join(["%s"] * len(by_id))
+        cursor.execute(f"""
+            SELECT sales_products.sale_id, products.id AS product_id, products.name, products.price, sales_products.quantity
+            FROM sales_products
+            INNER JOIN products ON sales_products.product_id = products.id
+            WHERE sales_products.sale_id IN ({placeholders})
+            ORDER BY sales_products.sale_id
+        """, list(by_id))
+        for line in cursor.fetchall():
+            by_id[line["sale_id"]]["products"].append({
+                "product_id": line["product_id"],
+                "name": line["name"],
+                "price": float(line["price"]),
+                "quantity": line["quantity"]
+            })
+        return sales
+    finally:
+        db.release_connection(connection)
+
+def daily_totals(start_date, end_date):
+    # Se resuelve solo con el índice (createdAt, status, total), sin leer las líneas de venta
+    end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    connection = db.get_connection()
+    try:
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        cursor.execute("""
+            SELECT
+                DATE(createdAt) AS day,
+                COALESCE(SUM(CASE WHEN status = 1 THEN total END), 0) AS total_sales,
+                SUM(status = 1) AS transactions,
+                SUM(status = 0) AS cancelled_transactions
+            FROM sales
+            WHERE createdAt >= %s AND createdAt < %s
+            GROUP BY DATE(createdAt)
+            ORDER BY day
+        """, (start_date, end_date))
+        return [{
+            "day": row["day"].strftime('%Y-%m-%d'),
+            "total_sales": row["total_sales"],
+            "transactions": int(row["transactions"]),
+            "cancelled_transactions": int(row["cancelled_transactions"])
+        } for row in cursor.fetchall()]
+    finally:
+        db.release_connection(connection)
+
+def stream_history(connection, start_date, end_date):
+    # SSDictCursor entrega las filas conforme llegan del servidor en lugar de cargarlas todas en memoria
+    end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+        cursor.execute(HISTORY_QUERY, (start_date, end_date))
+        yield from cursor
+
+def serialize_sale(sale, export_format):
+    if export_format == "ndjson":
+        return json.dumps(sale, default=decimal_to_float) + "\n"
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for product in sale["products"]:
+        writer.writerow([sale["sale_id"], sale["createdAt"], sale["status"], sale["total"],
+                         product["product_id"], product["name"], product["price"], product["quantity"]])
+    return output.getvalue()
+
+class S3MultipartWriter:
+    # Sube el archivo por partes para que nunca haya más de una parte en memoria
+
+    def __init__(self, bucket, key, content_type):
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.buffer = bytearray()
+        self.parts = []
+        self.upload_id = None
+
+    def write(self, data):
+        self.buffer.extend(data.encode("utf-8"))
+        if len(self.buffer) >= EXPORT_PART_SIZE:
+            self._upload_part()
+
+    def _upload_part(self):
+        client = aws.get_client('s3')
+        if self.upload_id is None:
+            self.upload_id = client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        number = len(self.parts) + 1
+        response = client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                      PartNumber=number, Body=bytes(self.buffer))
+        self.parts.append({"ETag": response["ETag"], "PartNumber": number})
+        self.buffer = bytearray()
+
+    def close(self):
+        client = aws.get_client('s3')
+        if self.upload_id is None:
+            # Exportaciones pequeñas caben en una sola petición
+            client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), ContentType=self.content_type)
+            return
+        if self.buffer:
+            self._upload_part()
+        client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                         MultipartUpload={"Parts": self.parts})
+
+    def abort(self):
+        if self.upload_id is not None:
+            aws.get_client('s3').abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+def export_history(start_date, end_date, export_format):
+    key = f"sales-history/{start_date}_{end_date}_{uuid.uuid4()}.{export_format}"
+    writer = S3MultipartWriter(EXPORT_BUCKET, key, EXPORT_FORMATS[export_format])
+    connection = db.get_connection()
+    count = 0
+    try:
+        if export_format == "csv":
+            writer.write(",".join(CSV_COLUMNS) + "\r\n")
+        for sale in group_sales(stream_history(connection, start_date, end_date)):
+            writer.write(serialize_sale(sale, export_format))
+            count += 1
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    finally:
+        db.release_connection(connection)
+
+    url = aws.get_client('s3').generate_presigned_url(
+        "get_object", Params={"Bucket": EXPORT_BUCKET, "Key": key}, ExpiresIn=EXPORT_URL_TTL
+    )
+    return {"url": url, "key": key, "format": export_format, "sales": count}